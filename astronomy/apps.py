@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class AstronomyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "astronomy"
+
+    def ready(self):
+        # Load the kernel once per worker instead of once per request
+        if not getattr(settings, 'ASTRONOMY_PRELOAD_EPHEMERIS', True):
+            return
+
+        from .ephemeris import get_registry
+
+        try:
+            get_registry().load()
+        except Exception as e:
+            # Leave it to the first request to retry (and surface the error)
+            logger.warning(f"Ephemeris preload failed, deferring to first request: {e}")
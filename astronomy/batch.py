@@ -0,0 +1,211 @@
+from skyfield.api import iers2010
+from skyfield.framelib import itrs
+from skyfield.functions import mxm, rot_y, rot_z
+from .celestial_calculator import CelestialCalculator, airmass, logger
+from .reporting import report_error
+from .timegrid import DAY_SECONDS, TimeGrid
+import numpy as np
+
+LAYOUTS = ('columnar', 'locations')
+
+
+class ObserverArray:
+    """
+    Many observers on the WGS84/IERS2010 ellipsoid, held as arrays
+
+    Stores each observer's ITRS position (3, M) and its ITRS -> horizon
+    rotation (3, 3, M), so horizontal coordinates for every observer and
+    every time come out of one broadcast matrix product.
+    """
+
+    def __init__(self, latitudes, longitudes, elevations):
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.elevations = np.asarray(elevations, dtype=float)
+
+        positions = iers2010.latlon(self.latitudes, self.longitudes, self.elevations)
+        self.itrs_au = positions.itrs_xyz.au
+        # Same construction as GeographicPosition's own horizon rotation
+        self.rotations = mxm(
+            rot_y(np.radians(self.latitudes))[::-1],
+            rot_z(-np.radians(self.longitudes))
+        )
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def altaz(self, position_au, itrs_rotation):
+        """
+        Altitude and azimuth (degrees), shaped (observers, times), of apparent
+        geocentric GCRS positions (3, times)
+        """
+        body_itrs = np.einsum('ijn,jn->in', itrs_rotation, position_au)
+        offset = body_itrs[:, None, :] - self.itrs_au[:, :, None]
+        x, y, z = np.einsum('ijm,jmn->imn', self.rotations, offset)
+        altitude = np.degrees(np.arctan2(z, np.hypot(x, y)))
+        azimuth = np.degrees(np.arctan2(y, x)) % 360.0
+        return altitude, azimuth
+
+
+class BatchCelestialCalculator(CelestialCalculator):
+    def __init__(self, locations, registry=None, geocentric=None):
+        """
+        Celestial data for many observers over one shared date range
+
+        `locations` is a sequence of (latitude, longitude, elevation). The
+        geocentric part is computed (or read from the shared store) once
+        for all of them; the first location stands in as the single
+        observer the inherited helpers expect.
+        """
+        if not locations:
+            raise ValueError("At least one location is required")
+        latitudes, longitudes, elevations = zip(*locations)
+        super().__init__(latitudes[0], longitudes[0], elevations[0], registry, geocentric)
+        self.observers = ObserverArray(latitudes, longitudes, elevations)
+
+    def get_batch_data(self, start_date, end_date, step=DAY_SECONDS, layout='columnar'):
+        """
+        Retrieve celestial object data for every location
+
+        The 'columnar' layout returns one entry per body with value arrays
+        shared by all observers and (observer, date) arrays for the horizontal
+        coordinates. The 'locations' layout returns, per location, the same
+        document the single-location endpoint does.
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}")
+        start_date, end_date = self._check_range(start_date, end_date)
+
+        grid = TimeGrid.from_range(start_date, end_date, step)
+        times = grid.times(self.ts)
+        state = self._observer_state(times)
+        geocentric = self._geocentric_records(self.celestial_bodies, grid, times, state)
+        horizontal = self._horizontal_grid(geocentric, times)
+        labels = grid.labels()
+
+        if layout == 'locations':
+            return [
+                {
+                    'metadata': self._location_metadata(start_date, end_date, i),
+                    'celestial_objects': self._location_objects(labels, geocentric, horizontal, i)
+                }
+                for i in range(len(self.observers))
+            ]
+
+        return {
+            'metadata': {
+                'dates': {
+                    'from': start_date.isoformat(),
+                    'to': end_date.isoformat()
+                },
+                'observers': [
+                    self._observer_location(i) for i in range(len(self.observers))
+                ]
+            },
+            'dates': labels,
+            'celestial_objects': self._columnar_objects(geocentric, horizontal)
+        }
+
+    def _horizontal_grid(self, geocentric, times):
+        """
+        (altitudes, azimuths, above horizon flags, air masses) arrays shaped
+        (observers, times), or an error message, per body
+
+        Bodies go through one at a time: stacking them as the single-observer
+        calculator does makes the (observers, bodies, times) temporaries too
+        large to stay in cache.
+        """
+        itrs_rotation = None
+        horizontal = {}
+        for obj_id, records in geocentric.items():
+            if isinstance(records, Exception):
+                continue
+            try:
+                if itrs_rotation is None:
+                    itrs_rotation = itrs.rotation_at(times)
+                position_au = np.array([record.position_au for record in records]).T
+                altitudes, azimuths = self.observers.altaz(position_au, itrs_rotation)
+                horizontal[obj_id] = (altitudes, azimuths, altitudes > 0, airmass(altitudes))
+            except Exception as topo_err:
+                report_error(logger, 'Topocentric observation', topo_err, obj_id)
+                horizontal[obj_id] = str(topo_err)
+        return horizontal
+
+    def _location_metadata(self, start_date, end_date, i):
+        return {
+            'dates': {
+                'from': start_date.isoformat(),
+                'to': end_date.isoformat()
+            },
+            'observer': {
+                'location': self._observer_location(i)
+            }
+        }
+
+    def _observer_location(self, i):
+        return {
+            'latitude': float(self.observers.latitudes[i]),
+            'longitude': float(self.observers.longitudes[i]),
+            'elevation': float(self.observers.elevations[i])
+        }
+
+    def _location_objects(self, labels, geocentric, horizontal, i):
+        celestial_objects = []
+        for obj_id, obj_data in self.celestial_bodies.items():
+            records = geocentric[obj_id]
+            if isinstance(records, Exception):
+                observations = [{'date': label, 'error': str(records)} for label in labels]
+            else:
+                coordinates = horizontal.get(obj_id)
+                horizontal_error = None
+                if isinstance(coordinates, str):
+                    coordinates, horizontal_error = None, coordinates
+                elif coordinates is not None:
+                    coordinates = tuple(values[i].tolist() for values in coordinates)
+                observations = self._build_observations(labels, records, coordinates, horizontal_error)
+            celestial_objects.append({
+                'id': obj_id,
+                'name': obj_data['name'],
+                'observations': observations
+            })
+        return celestial_objects
+
+    def _columnar_objects(self, geocentric, horizontal):
+        celestial_objects = []
+        for obj_id, obj_data in self.celestial_bodies.items():
+            records = geocentric[obj_id]
+            if isinstance(records, Exception):
+                celestial_objects.append({'id': obj_id, 'name': obj_data['name'], 'error': str(records)})
+                continue
+
+            position = {
+                'equatorial': {
+                    'right_ascension': [record.right_ascension for record in records],
+                    'declination': [record.declination for record in records]
+                }
+            }
+            coordinates = horizontal.get(obj_id)
+            if isinstance(coordinates, str):
+                position['horizontal_error'] = coordinates
+            elif coordinates is not None:
+                position['horizontal'] = {
+                    'altitude': coordinates[0].tolist(),
+                    'azimuth': coordinates[1].tolist(),
+                    'above_horizon': coordinates[2].tolist(),
+                    'airmass': coordinates[3].tolist()
+                }
+
+            object_details = {
+                'id': obj_id,
+                'name': obj_data['name'],
+                'distance': {
+                    'au': [record.distance_au for record in records],
+                    'km': [record.distance_km for record in records]
+                },
+                'position': position,
+                'constellation': [record.constellation for record in records]
+            }
+            if obj_id == 'moon':
+                object_details['moon_phase'] = [record.moon_phase for record in records]
+            celestial_objects.append(object_details)
+        return celestial_objects
@@ -0,0 +1,261 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from .cells import DecimalCells, configured_cells
+
+import pickle
+import threading
+import time
+
+DEFAULT_RESULT_CACHE = {
+    'BACKEND': 'lru',
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'TTL': 24 * 60 * 60,
+    'CACHE_ALIAS': 'default',
+    'MAX_SAMPLES': 4096,
+}
+
+
+class LRUCacheBackend:
+    """
+    In-process LRU cache bounded by the total size of the stored values
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires, blob = entry
+                if expires is not None and expires <= now:
+                    self._remove(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = blob
+        return {key: pickle.loads(blob) for key, blob in found.items()}
+
+    def set_many(self, mapping):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        blobs = {key: pickle.dumps(value, pickle.HIGHEST_PROTOCOL) for key, value in mapping.items()}
+        with self._lock:
+            for key, blob in blobs.items():
+                if len(blob) > self.max_bytes:
+                    continue
+                self._remove(key)
+                self._entries[key] = (expires, blob)
+                self.size += len(blob)
+            # Evict least recently used entries until back under the cap
+            while self.size > self.max_bytes:
+                key, (_, blob) = self._entries.popitem(last=False)
+                self.size -= len(blob)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class DjangoCacheBackend:
+    """
+    Backend on Django's cache framework (Redis, Memcached, LocMemCache...)
+    """
+
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, mapping):
+        self.cache.set_many(mapping, timeout=self.ttl or None)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return {'alias': self.alias}
+
+
+class ResultCache:
+    """
+    Per body, per timestep cache of computed observations.
+
+    Keys are made of the observer's location cell (LocationCells; decimal
+    rounding to `precision` unless given), the body id and the UTC instant,
+    so overlapping date ranges reuse each other's timesteps and only the
+    missing ones are computed.
+
+    Grids of more than `max_samples` instants bypass the cache. Storing an
+    entry costs about as much as computing it, and a grid that large would
+    evict most of the cache. Streamed and parallel requests go through in
+    chunks, so they are still cached.
+    """
+
+    def __init__(self, backend, precision=4, elevation_precision=0, cells=None, max_samples=None):
+        self.backend = backend
+        self.cells = cells or DecimalCells(precision, elevation_precision)
+        self.max_samples = max_samples
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+
+    def quantize(self, latitude, longitude, elevation=0):
+        """
+        Snap a location to its cell's representative
+        """
+        return self.cells.quantize(latitude, longitude, elevation)
+
+    def location_key(self, location):
+        return self.cells.key(location.latitude.degrees, location.longitude.degrees, location.elevation.m)
+
+    def key(self, location_key, obj_id, instant):
+        return f"astronomy:obs2:{location_key}:{obj_id}:{instant:.3f}"
+
+    def get_or_compute(self, calculator, grid):
+        """
+        Return the celestial objects for a TimeGrid, computing only cache misses
+        """
+        if self.max_samples and len(grid) > self.max_samples:
+            with self._lock:
+                self.bypassed += 1
+            return calculator._calculate_objects(grid)
+
+        location_key = self.location_key(calculator.location)
+        instants = grid.instants.tolist()
+        keys = {
+            obj_id: [self.key(location_key, obj_id, instant) for instant in instants]
+            for obj_id in calculator.celestial_bodies
+        }
+        cached = self.backend.get_many([key for body_keys in keys.values() for key in body_keys])
+
+        missing = sorted({
+            i for body_keys in keys.values() for i, key in enumerate(body_keys) if key not in cached
+        })
+        total = len(grid) * len(keys)
+        self._count(len(cached), total - len(cached))
+
+        computed = {}
+        if missing:
+            to_store = {}
+            for object_details in calculator._calculate_objects(grid[missing]):
+                computed[object_details['id']] = object_details
+                if 'observations' not in object_details:
+                    continue
+                body_keys = keys[object_details['id']]
+                for i, observation in zip(missing, object_details['observations']):
+                    if 'error' not in observation:
+                        to_store[body_keys[i]] = observation
+            self.backend.set_many(to_store)
+
+        labels = grid.labels()
+        celestial_objects = []
+        for obj_id, obj_data in calculator.celestial_bodies.items():
+            object_details = computed.get(obj_id)
+            if object_details is not None and 'observations' not in object_details:
+                # Whole-body failure: report it as the calculator does
+                celestial_objects.append(object_details)
+                continue
+
+            fresh = dict(zip(missing, object_details['observations'])) if object_details else {}
+            observations = []
+            for i, (label, key) in enumerate(zip(labels, keys[obj_id])):
+                observation = cached.get(key) or fresh[i]
+                # Cached entries may come from a request in another timezone
+                observations.append({**observation, 'date': label})
+
+            celestial_objects.append({
+                'id': obj_id,
+                'name': obj_data['name'],
+                'observations': observations
+            })
+
+        return celestial_objects
+
+    def get_or_compute_value(self, key, compute):
+        """
+        Value cached under a full key; `compute` returns (value, cacheable)
+        """
+        cached = self.backend.get_many([key]).get(key)
+        if cached is not None:
+            self._count(1, 0)
+            return cached
+
+        self._count(0, 1)
+        value, cacheable = compute()
+        if cacheable:
+            self.backend.set_many({key: value})
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bypassed': self.bypassed,
+            **self.backend.stats(),
+        }
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+
+def build_result_cache(config=None):
+    """
+    Build a ResultCache from an ASTRONOMY_RESULT_CACHE style dict
+    """
+    config = {**DEFAULT_RESULT_CACHE, **(config or {})}
+    backend_name = config['BACKEND']
+    if not backend_name:
+        return None
+
+    if backend_name == 'lru':
+        backend = LRUCacheBackend(config['MAX_BYTES'], config['TTL'])
+    elif backend_name == 'django':
+        backend = DjangoCacheBackend(config['CACHE_ALIAS'], config['TTL'])
+    else:
+        raise ValueError(f"Unknown result cache backend: {backend_name}")
+
+    return ResultCache(backend, cells=configured_cells(config), max_samples=config['MAX_SAMPLES'])
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Return the process-wide result cache, or None when caching is disabled
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = build_result_cache(getattr(settings, 'ASTRONOMY_RESULT_CACHE', None)) or False
+    return _result_cache or None
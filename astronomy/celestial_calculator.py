@@ -1,30 +1,158 @@
-from datetime import timedelta
-from skyfield.api import load, Topos
+from collections import Counter
+from skyfield.api import Topos
+from skyfield.constants import AU_KM
+from skyfield.framelib import ecliptic_J2000_frame
+from skyfield.functions import angle_between, mxv, to_spherical
+from .constellations import get_constellation_index
+from .ephemeris import get_registry
+from .geocentric import GeocentricRecord, get_geocentric_ephemeris
+from .metrics import increment, span
+from .reporting import report_error
+from .tables import get_ephemeris_tables
+from .timegrid import DAY_SECONDS, TimeGrid
+import numpy as np
 import pytz
-import math
 
 import logging
-import traceback
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG, 
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Observation fields a request can select; the ones left out are not computed
+FIELDS = frozenset(('distance', 'equatorial', 'horizontal', 'constellation', 'moon_phase'))
+# Fields derived from the apparent position; without them observe().apparent() is skipped
+APPARENT_FIELDS = frozenset(('equatorial', 'horizontal', 'constellation'))
+
+
+def airmass(altitude):
+    """
+    Relative air mass (Kasten & Young 1989) at altitudes in degrees, as an
+    object array with None at or below the horizon
+    """
+    altitude = np.asarray(altitude, dtype=float)
+    above = altitude > 0
+    h = altitude[above]
+    mass = np.full(altitude.shape, None, dtype=object)
+    mass[above] = 1.0 / (np.sin(np.radians(h)) + 0.50572 * (h + 6.07995) ** -1.6364)
+    return mass
+
+
+def merge_chunk_entry(objects, entry):
+    """
+    Fold one chunk's {'id', 'name', 'observations'} entry into `objects`
+    (body id -> merged entry, in first-seen order). A failure in any chunk
+    fails the whole body, as it would in a single pass.
+    """
+    object_details = objects.get(entry['id'])
+    if object_details is None:
+        object_details = objects[entry['id']] = {**entry}
+        if 'observations' in entry:
+            object_details['observations'] = list(entry['observations'])
+    elif 'error' in entry:
+        object_details.pop('observations', None)
+        object_details['error'] = entry['error']
+    elif 'observations' in object_details:
+        object_details['observations'].extend(entry['observations'])
+
+
+class ObserverState:
+    """
+    Observer positions for one time vector, shared by every body
+
+    The geocentric observer and the topocentric horizon frame are evaluated
+    at most once per time vector, and geocentric observations are memoized
+    per body so derived quantities (moon phase) reuse them. `evaluations`
+    counts the ephemeris work actually done.
+    """
+
+    def __init__(self, earth, location, times):
+        self.earth = earth
+        self.location = location
+        self.times = times
+        self.evaluations = Counter()
+        self._geocentric = None
+        self._horizon = None
+        self._observations = {}
+
+    @property
+    def geocentric(self):
+        if self._geocentric is None:
+            self.evaluations['observer_at'] += 1
+            self._geocentric = self.earth.at(self.times)
+        return self._geocentric
+
+    @property
+    def horizon(self):
+        """
+        Observer's GCRS offset from the geocenter and its GCRS -> horizon rotation
+        """
+        if self._horizon is None:
+            self.evaluations['horizon'] += 1
+            self._horizon = (
+                self.location.at(self.times).position.au,
+                self.location.rotation_at(self.times)
+            )
+        return self._horizon
+
+    def observe(self, body):
+        """
+        Astrometric geocentric observation of `body`, computed once
+        """
+        observation = self._observations.get(body)
+        if observation is None:
+            self.evaluations['observe'] += 1
+            observation = self._observations[body] = self.geocentric.observe(body)
+        return observation
+
+    def altaz(self, position_au):
+        """
+        Topocentric altitude and azimuth (degrees) of apparent geocentric positions
+
+        `position_au` is (3, N) for one body or (3, B, N) for B bodies at
+        once. Shifting the geocentric vector by the observer's offset
+        accounts for parallax; only diurnal aberration (< 0.5 arcsec) is left out.
+        """
+        observer_au, rotation = self.horizon
+        if position_au.ndim == 3:
+            observer_au = observer_au[:, np.newaxis]
+        _, altitude, azimuth = to_spherical(mxv(rotation, position_au - observer_au))
+        return np.degrees(altitude), np.degrees(azimuth)
+
+
 class CelestialCalculator:
-    def __init__(self, latitude, longitude, elevation=0):
+    def __init__(self, latitude, longitude, elevation=0, registry=None, geocentric=None, tables=None, bodies=None,
+                 store=None, fields=None):
         """
         Initialize Celestial Calculator with geographical location
+
+        The timescale, kernel and body definitions come from the shared
+        ephemeris registry, geocentric results from the shared geocentric
+        store and, inside their window, precomputed ephemeris tables; only
+        the observer location is per-instance. `bodies` restricts the
+        calculation to those body ids and `fields` to those observation
+        fields (see FIELDS); with an ObservationStore, stored observations are
+        read instead of computed and new ones written to it.
+
+        A calculator restricted to some fields neither reads nor writes the
+        result cache or observation store, which hold whole observations, and
+        only shares complete records through the geocentric store.
         """
         try:
-            # Load timescale
-            self.ts = load.timescale()
-            
-            # Load comprehensive SPICE kernel
-            self.planets = load('de440s.bsp')
-            
+            registry = (registry or get_registry()).acquire()
+            self.geocentric = geocentric or get_geocentric_ephemeris()
+            self.tables = tables or get_ephemeris_tables()
+            self.fields = FIELDS if fields is None else frozenset(fields)
+            self.store = store if self.fields == FIELDS else None
+
+            self.ts = registry.ts
+            self.planets = registry.planets
+            self.earth = registry.earth
+            self.registry_bodies = registry.celestial_bodies
+            self.celestial_bodies = registry.celestial_bodies
+            if bodies is not None:
+                self.celestial_bodies = {
+                    obj_id: obj_data for obj_id, obj_data in registry.celestial_bodies.items() if obj_id in bodies
+                }
+
             # Create observer location
             self.location = Topos(
                 latitude_degrees=latitude, 
@@ -32,346 +160,501 @@ class CelestialCalculator:
                 elevation_m=elevation
             )
             
-            # Initialize celestial bodies with direct references
-            self.earth = self.planets['earth']
-            
-            # Comprehensive celestial bodies dictionary
-            self.celestial_bodies = {
-                'sun': {
-                    'body': self.planets['sun'],
-                    'name': 'Sun',
-                    'type': 'direct'
-                },
-                'moon': {
-                    'body': self.planets['moon'],
-                    'name': 'Moon',
-                    'type': 'direct'
-                },
-                'mercury': {
-                    'body': self.planets['mercury barycenter'],
-                    'name': 'Mercury',
-                    'type': 'barycenter'
-                },
-                'venus': {
-                    'body': self.planets['venus barycenter'],
-                    'name': 'Venus',
-                    'type': 'barycenter'
-                },
-                'mars': {
-                    'body': self.planets['mars barycenter'],
-                    'name': 'Mars',
-                    'type': 'barycenter'
-                },
-                'jupiter': {
-                    'body': self.planets['jupiter barycenter'],
-                    'name': 'Jupiter',
-                    'type': 'barycenter'
-                },
-                'saturn': {
-                    'body': self.planets['saturn barycenter'],
-                    'name': 'Saturn',
-                    'type': 'barycenter'
-                },
-                'uranus': {
-                    'body': self.planets['uranus barycenter'],
-                    'name': 'Uranus',
-                    'type': 'barycenter'
-                },
-                'neptune': {
-                    'body': self.planets['neptune barycenter'],
-                    'name': 'Neptune',
-                    'type': 'barycenter'
-                },
-                'pluto': {
-                    'body': self.planets['pluto barycenter'],
-                    'name': 'Pluto',
-                    'type': 'barycenter'
-                }
-            }
-            
-            logger.info(f"Celestial Calculator initialized: {latitude}°N, {longitude}°E")
+            logger.debug(f"Celestial Calculator initialized: {latitude}°N, {longitude}°E")
         
         except Exception as e:
-            logger.critical(f"Celestial Calculator initialization failed: {e}")
-            logger.critical(traceback.format_exc())
+            logger.error(f"Celestial Calculator initialization failed: {e}")
             raise
 
-    def get_celestial_objects_data(self, start_date, end_date):
+    def get_celestial_objects_data(self, start_date, end_date, cache=None, step=DAY_SECONDS):
         """
         Retrieve celestial object data for a given date range
+
+        Samples are taken every `step` seconds (one day by default). With a
+        ResultCache only the (body, instant) pairs it does not already hold
+        are computed.
+        """
+        start_date, end_date = self._check_range(start_date, end_date)
+
+        # Generate date range
+        grid = TimeGrid.from_range(start_date, end_date, step)
+        
+        # Prepare result data structure
+        result_data = {
+            'metadata': self._metadata(start_date, end_date),
+            'celestial_objects': []
+        }
+
+        if cache is not None and self.fields == FIELDS:
+            result_data['celestial_objects'] = cache.get_or_compute(self, grid)
+        else:
+            result_data['celestial_objects'] = self._calculate_objects(grid)
+
+        return result_data
+
+    def iter_celestial_objects_data(self, start_date, end_date, chunk_size=256, cache=None, step=DAY_SECONDS):
         """
+        Stream celestial object data for a date range in chunks of dates
+
+        Yields {'metadata': ...} first, then one {'id', 'name', 'observations'}
+        entry per body for each chunk of at most `chunk_size` dates. Only one
+        chunk is held in memory at a time, whatever the length of the range.
+        """
+        start_date, end_date = self._check_range(start_date, end_date)
+        yield {'metadata': self._metadata(start_date, end_date)}
+
+        grid = TimeGrid.from_range(start_date, end_date, step)
+        for offset in range(0, len(grid), chunk_size):
+            chunk = grid[offset:offset + chunk_size]
+            if cache is not None and self.fields == FIELDS:
+                yield from cache.get_or_compute(self, chunk)
+            else:
+                yield from self._calculate_objects(chunk)
+
+    def _check_range(self, start_date, end_date):
         # Ensure dates are timezone-aware
         start_date = self._ensure_timezone(start_date)
         end_date = self._ensure_timezone(end_date)
         
         if start_date > end_date:
             raise ValueError("Start date must be before end date")
+        return start_date, end_date
 
-        # Generate date range
-        dates = self._generate_dates(start_date, end_date)
-        
-        # Prepare result data structure
-        result_data = {
-            'metadata': {
-                'dates': {
-                    'from': start_date.isoformat(),
-                    'to': end_date.isoformat()
-                },
-                'observer': {
-                    'location': {
-                        'latitude': self.location.latitude.degrees,
-                        'longitude': self.location.longitude.degrees,
-                        'elevation': self.location.elevation.m
-                    }
-                }
+    def _metadata(self, start_date, end_date):
+        return {
+            'dates': {
+                'from': start_date.isoformat(),
+                'to': end_date.isoformat()
             },
-            'celestial_objects': []
+            'observer': {
+                'location': {
+                    'latitude': self.location.latitude.degrees,
+                    'longitude': self.location.longitude.degrees,
+                    'elevation': self.location.elevation.m
+                }
+            }
         }
 
+    def _calculate_objects(self, grid):
+        """
+        Every celestial body over a TimeGrid, through the observation store if there is one
+        """
+        if self.store is not None:
+            return self.store.get_or_compute(self, grid)
+        return self._compute_objects(grid)
+
+    def _compute_objects(self, grid):
+        """
+        Calculate every celestial body over a TimeGrid with one shared time vector
+        """
+        with span('times'):
+            times = grid.times(self.ts)
+        state = self._observer_state(times)
+        geocentric = self._geocentric_records(self.celestial_bodies, grid, times, state)
+        horizontal = self._horizontal(geocentric, state) if 'horizontal' in self.fields else {}
+        celestial_objects = []
+        increment('samples', len(grid) * len(self.celestial_bodies))
+
         # Process each celestial body
         for obj_id, obj_data in self.celestial_bodies.items():
             try:
-                object_details = self._calculate_object_details(obj_id, obj_data, dates)
-                result_data['celestial_objects'].append(object_details)
+                object_details = self._calculate_object_details(
+                    obj_id, obj_data, grid, times, state, geocentric[obj_id], horizontal.get(obj_id)
+                )
+                celestial_objects.append(object_details)
             except Exception as e:
-                logger.error(f"Error calculating data for {obj_id}: {e}")
-                logger.error(traceback.format_exc())
-                result_data['celestial_objects'].append({
+                report_error(logger, 'Object details', e, obj_id)
+                celestial_objects.append({
                     'id': obj_id,
                     'name': obj_data['name'],
                     'error': str(e)
                 })
 
-        return result_data
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Ephemeris evaluations for {len(grid)} samples: {dict(state.evaluations)}")
+        return celestial_objects
+
+    def _observer_state(self, times):
+        """
+        Shared geocentric/topocentric observer state for a time vector
+        """
+        return ObserverState(self.earth, self.location, times)
 
-    def _calculate_object_details(self, obj_id, obj_data, dates):
+    def _geocentric_records(self, bodies, grid, times, state):
+        """
+        Geocentric records per body for a TimeGrid, computing only what the
+        shared store lacks. Missing instants inside the ephemeris tables'
+        window are interpolated from them instead of evaluated live. A body
+        whose computation fails maps to the error.
+        """
+        instants = grid.instants.tolist()
+        records, missing = self.geocentric.lookup(list(bodies), instants)
+        if not missing:
+            return records
+
+        if len(missing) == len(grid):
+            missing_state = state
+        else:
+            missing_state = self._observer_state(times[missing])
+        missing_instants = [instants[i] for i in missing]
+
+        for obj_id, obj_data in bodies.items():
+            body_records = records[obj_id]
+            if all(body_records[i] is not None for i in missing):
+                continue
+            try:
+                computed = self._geocentric(obj_id, obj_data, missing_state)
+            except Exception as obs_err:
+                report_error(logger, 'Observation', obs_err, obj_id)
+                records[obj_id] = obs_err
+                continue
+            if self.fields == FIELDS:
+                self.geocentric.store(obj_id, missing_instants, computed)
+            for i, record in zip(missing, computed):
+                body_records[i] = record
+
+        return records
+
+    def _calculate_geocentric(self, obj_id, obj_data, state):
+        """
+        Observer-independent records of a body for every time of `state`
+        """
+        apparent = not APPARENT_FIELDS.isdisjoint(self.fields)
+        empty = [None] * len(state.times)
+        position_au = distance_au = distance_km = right_ascension = declination = empty
+
+        with span('observe'):
+            # Geocentric observation for every date
+            if apparent or 'distance' in self.fields:
+                geocentric = state.observe(obj_data['body'])
+
+            if 'distance' in self.fields:
+                distance = geocentric.distance()
+                distance_au = distance.au.tolist()
+                distance_km = distance.km.tolist()
+
+            if apparent:
+                # Calculate apparent geocentric position
+                apparent_geocentric = geocentric.apparent()
+
+                # Calculate right ascension and declination
+                ra, dec, _ = apparent_geocentric.radec()
+                position_au = apparent_geocentric.position.au.T.tolist()
+                right_ascension = ra.hours.tolist()
+                declination = dec.degrees.tolist()
+
+        # Add constellation information
+        if 'constellation' in self.fields:
+            constellations = self.get_constellation(ra.hours * 15, dec.degrees)
+        else:
+            constellations = empty
+
+        # Add moon phase for moon
+        if obj_id == 'moon' and 'moon_phase' in self.fields:
+            with span('moon_phase'):
+                moon_phases = self._calculate_moon_phase(state.times, state)
+        else:
+            moon_phases = empty
+
+        return [
+            GeocentricRecord(*fields)
+            for fields in zip(
+                position_au,
+                distance_au,
+                distance_km,
+                right_ascension,
+                declination,
+                constellations,
+                moon_phases
+            )
+        ]
+
+    def _geocentric(self, obj_id, obj_data, state):
+        """
+        Records of a body for every time of `state`, interpolated from the
+        ephemeris tables where they allow it and computed live elsewhere
+        """
+        if self.tables is None:
+            return self._calculate_geocentric(obj_id, obj_data, state)
+
+        usable = self.tables.interpolable(obj_id, state.times.tt)
+        if obj_id == 'moon':
+            # The moon phase also needs the sun
+            usable &= self.tables.interpolable('sun', state.times.tt)
+        if usable.all():
+            return self._tabulated_geocentric(obj_id, state.times)
+        if not usable.any():
+            return self._calculate_geocentric(obj_id, obj_data, state)
+
+        records = [None] * len(usable)
+        tabulated = np.flatnonzero(usable)
+        live = np.flatnonzero(~usable)
+        for i, record in zip(tabulated, self._tabulated_geocentric(obj_id, state.times[tabulated])):
+            records[i] = record
+        live_state = self._observer_state(state.times[live])
+        for i, record in zip(live, self._calculate_geocentric(obj_id, obj_data, live_state)):
+            records[i] = record
+        return records
+
+    def _tabulated_geocentric(self, obj_id, times):
+        """
+        Geocentric records of a body interpolated from the ephemeris tables
+        """
+        with span('tables'):
+            apparent_au, astrometric_au = self.tables.interpolate(obj_id, times.tt)
+        _, declination, right_ascension = to_spherical(apparent_au)
+        right_ascension = np.degrees(right_ascension)
+        declination = np.degrees(declination)
+        distance_au = np.sqrt((astrometric_au ** 2).sum(axis=0))
+
+        if 'constellation' in self.fields:
+            constellations = self.get_constellation(right_ascension, declination)
+        else:
+            constellations = [None] * len(declination)
+
+        if obj_id == 'moon' and 'moon_phase' in self.fields:
+            _, sun_au = self.tables.interpolate('sun', times.tt)
+            moon_phases = self._moon_phases(self._elongations(astrometric_au, sun_au))
+        else:
+            moon_phases = [None] * len(constellations)
+
+        return [
+            GeocentricRecord(*fields)
+            for fields in zip(
+                apparent_au.T.tolist(),
+                distance_au.tolist(),
+                (distance_au * AU_KM).tolist(),
+                (right_ascension / 15.0).tolist(),
+                declination.tolist(),
+                constellations,
+                moon_phases
+            )
+        ]
+
+    def _horizontal(self, geocentric, state):
+        """
+        Horizontal coordinates of every body in one topocentric pass, as body
+        id -> (altitudes, azimuths, above horizon flags, air masses) lists, or
+        an error message; callers skip it when `horizontal` is not selected
+        """
+        bodies = [obj_id for obj_id, records in geocentric.items() if not isinstance(records, Exception)]
+        if not bodies:
+            return {}
+        try:
+            # (3, bodies, times)
+            position_au = np.array(
+                [[record.position_au for record in geocentric[obj_id]] for obj_id in bodies]
+            ).transpose(2, 0, 1)
+            with span('altaz'):
+                altitudes, azimuths = state.altaz(position_au)
+                above_horizon = altitudes > 0
+                airmasses = airmass(altitudes)
+        except Exception as topo_err:
+            report_error(logger, 'Topocentric observation', topo_err)
+            return {obj_id: str(topo_err) for obj_id in bodies}
+        return {
+            obj_id: (altitudes[b].tolist(), azimuths[b].tolist(), above_horizon[b].tolist(), airmasses[b].tolist())
+            for b, obj_id in enumerate(bodies)
+        }
+
+    def _calculate_object_details(self, obj_id, obj_data, grid, times=None, state=None, records=None,
+                                  horizontal=None):
         """
         Calculate detailed observations for a celestial object
+
+        The geocentric part comes from the shared store (computed for the
+        whole range at once on a miss); the horizontal coordinates for this
+        observer are derived from it in one vectorized rotation, or passed
+        in from _horizontal's pass over every body.
         """
+        if times is None:
+            times = grid.times(self.ts)
+        if state is None:
+            state = self._observer_state(times)
+        if records is None:
+            records = self._geocentric_records({obj_id: obj_data}, grid, times, state)[obj_id]
+
         object_details = {
             'id': obj_id,
             'name': obj_data['name'],
             'observations': []
         }
+        date_labels = grid.labels()
 
-        # Determine the correct body to observe
-        planet = obj_data['body']
+        if isinstance(records, Exception):
+            object_details['observations'] = [
+                {'date': label, 'error': str(records)} for label in date_labels
+            ]
+            return object_details
 
-        for date in dates:
-            try:
-                # Ensure date is in UTC and create Skyfield time
-                t = self.ts.from_datetime(date)
-                
-                # Robust observation method
-                try:
-                    # Geocentric observation
-                    geocentric = self.earth.at(t).observe(planet)
-                    
-                    # Calculate apparent geocentric position
-                    apparent_geocentric = geocentric.apparent()
-                    
-                    # Calculate right ascension and declination
-                    right_ascension, declination, _ = apparent_geocentric.radec()
-
-                    # Prepare observation data
-                    observation = {
-                        'date': date.isoformat(),
-                        'distance': {
-                            'au': geocentric.distance().au,
-                            'km': geocentric.distance().km
-                        },
-                        'position': {
-                            'equatorial': {
-                                'right_ascension': right_ascension.hours,  # Use .hours
-                                'declination': declination.degrees  # Use .degrees
-                            }
-                        }
-                    }
-
-                    # Add horizontal coordinates for direct bodies
-                    if obj_data['type'] == 'direct':
-                        try:
-                            # Topocentric observation for direct bodies
-                            observer = self.earth + self.location
-                            topocentric = observer.at(t).observe(planet)
-                            apparent_topocentric = topocentric.apparent()
-                            
-                            # Calculate horizontal coordinates
-                            alt, az, _ = apparent_topocentric.altaz()
-                            
-                            observation['position']['horizontal'] = {
-                                'altitude': alt.degrees,
-                                'azimuth': az.degrees
-                            }
-                        except Exception as topo_err:
-                            logger.warning(f"Topocentric observation error for {obj_id}: {topo_err}")
-                            observation['position']['horizontal_error'] = str(topo_err)
-
-                    # Add constellation information
-                    constellation = self.get_constellation(right_ascension.hours * 15, declination.degrees)
-                    if constellation:
-                        observation['constellation'] = constellation
-
-                    # Add moon phase for moon
-                    if obj_id == 'moon':
-                        try:
-                            # Calculate moon phase
-                            moon_phase = self._calculate_moon_phase(t)
-                            observation['moon_phase'] = moon_phase
-                        except Exception as phase_err:
-                            logger.warning(f"Moon phase calculation error: {phase_err}")
-                            observation['moon_phase_error'] = str(phase_err)
-                                        
-                    object_details['observations'].append(observation)
-                
-                except Exception as obs_err:
-                    logger.error(f"Observation error for {obj_id}: {obs_err}")
-                    logger.error(traceback.format_exc())
-                    object_details['observations'].append({
-                        'date': date.isoformat(),
-                        'error': str(obs_err)
-                    })
-                
-            except Exception as e:
-                logger.error(f"Error processing date {date.isoformat()} for {obj_id}: {e}")
-                logger.error(traceback.format_exc())
-                object_details['observations'].append({
-                    'date': date.isoformat(),
-                    'error': str(e)
-                })
+        # Add horizontal coordinates
+        if horizontal is None and 'horizontal' in self.fields:
+            horizontal = self._horizontal({obj_id: records}, state).get(obj_id)
+        horizontal_error = None
+        if isinstance(horizontal, str):
+            horizontal, horizontal_error = None, horizontal
 
+        with span('build'):
+            object_details['observations'] = self._build_observations(
+                date_labels, records, horizontal, horizontal_error
+            )
         return object_details
 
+    def _build_observations(self, date_labels, records, horizontal=None, horizontal_error=None):
+        """
+        Observation dicts from geocentric records and optional horizontal
+        coordinates (altitudes, azimuths, above horizon flags, air masses),
+        with the calculator's fields
+        """
+        if horizontal is not None:
+            altitudes, azimuths, above_horizon, airmasses = horizontal
+        distance = 'distance' in self.fields
+        equatorial = 'equatorial' in self.fields
+        constellation = 'constellation' in self.fields
+        moon_phase = 'moon_phase' in self.fields
+        observations = []
+        for i, (label, record) in enumerate(zip(date_labels, records)):
+            # Prepare observation data
+            observation = {'date': label}
+            if distance:
+                observation['distance'] = {
+                    'au': record.distance_au,
+                    'km': record.distance_km
+                }
+
+            position = {}
+            if equatorial:
+                position['equatorial'] = {
+                    'right_ascension': record.right_ascension,
+                    'declination': record.declination
+                }
+            if horizontal is not None:
+                position['horizontal'] = {
+                    'altitude': altitudes[i],
+                    'azimuth': azimuths[i],
+                    'above_horizon': above_horizon[i],
+                    'airmass': airmasses[i]
+                }
+            elif horizontal_error is not None:
+                position['horizontal_error'] = horizontal_error
+            if position:
+                observation['position'] = position
+
+            if constellation:
+                observation['constellation'] = record.constellation
+
+            if moon_phase and record.moon_phase is not None:
+                observation['moon_phase'] = record.moon_phase
+
+            observations.append(observation)
+
+        return observations
+
     def get_constellation(self, ra, dec):
         """
         Determine the constellation for given coordinates
         
-        :param ra: Right Ascension in degrees
-        :param dec: Declination in degrees
-        :return: Constellation dictionary
-        """
-        # Normalize RA to be between 0 and 360
-        ra = ra % 360
-
-        # constellation definitions
-        constellations = {
-            # Northern Hemisphere
-            'and': {'id': 'and', 'short': 'And', 'name': 'Andromeda', 'ra_range': (0, 40), 'dec_range': (20, 50)},
-            'aur': {'id': 'aur', 'short': 'Aur', 'name': 'Auriga', 'ra_range': (70, 100), 'dec_range': (30, 50)},
-            'boo': {'id': 'boo', 'short': 'Boo', 'name': 'Boötes', 'ra_range': (210, 250), 'dec_range': (0, 50)},
-            'cam': {'id': 'cam', 'short': 'Cam', 'name': 'Camelopardalis', 'ra_range': (60, 120), 'dec_range': (50, 80)},
-            'cas': {'id': 'cas', 'short': 'Cas', 'name': 'Cassiopeia', 'ra_range': (0, 60), 'dec_range': (50, 70)},
-            'cep': {'id': 'cep', 'short': 'Cep', 'name': 'Cepheus', 'ra_range': (300, 360), 'dec_range': (60, 90)},
-            'cyg': {'id': 'cyg', 'short': 'Cyg', 'name': 'Cygnus', 'ra_range': (280, 340), 'dec_range': (30, 60)},
-            'dra': {'id': 'dra', 'short': 'Dra', 'name': 'Draco', 'ra_range': (260, 360), 'dec_range': (50, 80)},
-            'her': {'id': 'her', 'short': 'Her', 'name': 'Hercules', 'ra_range': (240, 290), 'dec_range': (20, 50)},
-            'lyr': {'id': 'lyr', 'short': 'Lyr', 'name': 'Lyra', 'ra_range': (280, 300), 'dec_range': (30, 50)},
-            'peg': {'id': 'peg', 'short': 'Peg', 'name': 'Pegasus', 'ra_range': (330, 360), 'dec_range': (0, 30)},
-            'per': {'id': 'per', 'short': 'Per', 'name': 'Perseus', 'ra_range': (40, 80), 'dec_range': (30, 60)},
-            'umi': {'id': 'umi', 'short': 'UMi', 'name': 'Ursa Minor', 'ra_range': (210, 280), 'dec_range': (70, 90)},
-            'uma': {'id': 'uma', 'short': 'UMa', 'name': 'Ursa Major', 'ra_range': (150, 250), 'dec_range': (50, 70)},
-
-            # Zodiac constellations
-            'ari': {'id': 'ari', 'short': 'Ari', 'name': 'Aries', 'ra_range': (30, 50), 'dec_range': (10, 30)},
-            'tau': {'id': 'tau', 'short': 'Tau', 'name': 'Taurus', 'ra_range': (50, 90), 'dec_range': (-10, 30)},
-            'gem': {'id': 'gem', 'short': 'Gem', 'name': 'Gemini', 'ra_range': (90, 120), 'dec_range': (10, 30)},
-            'cnc': {'id': 'cnc', 'short': 'Cnc', 'name': 'Cancer', 'ra_range': (120, 140), 'dec_range': (0, 30)},
-            'leo': {'id': 'leo', 'short': 'Leo', 'name': 'Leo', 'ra_range': (140, 180), 'dec_range': (0, 30)},
-            'vir': {'id': 'vir', 'short': 'Vir', 'name': 'Virgo', 'ra_range': (180, 210), 'dec_range': (-10, 10)},
-            'lib': {'id': 'lib', 'short': 'Lib', 'name': 'Libra', 'ra_range': (210, 240), 'dec_range': (-30, 0)},
-            'sco': {'id': 'sco', 'short': 'Sco', 'name': 'Scorpius', 'ra_range': (240, 260), 'dec_range': (-40, -10)},
-            'sgr': {'id': 'sgr', 'short': 'Sgr', 'name': 'Sagittarius', 'ra_range': (260, 290), 'dec_range': (-30, -10)},
-            'cap': {'id': 'cap', 'short': 'Cap', 'name': 'Capricornus', 'ra_range': (290, 320), 'dec_range': (-30, -10)},
-            'aqr': {'id': 'aqr', 'short': 'Aqr', 'name': 'Aquarius', 'ra_range': (320, 360), 'dec_range': (-30, 0)},
-            'psc': {'id': 'psc', 'short': 'Psc', 'name': 'Pisces', 'ra_range': (0, 30), 'dec_range': (-10, 30)},
-
-            # Southern Hemisphere
-            'car': {'id': 'car', 'short': 'Car', 'name': 'Carina', 'ra_range': (150, 210), 'dec_range': (-70, -30)},
-            'cen': {'id': 'cen', 'short': 'Cen', 'name': 'Centaurus', 'ra_range': (200, 260), 'dec_range': (-60, -30)},
-            'cru': {'id': 'cru', 'short': 'Cru', 'name': 'Crux', 'ra_range': (180, 200), 'dec_range': (-70, -50)},
-            'erid': {'id': 'erid', 'short': 'Eri', 'name': 'Eridanus', 'ra_range': (30, 90), 'dec_range': (-60, -10)},
-            'grus': {'id': 'grus', 'short': 'Gru', 'name': 'Grus', 'ra_range': (320, 360), 'dec_range': (-60, -30)},
-            'ind': {'id': 'ind', 'short': 'Ind', 'name': 'Indus', 'ra_range': (300, 360), 'dec_range': (-60, -30)},
-            'lup': {'id': 'lup', 'short': 'Lup', 'name': 'Lupus', 'ra_range': (200, 250), 'dec_range': (-50, -30)},
-            'oct': {'id': 'oct', 'short': 'Oct', 'name': 'Octans', 'ra_range': (0, 60), 'dec_range': (-90, -60)},
-            'pav': {'id': 'pav', 'short': 'Pav', 'name': 'Pavo', 'ra_range': (300, 360), 'dec_range': (-70, -40)},
-            'scl': {'id': 'scl', 'short': 'Scl', 'name': 'Sculptor', 'ra_range': (20, 50), 'dec_range': (-40, -20)},
-            'tel': {'id': 'tel', 'short': 'Tel', 'name': 'Telescopium', 'ra_range': (240, 270), 'dec_range': (-60, -40)},
-            'tri': {'id': 'tri', 'short': 'Tri', 'name': 'Triangulum', 'ra_range': (0, 30), 'dec_range': (20, 40)}
-        }
+        :param ra: Right Ascension in degrees (ICRS), scalar or array
+        :param dec: Declination in degrees (ICRS), scalar or array
+        :return: Constellation dictionary, or a list of them for arrays
+        """
+        with span('constellation'):
+            return get_constellation_index().lookup(ra, dec)
 
-        for const_key, const_info in constellations.items():
-            ra_in_range = (
-                const_info['ra_range'][0] <= ra <= const_info['ra_range'][1] or
-                (const_info['ra_range'][0] > const_info['ra_range'][1] and 
-                (ra >= const_info['ra_range'][0] or ra <= const_info['ra_range'][1]))
-            )
-            
-            dec_in_range = (
-                const_info['dec_range'][0] <= dec <= const_info['dec_range'][1]
-            )
-            
-            if ra_in_range and dec_in_range:
-                return {
-                    "id": const_key,
-                    "short": const_info['short'],
-                    "name": const_info['name']
-                }
-        
-        return None
-    def _calculate_moon_phase(self, t):
+    # Phase names and the upper bound (degrees of elongation east of the sun)
+    # of each 45-degree bucket; past the last bound the moon is new again
+    MOON_PHASE_NAMES = (
+        "New Moon",
+        "Waxing Crescent",
+        "First Quarter",
+        "Waxing Gibbous",
+        "Full Moon",
+        "Waning Gibbous",
+        "Last Quarter",
+        "Waning Crescent",
+    )
+    MOON_PHASE_BOUNDS = (22.5, 67.5, 112.5, 157.5, 202.5, 247.5, 292.5, 337.5)
+    # North pole of the J2000 ecliptic, in the ICRS frame positions are given in
+    ECLIPTIC_POLE = ecliptic_J2000_frame.rotation_at(None)[2]
+
+    def _calculate_moon_phase(self, t, state=None):
         """
         Calculate the moon phase for a given time
+
+        When `t` is a Time array a list with one phase per time is returned.
+        Passing the request's observer state reuses its moon and sun
+        observations instead of evaluating them again.
         """
         try:
+            if state is None:
+                state = self._observer_state(t)
+
             # Calculate the angular separation between moon and sun
-            moon = self.planets['moon']
-            sun = self.planets['sun']
+            moon = self.registry_bodies['moon']['body']
+            sun = self.registry_bodies['sun']['body']
             
             # Get geocentric positions
-            e = self.earth.at(t)
-            moon_geo = e.observe(moon)
-            sun_geo = e.observe(sun)
-            
-            # Calculate phase angle
-            phase_angle = moon_geo.separation_from(sun_geo).degrees
-            
-            # Determine phase name
-            if phase_angle < 22.5:
-                phase = "New Moon"
-            elif phase_angle < 67.5:
-                phase = "Waxing Crescent"
-            elif phase_angle < 112.5:
-                phase = "First Quarter"
-            elif phase_angle < 157.5:
-                phase = "Waxing Gibbous"
-            elif phase_angle < 202.5:
-                phase = "Full Moon"
-            elif phase_angle < 247.5:
-                phase = "Waning Gibbous"
-            elif phase_angle < 292.5:
-                phase = "Last Quarter"
-            else:
-                phase = "Waning Crescent"
+            moon_geo = state.observe(moon)
+            sun_geo = state.observe(sun)
             
-            # Convert to phase percentage
-            # 0% = New Moon, 100% = Full Moon
-            phase_percentage = abs(math.cos(math.radians(phase_angle))) * 100
-            
-            return {
+            # Calculate the moon's elongation east of the sun
+            elongations = self._elongations(moon_geo.position.au, sun_geo.position.au)
+
+            phases = self._moon_phases(np.atleast_1d(elongations))
+            return phases if t.shape else phases[0]
+        except Exception as e:
+            report_error(logger, 'Moon phase', e)
+            error = {
                 "moon_phase": {
-                    "phase": phase,
-                    "angle": phase_angle,
-                    "percentage": phase_percentage
+                    "error": str(e)
                 }
             }
-        except Exception as e:
-            logger.error(f"Moon phase calculation error: {e}")
-            return {
+            return [error] * len(t) if t.shape else error
+
+    def _elongations(self, moon_au, sun_au):
+        """
+        Elongation of the moon east of the sun, 0-360 degrees
+
+        The separation alone only runs from 0 to 180 degrees; the side of the
+        sun the moon is on, seen from the ecliptic pole, tells waxing (east)
+        from waning (west).
+        """
+        separations = np.degrees(angle_between(moon_au, sun_au))
+        waxing = self.ECLIPTIC_POLE.dot(np.cross(sun_au, moon_au, axis=0)) >= 0
+        return np.where(waxing, separations, 360.0 - separations)
+
+    def _moon_phases(self, elongations):
+        """
+        Moon phase entries for an array of elongations in degrees
+
+        The eight names are the 45-degree buckets of the elongation and are
+        kept for compatibility; exact times of the principal phases come
+        from /api/astronomy/events/. `angle` is the moon-sun separation.
+        """
+        elongations = np.mod(elongations, 360.0)
+        phase_angles = np.where(elongations > 180.0, 360.0 - elongations, elongations)
+
+        # Determine phase name
+        phase_indices = np.searchsorted(self.MOON_PHASE_BOUNDS, elongations, side='right') % len(self.MOON_PHASE_NAMES)
+
+        # Convert to phase percentage
+        # 0% = New Moon, 100% = Full Moon
+        phase_percentages = np.abs(np.cos(np.radians(phase_angles))) * 100
+
+        return [
+            {
                 "moon_phase": {
-                    "error": str(e)
+                    "phase": self.MOON_PHASE_NAMES[index],
+                    "angle": angle,
+                    "elongation": elongation,
+                    "percentage": percentage
                 }
             }
+            for index, angle, elongation, percentage in zip(
+                phase_indices.tolist(), phase_angles.tolist(), elongations.tolist(), phase_percentages.tolist()
+            )
+        ]
+
     def _ensure_timezone(self, date):
         """
         Ensure the date is timezone-aware
@@ -380,13 +663,8 @@ class CelestialCalculator:
             return date.replace(tzinfo=pytz.UTC)
         return date
 
-    def _generate_dates(self, start_date, end_date):
+    def _generate_dates(self, start_date, end_date, step=DAY_SECONDS):
         """
         Generate a list of dates from start to end
         """
-        current = start_date
-        dates = []
-        while current <= end_date:
-            dates.append(current)
-            current += timedelta(days=1)
-        return dates
+        return TimeGrid.from_range(start_date, end_date, step).dates()
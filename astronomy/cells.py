@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from django.conf import settings
+
+import math
+import threading
+
+DEFAULT_LOCATION_CELLS = {
+    "SCHEME": "decimal",
+    "PRECISION": 4,
+    "ELEVATION_PRECISION": 0,
+    "TRACKED_CELLS": 10000,
+}
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+class LocationCells:
+    """
+    Spatial quantization of observer locations
+
+    Every location in a cell is snapped to the cell's representative point,
+    so nearby observers share cached results. `max_error_degrees` bounds the
+    great-circle angle between a location and its representative; the
+    observer's zenith moves by no more than that, and so do the altitudes
+    returned. Elevations are rounded to `elevation_precision` decimals.
+
+    snap() also counts requests per cell: `share_rate` is the fraction of
+    requests landing in one of the last `tracked_cells` cells seen.
+    """
+    scheme = None
+
+    def __init__(self, precision, elevation_precision=0, tracked_cells=10000):
+        self.precision = precision
+        self.elevation_precision = elevation_precision
+        self.tracked_cells = tracked_cells
+        self.requests = 0
+        self.shared = 0
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_error_degrees(self):
+        # The straight (latitude, longitude) path from a corner to the centre
+        # is at least as long as the great circle between them
+        latitude_step, longitude_step = self.steps
+        return math.hypot(latitude_step, longitude_step) / 2
+
+    def quantize(self, latitude, longitude, elevation=0):
+        """
+        Representative (latitude, longitude, elevation) of the location's cell
+        """
+        latitude, longitude = self._representative(float(latitude), float(longitude))
+        return latitude, longitude, round(float(elevation), self.elevation_precision)
+
+    def key(self, latitude, longitude, elevation=0):
+        """
+        String identifying the location's cell and rounded elevation
+        """
+        latitude, longitude, elevation = self.quantize(latitude, longitude, elevation)
+        return f"{latitude}:{longitude}:{elevation}"
+
+    def snap(self, latitude, longitude, elevation=0):
+        """
+        quantize() for a request, counted in the sharing figures
+        """
+        key = self.key(latitude, longitude, elevation)
+        with self._lock:
+            self.requests += 1
+            if key in self._cells:
+                self.shared += 1
+                self._cells.move_to_end(key)
+            else:
+                self._cells[key] = None
+                if len(self._cells) > self.tracked_cells:
+                    self._cells.popitem(last=False)
+        return self.quantize(latitude, longitude, elevation)
+
+    def stats(self):
+        return {
+            'max_error_degrees': self.max_error_degrees,
+            'requests': self.requests,
+            'cells': len(self._cells),
+            'share_rate': self.shared / self.requests if self.requests else 0.0,
+        }
+
+
+class DecimalCells(LocationCells):
+    """
+    Latitude and longitude rounded to `precision` decimal degrees (4 ~ 11 m)
+    """
+    scheme = 'decimal'
+
+    @property
+    def steps(self):
+        return 10.0 ** -self.precision, 10.0 ** -self.precision
+
+    def _representative(self, latitude, longitude):
+        return round(latitude, self.precision), round(longitude, self.precision)
+
+
+class GeohashCells(LocationCells):
+    """
+    Geohash cells of `precision` characters (5 ~ 4.9 x 4.9 km, 6 ~ 1.2 x 0.6 km)
+
+    The representative is the cell's centre and the key its geohash, so
+    keys read like the cells public geohash tools show.
+    """
+    scheme = 'geohash'
+
+    def __init__(self, precision, elevation_precision=0, tracked_cells=10000):
+        super().__init__(precision, elevation_precision, tracked_cells)
+        bits = precision * 5
+        self.latitude_bits = bits // 2
+        self.longitude_bits = bits - self.latitude_bits
+
+    @property
+    def steps(self):
+        return 180.0 / 2 ** self.latitude_bits, 360.0 / 2 ** self.longitude_bits
+
+    def key(self, latitude, longitude, elevation=0):
+        row, column = self._cell(float(latitude), float(longitude))
+        # Interleave the bits, longitude first, five to a character
+        bits = 0
+        for i in range(self.longitude_bits):
+            bits = (bits << 1) | (column >> (self.longitude_bits - 1 - i)) & 1
+            if i < self.latitude_bits:
+                bits = (bits << 1) | (row >> (self.latitude_bits - 1 - i)) & 1
+        geohash = ''.join(
+            GEOHASH_ALPHABET[(bits >> shift) & 31] for shift in range(self.precision * 5 - 5, -1, -5)
+        )
+        return f"{geohash}:{round(float(elevation), self.elevation_precision)}"
+
+    def _cell(self, latitude, longitude):
+        latitude_step, longitude_step = self.steps
+        longitude = (longitude + 180.0) % 360.0 - 180.0
+        row = min(int((latitude + 90.0) // latitude_step), 2 ** self.latitude_bits - 1)
+        column = min(int((longitude + 180.0) // longitude_step), 2 ** self.longitude_bits - 1)
+        return max(row, 0), column
+
+    def _representative(self, latitude, longitude):
+        latitude_step, longitude_step = self.steps
+        row, column = self._cell(latitude, longitude)
+        return -90.0 + (row + 0.5) * latitude_step, -180.0 + (column + 0.5) * longitude_step
+
+
+SCHEMES = {cells.scheme: cells for cells in (DecimalCells, GeohashCells)}
+
+
+def build_location_cells(config=None):
+    """
+    Build LocationCells from an ASTRONOMY_LOCATION_CELLS style dict
+    """
+    config = {**DEFAULT_LOCATION_CELLS, **(config or {})}
+    cells = SCHEMES.get(config['SCHEME'])
+    if cells is None:
+        raise ValueError(f"Unknown location cell scheme: {config['SCHEME']}")
+    return cells(config['PRECISION'], config['ELEVATION_PRECISION'], config['TRACKED_CELLS'])
+
+
+def configured_cells(config):
+    """
+    LocationCells for a result cache or observation store config: decimal
+    cells of its own PRECISION if it sets one (as before
+    ASTRONOMY_LOCATION_CELLS existed), the process-wide cells otherwise
+    """
+    if 'PRECISION' in config:
+        return build_location_cells({
+            'PRECISION': config['PRECISION'], 'ELEVATION_PRECISION': config.get('ELEVATION_PRECISION', 0)
+        })
+    return get_location_cells()
+
+
+_cells = None
+_cells_lock = threading.Lock()
+
+
+def get_location_cells():
+    """
+    Return the process-wide LocationCells, creating them on first use
+    """
+    global _cells
+    if _cells is None:
+        with _cells_lock:
+            if _cells is None:
+                _cells = build_location_cells(getattr(settings, 'ASTRONOMY_LOCATION_CELLS', None))
+    return _cells
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+# Columns per body, in order, and the observation field each comes from
+FLOAT_COLUMNS = (
+    ('distance_au', ('distance', 'au')),
+    ('distance_km', ('distance', 'km')),
+    ('right_ascension', ('position', 'equatorial', 'right_ascension')),
+    ('declination', ('position', 'equatorial', 'declination')),
+)
+HORIZONTAL_COLUMNS = (
+    ('altitude', ('position', 'horizontal', 'altitude')),
+    ('azimuth', ('position', 'horizontal', 'azimuth')),
+    ('above_horizon', ('position', 'horizontal', 'above_horizon')),
+    ('airmass', ('position', 'horizontal', 'airmass')),
+)
+MOON_PHASE_COLUMNS = (
+    ('moon_phase_angle', ('moon_phase', 'moon_phase', 'angle')),
+    ('moon_phase_elongation', ('moon_phase', 'moon_phase', 'elongation')),
+    ('moon_phase_percentage', ('moon_phase', 'moon_phase', 'percentage')),
+)
+
+
+def to_columns(data):
+    """
+    Columnar form of a get_celestial_objects_data result
+
+    The time axis is sent once, as POSIX seconds in `time`, and each body
+    carries one list per field indexed like it: the float fields, then the
+    constellation abbreviation and, for the moon, the phase name; fields a
+    request did not select have no column. Observation
+    dates are in the timezone of `metadata.dates.from`. A body that failed,
+    or whose observations failed, has an `error` instead of columns; one
+    whose horizontal coordinates or moon phases failed has a
+    `horizontal_error` or `moon_phase_error` instead of those columns.
+    """
+    celestial_objects = data.get('celestial_objects', [])
+    time = None
+    columnar_objects = []
+
+    for object_details in celestial_objects:
+        entry = {'id': object_details['id'], 'name': object_details['name']}
+        observations = object_details.get('observations')
+        if observations is None:
+            entry['error'] = object_details.get('error')
+            columnar_objects.append(entry)
+            continue
+        failed = next((observation['error'] for observation in observations if 'error' in observation), None)
+        if failed is not None:
+            entry['error'] = failed
+            columnar_objects.append(entry)
+            continue
+
+        if time is None:
+            time = [datetime.fromisoformat(observation['date']).timestamp() for observation in observations]
+
+        first = observations[0] if observations else {}
+        specs = [(name, path) for name, path in FLOAT_COLUMNS if _has(first, path)]
+        if 'horizontal' in first.get('position', {}):
+            specs += HORIZONTAL_COLUMNS
+        elif 'horizontal_error' in first.get('position', {}):
+            entry['horizontal_error'] = first['position']['horizontal_error']
+        moon_phase = 'moon_phase' in first
+        if moon_phase:
+            moon_phase_error = next(
+                (
+                    observation['moon_phase']['moon_phase']['error'] for observation in observations
+                    if 'error' in observation['moon_phase']['moon_phase']
+                ),
+                None
+            )
+            if moon_phase_error is not None:
+                entry['moon_phase_error'] = moon_phase_error
+                moon_phase = False
+            else:
+                specs += MOON_PHASE_COLUMNS
+
+        columns = {name: [_field(observation, path) for observation in observations] for name, path in specs}
+        if 'constellation' in first:
+            columns['constellation'] = [observation['constellation']['short'] for observation in observations]
+        if moon_phase:
+            columns['moon_phase'] = [observation['moon_phase']['moon_phase']['phase'] for observation in observations]
+        entry['columns'] = columns
+        columnar_objects.append(entry)
+
+    return {
+        'metadata': data.get('metadata'),
+        'time': time or [],
+        'celestial_objects': columnar_objects,
+    }
+
+
+def _has(observation, path):
+    value = observation
+    for key in path[:-1]:
+        value = value.get(key)
+        if value is None:
+            return False
+    return path[-1] in value
+
+
+def _field(observation, path):
+    value = observation
+    for key in path:
+        value = value[key]
+    return value
@@ -0,0 +1,114 @@
+from skyfield.api import load_constellation_names
+from skyfield.functions import load_bundled_npy
+from skyfield.timelib import Time, julian_date_of_besselian_epoch
+import numpy as np
+
+import threading
+
+
+class ConstellationIndex:
+    """
+    Constellation lookup over the official IAU boundaries.
+
+    The boundaries (Delporte 1930) are defined on the B1875 equator, so
+    ICRS coordinates are precessed to B1875 before the lookup. Skyfield's
+    bundled boundary table splits the sky into a grid of RA strips and Dec
+    bands; here each axis gets a uniform bucket table on top of it, with
+    buckets narrower than the closest pair of boundaries. A lookup is then
+    two array reads and one comparison per axis, for scalars or arrays alike.
+    """
+
+    def __init__(self):
+        arrays = load_bundled_npy('constellations.npz')
+        sorted_ra = arrays['sorted_ra']
+        sorted_dec = arrays['sorted_dec']
+        self.radec_to_index = arrays['radec_to_index']
+        self.abbreviations = arrays['indexed_abbreviations']
+
+        # ICRS -> mean equator and equinox of B1875 (frame bias, precession, nutation)
+        self.to_b1875 = Time(None, julian_date_of_besselian_epoch(1875)).M
+
+        self._ra_axis = self._bucket_axis(sorted_ra, 0.0, 24.0)
+        self._dec_axis = self._bucket_axis(sorted_dec, -90.0, 90.0)
+
+        # One response dict per constellation, shared by every lookup
+        names = dict(load_constellation_names())
+        self.constellations = [
+            {'id': abbreviation.lower(), 'short': abbreviation, 'name': names[abbreviation]}
+            for abbreviation in self.abbreviations.tolist()
+        ]
+
+    @staticmethod
+    def _bucket_axis(edges, low, high):
+        """
+        Map uniform buckets to the number of boundaries below each bucket
+        """
+        # Half the minimum gap keeps at most one boundary per bucket, with
+        # room to spare for rounding in the bucket computation
+        width = np.diff(edges).min() / 2
+        count = int(np.ceil((high - low) / width))
+        starts = low + np.arange(count) * width
+        buckets = np.searchsorted(edges, starts, side='left').astype(np.int16)
+        padded = np.append(edges, np.inf)
+        return buckets, padded, low, 1.0 / width
+
+    @staticmethod
+    def _axis_index(value, axis, side):
+        """
+        Equivalent of np.searchsorted(edges, value, side) via the bucket table
+        """
+        buckets, padded, low, scale = axis
+        bucket = np.clip(((value - low) * scale).astype(np.int64), 0, len(buckets) - 1)
+        first = buckets[bucket]
+        candidate = padded[first]
+        if side == 'left':
+            return first + (candidate < value)
+        return first + (candidate <= value)
+
+    def indices_b1875(self, ra_hours, dec_degrees):
+        """
+        Constellation indices for RA (hours) and Dec (degrees) of B1875
+        """
+        ra_hours = np.asarray(ra_hours, dtype=float) % 24.0
+        dec_degrees = np.asarray(dec_degrees, dtype=float)
+        i = self._axis_index(ra_hours, self._ra_axis, 'left')
+        j = self._axis_index(dec_degrees, self._dec_axis, 'right')
+        return self.radec_to_index[i, j]
+
+    def indices(self, ra_degrees, dec_degrees):
+        """
+        Constellation indices for ICRS RA and Dec, both in degrees
+        """
+        ra = np.radians(np.asarray(ra_degrees, dtype=float))
+        dec = np.radians(np.asarray(dec_degrees, dtype=float))
+        cos_dec = np.cos(dec)
+        vector = np.array([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+        x, y, z = np.einsum('ij,j...->i...', self.to_b1875, vector)
+        ra_hours = np.degrees(np.arctan2(y, x)) / 15.0
+        dec_degrees = np.degrees(np.arctan2(z, np.hypot(x, y)))
+        return self.indices_b1875(ra_hours, dec_degrees)
+
+    def lookup(self, ra_degrees, dec_degrees):
+        """
+        Constellation dict for an ICRS position, or a list of them for arrays
+        """
+        indices = self.indices(ra_degrees, dec_degrees)
+        if np.ndim(indices) == 0:
+            return self.constellations[int(indices)]
+        return [self.constellations[index] for index in indices.ravel().tolist()]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_constellation_index():
+    """
+    Return the process-wide constellation index, building it on first use
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ConstellationIndex()
+    return _index
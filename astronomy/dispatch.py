@@ -0,0 +1,164 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from .cache import get_result_cache
+from .celestial_calculator import CelestialCalculator, merge_chunk_entry
+from .store import get_observation_store
+
+import asyncio
+import contextvars
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """
+    Raised when every worker is busy and the queue is full
+    """
+
+
+class CalculationCancelled(Exception):
+    """
+    Raised inside a calculation whose client has gone away
+    """
+
+
+class CalculationPool:
+    """
+    Bounded executor that runs CPU-bound calculations off the event loop.
+
+    At most `workers` calculations run at once and `queue_size` more wait;
+    beyond that `run` raises PoolSaturated straight away, so an overloaded
+    server answers quickly instead of queueing without bound. A slot is only
+    released when the work actually stops, including after cancellation.
+    """
+
+    def __init__(self, workers, queue_size, kind='thread'):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.kind = kind
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix='astronomy'
+                        )
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        Run func(*args, cancel) in the pool and await its result
+
+        `cancel` is a threading.Event set when the awaiting task is cancelled
+        (the client disconnected), for func to check between steps. Process
+        pools get None: only work that has not started can be cancelled there.
+        """
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise PoolSaturated()
+            self.pending += 1
+
+        if self.kind == 'thread':
+            # The request's context goes along so its stage timings reach its Server-Timing header
+            cancel = threading.Event()
+            call = (contextvars.copy_context().run, func)
+        else:
+            cancel = None
+            call = (func,)
+        try:
+            future = self.executor.submit(*call, *args, cancel)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            if cancel is not None:
+                cancel.set()
+            with self._lock:
+                self.cancelled += 1
+            raise
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            if future is not None and not future.cancelled():
+                self.completed += 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled,
+        }
+
+
+def compute_celestial_data(latitude, longitude, elevation, start_date, end_date, step, use_cache,
+                           bodies=None, fields=None, cancel=None):
+    """
+    get_celestial_objects_data for a pool worker, computed chunk by chunk so
+    a cancelled request stops at the next chunk boundary
+    """
+    cache = get_result_cache() if use_cache else None
+    store = get_observation_store() if use_cache else None
+    calculator = CelestialCalculator(latitude, longitude, elevation, bodies=bodies, store=store, fields=fields)
+    chunk_size = getattr(settings, 'ASTRONOMY_STREAM_CHUNK_SIZE', 256)
+    entries = calculator.iter_celestial_objects_data(start_date, end_date, chunk_size, cache=cache, step=step)
+
+    result_data = next(entries)
+    objects = {}
+    for entry in entries:
+        if cancel is not None and cancel.is_set():
+            raise CalculationCancelled()
+        merge_chunk_entry(objects, entry)
+
+    result_data['celestial_objects'] = list(objects.values())
+    return result_data
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_calculation_pool():
+    """
+    Return the process-wide calculation pool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = CalculationPool(
+                    getattr(settings, 'ASTRONOMY_ASYNC_WORKERS', 4),
+                    getattr(settings, 'ASTRONOMY_ASYNC_QUEUE_SIZE', 16),
+                    getattr(settings, 'ASTRONOMY_ASYNC_EXECUTOR', 'thread'),
+                )
+    return _pool
@@ -0,0 +1,190 @@
+from skyfield.api import Loader
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .metrics import record
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bodies exposed by the API: (id, kernel segment, display name, type)
+CELESTIAL_BODY_DEFINITIONS = (
+    ('sun', 'sun', 'Sun', 'direct'),
+    ('moon', 'moon', 'Moon', 'direct'),
+    ('mercury', 'mercury barycenter', 'Mercury', 'barycenter'),
+    ('venus', 'venus barycenter', 'Venus', 'barycenter'),
+    ('mars', 'mars barycenter', 'Mars', 'barycenter'),
+    ('jupiter', 'jupiter barycenter', 'Jupiter', 'barycenter'),
+    ('saturn', 'saturn barycenter', 'Saturn', 'barycenter'),
+    ('uranus', 'uranus barycenter', 'Uranus', 'barycenter'),
+    ('neptune', 'neptune barycenter', 'Neptune', 'barycenter'),
+    ('pluto', 'pluto barycenter', 'Pluto', 'barycenter'),
+)
+
+
+class EphemerisRegistry:
+    """
+    Process-wide holder for the timescale, SPICE kernel and celestial bodies.
+
+    Everything here is read-only once loaded, so a single instance is shared
+    by every request (and every thread) in a worker. The kernel's segments
+    are memory-mapped read-only at load time; when the registry is loaded in
+    a pre-fork master, every worker inherits the mappings and the kernel
+    pages are shared through the page cache instead of copied per worker.
+    """
+
+    def __init__(self, data_dir=None, ephemeris=None):
+        self.data_dir = str(data_dir or getattr(settings, 'ASTRONOMY_DATA_DIR', '.'))
+        self.ephemeris = ephemeris or getattr(settings, 'ASTRONOMY_EPHEMERIS', 'de440s.bsp')
+        self.ts = None
+        self.planets = None
+        self.earth = None
+        self.celestial_bodies = None
+        self.coverage = None
+        self.load_seconds = None
+        self.loaded_pid = None
+        self.mapped_bytes = 0
+        self.reuse_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.celestial_bodies is not None
+
+    def load(self):
+        """
+        Load the timescale and kernel once; later calls are no-ops
+        """
+        if self.loaded:
+            return self
+
+        with self._lock:
+            if self.loaded:
+                return self
+
+            started = time.perf_counter()
+            loader = Loader(self.data_dir)
+
+            # Load timescale
+            ts = loader.timescale()
+
+            # Load comprehensive SPICE kernel
+            planets = loader(self.ephemeris)
+            mapped_bytes = self._map_segments(planets)
+
+            # Comprehensive celestial bodies dictionary
+            celestial_bodies = {
+                obj_id: {
+                    'body': planets[segment],
+                    'name': name,
+                    'type': body_type
+                }
+                for obj_id, segment, name, body_type in CELESTIAL_BODY_DEFINITIONS
+            }
+
+            self.ts = ts
+            self.planets = planets
+            self.earth = planets['earth']
+            self.coverage = self._coverage(ts, planets)
+            self.load_seconds = time.perf_counter() - started
+            record('kernel_load', self.load_seconds)
+            self.loaded_pid = os.getpid()
+            self.mapped_bytes = mapped_bytes
+            # Published last: `loaded` flips only once everything is in place
+            self.celestial_bodies = celestial_bodies
+
+            logger.info(f"Ephemeris {self.ephemeris} loaded in {self.load_seconds * 1000:.1f} ms")
+
+        return self
+
+    @staticmethod
+    def _coverage(ts, planets):
+        """
+        (start, end) UTC datetimes every segment of the kernel covers, less a
+        day at each end for the light time of the outer planets
+        """
+        start_jd = max(segment.spk_segment.start_jd for segment in planets.segments) + 1
+        end_jd = min(segment.spk_segment.end_jd for segment in planets.segments) - 1
+        return ts.tdb_jd(start_jd).utc_datetime(), ts.tdb_jd(end_jd).utc_datetime()
+
+    @staticmethod
+    def _map_segments(planets):
+        """
+        Memory-map every segment's coefficients now rather than on first use
+
+        jplephem maps segments lazily and read-only; doing it up front means
+        a pre-fork master hands the mappings to its workers. Returns the
+        number of bytes mapped.
+        """
+        mapped_bytes = 0
+        for segment in planets.segments:
+            try:
+                _, _, coefficients = segment.spk_segment._data
+            except (AttributeError, ValueError):
+                # Segment types jplephem cannot map stay lazy
+                continue
+            mapped_bytes += coefficients.nbytes
+        return mapped_bytes
+
+    @property
+    def inherited(self):
+        """
+        True in a forked worker whose registry was loaded by the parent
+        """
+        return self.loaded and self.loaded_pid != os.getpid()
+
+    def acquire(self):
+        """
+        Return the loaded registry and count the per-request load it avoided
+        """
+        if not self.loaded:
+            return self.load()
+        with self._lock:
+            self.reuse_count += 1
+        return self
+
+    def stats(self):
+        """
+        Load time and the cumulative time saved by not reloading per request
+        """
+        load_seconds = self.load_seconds or 0.0
+        return {
+            'ephemeris': self.ephemeris,
+            'loaded': self.loaded,
+            'load_seconds': load_seconds,
+            'inherited': self.inherited,
+            'mapped_bytes': self.mapped_bytes,
+            'reuse_count': self.reuse_count,
+            'saved_seconds': load_seconds * self.reuse_count,
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Return the process-wide ephemeris registry, creating it on first use
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = EphemerisRegistry()
+    return _registry
+
+
+@receiver(setting_changed)
+def _reset_registry(setting, **kwargs):
+    """
+    Drop the registry when the kernel it was loaded from changes (override_settings)
+    """
+    global _registry
+    if setting in ('ASTRONOMY_DATA_DIR', 'ASTRONOMY_EPHEMERIS'):
+        with _registry_lock:
+            _registry = None
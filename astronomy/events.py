@@ -0,0 +1,213 @@
+from datetime import datetime
+from skyfield import almanac
+from .celestial_calculator import CelestialCalculator, logger
+from .ephemeris import get_registry
+from .reporting import report_error
+import pytz
+
+
+EVENT_KINDS = ('rise', 'set', 'culmination', 'twilight', 'moon_phase')
+BODY_EVENT_KINDS = ('rise', 'set', 'culmination')
+
+# Sun altitude (degrees) bounding each twilight, with the event names for
+# the sun crossing it on the way up and on the way down
+TWILIGHT_BOUNDARIES = (
+    (-18.0, 'astronomical_dawn', 'astronomical_dusk'),
+    (-12.0, 'nautical_dawn', 'nautical_dusk'),
+    (-6.0, 'civil_dawn', 'civil_dusk'),
+)
+
+# Margin searched on each side of an uncached range, so that events at its
+# ends are bracketed and refined like the rest before being cut to the range
+SEARCH_PADDING_SECONDS = 3600
+
+
+class EventCalculator(CelestialCalculator):
+    """
+    Rise, set, culmination, twilight and moon phase times for one observer
+
+    Events are found by root finding (Skyfield's almanac routines) rather
+    than by sampling. Without a cache only the requested range is searched.
+    With a ResultCache events are computed for whole UTC calendar months, so
+    every request for the same location cell and month after the first is
+    served from the cache; the requested range is cut out of them.
+    """
+
+    def get_events(self, start_date, end_date, kinds=EVENT_KINDS, cache=None):
+        """
+        Retrieve the events of `kinds` between two dates
+        """
+        start_date, end_date = self._check_range(start_date, end_date)
+        start, end = start_date.timestamp(), end_date.timestamp()
+        location_key = cache.location_key(self.location) if cache is not None else None
+
+        tables = {}
+        for kind in kinds:
+            if cache is None:
+                tables[kind] = [
+                    self._compute_events(kind, start - SEARCH_PADDING_SECONDS, end + SEARCH_PADDING_SECONDS)
+                ]
+            else:
+                tables[kind] = [
+                    self._month_events(kind, month, cache, location_key) for month in _months(start_date, end_date)
+                ]
+
+        def label(timestamp):
+            return datetime.fromtimestamp(timestamp, start_date.tzinfo).isoformat()
+
+        def in_range(rows):
+            return [row for window_rows in rows for row in window_rows if start <= row[0] <= end]
+
+        result_data = {'metadata': self._metadata(start_date, end_date)}
+
+        body_kinds = [kind for kind in BODY_EVENT_KINDS if kind in tables]
+        if body_kinds:
+            result_data['celestial_objects'] = []
+            for obj_id, obj_data in self.celestial_bodies.items():
+                errors = [
+                    table[obj_id] for kind in body_kinds for table in tables[kind]
+                    if isinstance(table[obj_id], str)
+                ]
+                if errors:
+                    result_data['celestial_objects'].append({
+                        'id': obj_id,
+                        'name': obj_data['name'],
+                        'error': errors[0]
+                    })
+                    continue
+
+                events = []
+                for kind in body_kinds:
+                    for timestamp, altitude in in_range([table[obj_id] for table in tables[kind]]):
+                        event = {'type': kind, 'date': label(timestamp)}
+                        if altitude is not None:
+                            event['altitude'] = altitude
+                        events.append((timestamp, event))
+                events.sort(key=lambda item: item[0])
+
+                result_data['celestial_objects'].append({
+                    'id': obj_id,
+                    'name': obj_data['name'],
+                    'events': [event for _, event in events]
+                })
+
+        if 'twilight' in tables:
+            result_data['twilight'] = [
+                {'type': name, 'date': label(timestamp)}
+                for timestamp, name in in_range(tables['twilight'])
+            ]
+
+        if 'moon_phase' in tables:
+            result_data['moon_phases'] = [
+                {'phase': name, 'date': label(timestamp)}
+                for timestamp, name in in_range(tables['moon_phase'])
+            ]
+
+        return result_data
+
+    def _month_events(self, kind, month, cache, location_key):
+        """
+        Events of one kind over a UTC (year, month), from the cache when possible
+
+        Moon phases do not depend on the observer, so they are cached once
+        for every location.
+        """
+        def compute():
+            events = self._compute_events(kind, *_month_bounds(*month))
+            # Body tables holding an error are not worth keeping
+            failed = isinstance(events, dict) and any(isinstance(rows, str) for rows in events.values())
+            return events, not failed
+
+        year, number = month
+        cell = 'geocentric' if kind == 'moon_phase' else location_key
+        return cache.get_or_compute_value(f"astronomy:events:{cell}:{year}-{number:02d}:{kind}", compute)
+
+    def _compute_events(self, kind, start, end):
+        """
+        Events of one kind from `start` up to `end` (POSIX timestamps),
+        limited to the kernel's coverage
+        """
+        first, last = get_registry().coverage
+        start, end = max(start, first.timestamp()), min(end, last.timestamp())
+        t0 = self.ts.from_datetime(datetime.fromtimestamp(start, pytz.UTC))
+        t1 = self.ts.from_datetime(datetime.fromtimestamp(end, pytz.UTC))
+
+        def within(rows):
+            # Refinement can move an event found near an end just outside the window
+            return [row for row in rows if start <= row[0] < end]
+
+        if kind == 'twilight':
+            return within(self._twilight(t0, t1))
+        if kind == 'moon_phase':
+            times, phases = almanac.find_discrete(t0, t1, almanac.moon_phases(self.planets))
+            return within(sorted(
+                zip(self._timestamps(times), [almanac.MOON_PHASES[phase] for phase in phases.tolist()])
+            ))
+
+        observer = self.earth + self.location
+        events = {}
+        for obj_id, obj_data in self.celestial_bodies.items():
+            try:
+                events[obj_id] = within(self._body_events(kind, observer, obj_data['body'], t0, t1))
+            except Exception as e:
+                report_error(logger, f"Finding {kind} events", e, obj_id)
+                events[obj_id] = str(e)
+        return events
+
+    def _body_events(self, kind, observer, body, t0, t1):
+        """
+        (timestamp, altitude or None) rows; altitude is given for culminations
+        """
+        if kind == 'culmination':
+            times = almanac.find_transits(observer, body, t0, t1)
+            altitudes = observer.at(times).observe(body).apparent().altaz()[0].degrees
+            return list(zip(self._timestamps(times), altitudes.tolist()))
+
+        find = almanac.find_risings if kind == 'rise' else almanac.find_settings
+        times, crosses = find(observer, body, t0, t1)
+        # Where the body never reaches the horizon the routine returns the
+        # closest approach instead; those are not events
+        times = times[crosses]
+        return [(timestamp, None) for timestamp in self._timestamps(times)]
+
+    def _twilight(self, t0, t1):
+        """
+        Dawn and dusk at each twilight boundary, as (timestamp, name) rows
+        """
+        observer = self.earth + self.location
+        sun = self.registry_bodies['sun']['body']
+        rows = []
+        for horizon_degrees, dawn, dusk in TWILIGHT_BOUNDARIES:
+            for find, name in ((almanac.find_risings, dawn), (almanac.find_settings, dusk)):
+                times, crosses = find(observer, sun, t0, t1, horizon_degrees=horizon_degrees)
+                rows.extend((timestamp, name) for timestamp in self._timestamps(times[crosses]))
+        rows.sort()
+        return rows
+
+    def _timestamps(self, times):
+        """
+        POSIX timestamps of a Skyfield Time array
+        """
+        if not len(times):
+            return []
+        return [date.timestamp() for date in times.utc_datetime()]
+
+
+def _months(start_date, end_date):
+    """
+    (year, month) of every UTC calendar month from start_date to end_date
+    """
+    start = start_date.astimezone(pytz.UTC)
+    end = end_date.astimezone(pytz.UTC)
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _month_bounds(year, month):
+    """
+    POSIX timestamps of the start of a UTC month and of the next one
+    """
+    following = (year + 1, 1) if month == 12 else (year, month + 1)
+    return datetime(year, month, 1, tzinfo=pytz.UTC).timestamp(), datetime(*following, 1, tzinfo=pytz.UTC).timestamp()
@@ -0,0 +1,108 @@
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+import threading
+
+# Observer-independent quantities for one body at one instant. The apparent
+# GCRS position is kept so topocentric alt/az can be derived from it.
+GeocentricRecord = namedtuple('GeocentricRecord', [
+    'position_au',
+    'distance_au',
+    'distance_km',
+    'right_ascension',
+    'declination',
+    'constellation',
+    'moon_phase',
+])
+
+
+class GeocentricEphemeris:
+    """
+    Process-wide store of geocentric results keyed by (body, instant).
+
+    Nothing in a GeocentricRecord depends on the observer, so every location
+    requesting the same instants shares one geocentric pass; only the cheap
+    topocentric rotation is done per request.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, obj_ids, instants):
+        """
+        Return ({obj_id: [record or None per instant]}, sorted missing indices)
+
+        Instants are POSIX timestamps.
+        """
+        records = {}
+        missing = set()
+        with self._lock:
+            for obj_id in obj_ids:
+                body_records = records[obj_id] = []
+                for i, instant in enumerate(instants):
+                    record = self._entries.get((obj_id, instant))
+                    if record is None:
+                        missing.add(i)
+                    else:
+                        self._entries.move_to_end((obj_id, instant))
+                    body_records.append(record)
+            found = sum(record is not None for body_records in records.values() for record in body_records)
+            self.hits += found
+            self.misses += len(obj_ids) * len(instants) - found
+        return records, sorted(missing)
+
+    def store(self, obj_id, instants, records):
+        if not self.max_entries:
+            return
+        with self._lock:
+            for instant, record in zip(instants, records):
+                self._entries[(obj_id, instant)] = record
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+        }
+
+
+_ephemeris = None
+_ephemeris_lock = threading.Lock()
+
+
+def get_geocentric_ephemeris():
+    """
+    Return the process-wide geocentric store
+    """
+    global _ephemeris
+    if _ephemeris is None:
+        with _ephemeris_lock:
+            if _ephemeris is None:
+                _ephemeris = GeocentricEphemeris(getattr(settings, 'ASTRONOMY_GEOCENTRIC_CACHE_ENTRIES', 100000))
+    return _ephemeris
+
+
+@receiver(setting_changed)
+def _reset_geocentric_ephemeris(setting, **kwargs):
+    """
+    Drop the stored records when the kernel they came from changes
+    """
+    global _ephemeris
+    if setting in ('ASTRONOMY_DATA_DIR', 'ASTRONOMY_EPHEMERIS', 'ASTRONOMY_GEOCENTRIC_CACHE_ENTRIES'):
+        with _ephemeris_lock:
+            _ephemeris = None
@@ -0,0 +1,331 @@
+from collections import OrderedDict
+from django.conf import settings
+from pathlib import Path
+import numpy as np
+
+import ipaddress
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEOLOCATION = {
+    "IP_DATABASE": None,
+    "DEM_DIR": None,
+    "CACHE_SIZE": 65536,
+    "DEM_TILES": 16,
+    "USE_X_FORWARDED_FOR": False,
+}
+
+# SRTM marks samples without data with this value
+DEM_VOID = -32768
+
+# IPv4 addresses are looked up as IPv4-mapped IPv6 (::ffff:a.b.c.d)
+IPV4_MAPPED_PREFIX = b'\x00' * 10 + b'\xff\xff'
+
+
+def address_key(ip):
+    """
+    16-byte big-endian key of an IPv4 or IPv6 address (string or integer); raises ValueError
+    """
+    address = ipaddress.ip_address(ip)
+    if address.version == 4:
+        return IPV4_MAPPED_PREFIX + address.packed
+    return address.packed
+
+
+class IPDatabase:
+    """
+    IP address ranges and their locations, held as sorted arrays
+
+    `starts` and `ends` are the inclusive bounds of non-overlapping ranges as
+    16-byte big-endian keys (numpy 'S16', which compares like the addresses),
+    sorted by start; a lookup is one binary search over `starts`. Each range
+    has a latitude, a longitude and an index into `places`, the (city,
+    region, country) names stored in the JSON metadata. Arrays are memory
+    mapped so pre-forked workers share the pages.
+    """
+
+    def __init__(self, starts, ends, latitudes, longitudes, places, metadata):
+        self.starts = starts
+        self.ends = ends
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.places = places
+        self.metadata = metadata
+        self.place_names = [tuple(names) for names in metadata['places']]
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a database from (start, end, latitude, longitude, city, region, country) rows
+        """
+        rows = sorted(
+            ((address_key(start), address_key(end), *rest) for start, end, *rest in rows),
+            key=lambda row: row[0]
+        )
+        for previous, row in zip(rows, rows[1:]):
+            if row[0] <= previous[1]:
+                raise ValueError(f"Overlapping ranges at {ipaddress.ip_address(row[0])}")
+
+        place_index = {}
+        places = [place_index.setdefault(tuple(row[4:7]), len(place_index)) for row in rows]
+        return cls(
+            np.array([row[0] for row in rows], dtype='S16'),
+            np.array([row[1] for row in rows], dtype='S16'),
+            np.array([row[2] for row in rows], dtype=float),
+            np.array([row[3] for row in rows], dtype=float),
+            np.array(places, dtype=np.int32),
+            {'places': [list(names) for names in place_index]},
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a database written by save() (the build_ip_database command)
+        """
+        path = Path(path)
+        arrays = [
+            np.load(path.with_suffix(f'.{name}.npy'), mmap_mode='r')
+            for name in ('starts', 'ends', 'latitudes', 'longitudes', 'places')
+        ]
+        return cls(*arrays, json.loads(path.with_suffix('.json').read_text()))
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for name in ('starts', 'ends', 'latitudes', 'longitudes', 'places'):
+            np.save(path.with_suffix(f'.{name}.npy'), getattr(self, name))
+        path.with_suffix('.json').write_text(json.dumps(self.metadata))
+
+    def lookup(self, keys):
+        """
+        Index of the range holding each key (an 'S16' array), -1 where none does
+        """
+        indices = np.searchsorted(self.starts, keys, side='right') - 1
+        found = indices >= 0
+        found[found] = keys[found] <= self.ends[indices[found]]
+        return np.where(found, indices, -1)
+
+
+class ElevationModel:
+    """
+    Terrain heights from SRTM .hgt tiles in one directory
+
+    A tile named like N35E051.hgt covers latitudes 35 to 36 and longitudes
+    51 to 52 with a square grid of big-endian int16 metres, rows running
+    north to south (1201 samples a side at 3", 3601 at 1"). Tiles are memory
+    mapped on first use and the `max_tiles` most recently used stay mapped.
+    Heights are interpolated bilinearly; points in missing tiles or
+    interpolated from a void sample have none.
+    """
+
+    def __init__(self, directory, max_tiles=16):
+        self.directory = Path(directory)
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def elevations(self, latitudes, longitudes):
+        """
+        Heights in metres, NaN where unknown
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        heights = np.full(latitudes.shape, np.nan)
+        souths = np.floor(latitudes).astype(int)
+        wests = np.floor(longitudes).astype(int)
+        for south, west in set(zip(souths.tolist(), wests.tolist())):
+            tile = self.tile(south, west)
+            if tile is None:
+                continue
+            inside = (souths == south) & (wests == west)
+            heights[inside] = self._interpolate(tile, south + 1 - latitudes[inside], longitudes[inside] - west)
+        return heights
+
+    def tile(self, south, west):
+        """
+        The mapped tile whose south-west corner is (south, west), or None
+        """
+        key = (south, west)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        name = f"{'N' if south >= 0 else 'S'}{abs(south):02d}{'E' if west >= 0 else 'W'}{abs(west):03d}.hgt"
+        path = self.directory / name
+        tile = None
+        if path.exists():
+            side = int(round((path.stat().st_size // 2) ** 0.5))
+            tile = np.memmap(path, dtype='>i2', mode='r', shape=(side, side))
+
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    @staticmethod
+    def _interpolate(tile, rows, columns):
+        # `rows` and `columns` are fractions of the tile from its north-west corner
+        cells = tile.shape[0] - 1
+        y = rows * cells
+        x = columns * cells
+        i = np.clip(np.floor(y).astype(int), 0, cells - 1)
+        j = np.clip(np.floor(x).astype(int), 0, cells - 1)
+        fy = y - i
+        fx = x - j
+        corners = np.array([tile[i, j], tile[i, j + 1], tile[i + 1, j], tile[i + 1, j + 1]], dtype=float)
+        weights = np.array([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx])
+        void = (corners == DEM_VOID) & (weights > 0)
+        return np.where(void.any(axis=0), np.nan, (corners * weights).sum(axis=0))
+
+
+class GeoResolver:
+    """
+    Offline IP address -> location
+
+    Addresses are looked up in an IPDatabase and, when an ElevationModel is
+    given, the elevation at the range's coordinates in its tiles; nothing
+    leaves the process. The last `cache_size` resolved addresses are kept
+    in an LRU. resolve_many() resolves the addresses it has not seen with
+    one binary search and one elevation pass over all of them.
+    """
+
+    def __init__(self, database, elevation=None, cache_size=65536):
+        self.database = database
+        self.elevation = elevation
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, ip):
+        """
+        {latitude, longitude, elevation, city, region, country} for an
+        address, or None when it is invalid or in no range; elevation is
+        None when unknown
+        """
+        return self.resolve_many([ip])[0]
+
+    def resolve_many(self, ips):
+        """
+        resolve() for many addresses at once
+        """
+        ips = [str(ip).strip() for ip in ips]
+        results = {}
+        with self._lock:
+            for ip in ips:
+                if ip in self._entries:
+                    self._entries.move_to_end(ip)
+                    results[ip] = self._entries[ip]
+            self.hits += sum(ip in results for ip in ips)
+            self.misses += sum(ip not in results for ip in ips)
+
+        pending = [ip for ip in dict.fromkeys(ips) if ip not in results]
+        if pending:
+            resolved = self._resolve(pending)
+            results.update(resolved)
+            with self._lock:
+                self._entries.update(resolved)
+                while len(self._entries) > self.cache_size:
+                    self._entries.popitem(last=False)
+        return [results[ip] for ip in ips]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'ranges': len(self.database),
+        }
+
+    def _resolve(self, ips):
+        keys = []
+        valid = []
+        for ip in ips:
+            try:
+                keys.append(address_key(ip))
+                valid.append(ip)
+            except ValueError:
+                pass
+        results = dict.fromkeys(ips)
+        if not valid:
+            return results
+
+        indices = self.database.lookup(np.array(keys, dtype='S16'))
+        found = indices >= 0
+        indices = indices[found]
+        latitudes = self.database.latitudes[indices]
+        longitudes = self.database.longitudes[indices]
+        elevations = np.full(len(indices), np.nan)
+        if self.elevation is not None and len(indices):
+            elevations = self.elevation.elevations(latitudes, longitudes)
+
+        places = self.database.places[indices].tolist()
+        for ip, latitude, longitude, elevation, place in zip(
+            np.array(valid)[found].tolist(), latitudes.tolist(), longitudes.tolist(), elevations.tolist(), places
+        ):
+            city, region, country = self.database.place_names[place]
+            results[ip] = {
+                'latitude': latitude,
+                'longitude': longitude,
+                'elevation': None if elevation != elevation else elevation,
+                'city': city,
+                'region': region,
+                'country': country,
+            }
+        return results
+
+
+def client_address(meta):
+    """
+    The client's address from a request's META: REMOTE_ADDR, or the first
+    X-Forwarded-For entry when USE_X_FORWARDED_FOR trusts the proxy in front
+    """
+    config = {**DEFAULT_GEOLOCATION, **(getattr(settings, 'ASTRONOMY_GEOLOCATION', None) or {})}
+    forwarded = meta.get('HTTP_X_FORWARDED_FOR')
+    if config['USE_X_FORWARDED_FOR'] and forwarded:
+        return forwarded.split(',')[0].strip()
+    return meta.get('REMOTE_ADDR', '')
+
+
+def build_resolver(config=None):
+    """
+    Build a GeoResolver from an ASTRONOMY_GEOLOCATION style dict, or None
+    without an IP database
+    """
+    config = {**DEFAULT_GEOLOCATION, **(config or {})}
+    if not config['IP_DATABASE']:
+        return None
+    database = IPDatabase.load(config['IP_DATABASE'])
+    elevation = ElevationModel(config['DEM_DIR'], config['DEM_TILES']) if config['DEM_DIR'] else None
+    return GeoResolver(database, elevation, config['CACHE_SIZE'])
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """
+    Return the process-wide GeoResolver, or None when there is no usable IP database
+    """
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                try:
+                    _resolver = build_resolver(getattr(settings, 'ASTRONOMY_GEOLOCATION', None)) or False
+                except (OSError, ValueError) as e:
+                    logger.warning(f"IP database unavailable, locations will not be resolved: {e}")
+                    _resolver = False
+    return _resolver or None
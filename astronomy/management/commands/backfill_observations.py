@@ -0,0 +1,58 @@
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.store import build_observation_store
+from astronomy.timegrid import TimeGrid
+import pytz
+
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute observations for one location over a date range and store them "
+        "in the Observation table, so requests for that range are read back instead of computed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latitude', type=float, required=True)
+        parser.add_argument('--longitude', type=float, required=True)
+        parser.add_argument('--elevation', type=float, default=0)
+        parser.add_argument('--start', required=True, help="Range start (ISO 8601)")
+        parser.add_argument('--end', required=True, help="Range end (ISO 8601)")
+        parser.add_argument('--step-hours', type=float, default=24.0, help="Sample spacing in hours")
+        parser.add_argument('--chunk-size', type=int, default=2048, help="Samples computed and inserted at a time")
+
+    def handle(self, *args, **options):
+        start = self._parse(options['start'])
+        end = self._parse(options['end'])
+        if start >= end:
+            raise CommandError("--start must be before --end")
+
+        # Backfilling writes to the store even where requests do not read it yet
+        config = getattr(settings, 'ASTRONOMY_OBSERVATION_STORE', None) or {}
+        store = build_observation_store({**config, 'ENABLED': True})
+        latitude, longitude, elevation = store.quantize(options['latitude'], options['longitude'], options['elevation'])
+        calculator = CelestialCalculator(latitude, longitude, elevation, store=store)
+
+        grid = TimeGrid.from_range(start, end, options['step_hours'] * 3600)
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+        for offset in range(0, len(grid), chunk_size):
+            calculator._calculate_objects(grid[offset:offset + chunk_size])
+            done = min(offset + chunk_size, len(grid))
+            self.stdout.write(f"  {done}/{len(grid)} samples ({time.perf_counter() - started:.1f} s)")
+
+        stats = store.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed and stored {stats['misses']} observations for {latitude}, {longitude}, {elevation} m "
+            f"({stats['hits']} were already stored) in {time.perf_counter() - started:.1f} s"
+        ))
+
+    def _parse(self, value):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+        return date if date.tzinfo else date.replace(tzinfo=pytz.UTC)
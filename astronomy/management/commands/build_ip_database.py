@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from astronomy.geolocation import IPDatabase
+
+import csv
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert an IP range CSV (start, end, latitude, longitude and optional city, region, "
+        "country columns) into the sorted arrays the offline location resolver searches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help="CSV file; addresses as text (1.2.3.0, 2001:db8::) or integers")
+        parser.add_argument(
+            '--columns',
+            help="Comma-separated column names for files without a header row, "
+                 "e.g. start,end,continent,country,region,city,latitude,longitude for DB-IP Lite"
+        )
+        parser.add_argument('--output', help="Output path without extension, default ASTRONOMY_GEOLOCATION IP_DATABASE")
+
+    def handle(self, *args, **options):
+        output = options['output'] or (getattr(settings, 'ASTRONOMY_GEOLOCATION', None) or {}).get('IP_DATABASE')
+        if not output:
+            raise CommandError("Set ASTRONOMY_GEOLOCATION['IP_DATABASE'] or pass --output")
+
+        started = time.perf_counter()
+        fieldnames = options['columns'].split(',') if options['columns'] else None
+        rows = []
+        try:
+            with open(options['csv'], newline='', encoding='utf-8') as f:
+                for line, row in enumerate(csv.DictReader(f, fieldnames=fieldnames), start=2 - bool(fieldnames)):
+                    try:
+                        rows.append((
+                            self._address(row['start']),
+                            self._address(row['end']),
+                            float(row['latitude']),
+                            float(row['longitude']),
+                            row.get('city') or '',
+                            row.get('region') or '',
+                            row.get('country') or '',
+                        ))
+                    except (KeyError, TypeError, ValueError) as e:
+                        raise CommandError(f"Invalid row at line {line}: {e}")
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['csv']}: {e}")
+
+        try:
+            database = IPDatabase.from_rows(rows)
+        except ValueError as e:
+            raise CommandError(str(e))
+        database.save(output)
+
+        self.stdout.write(
+            f"{len(database)} ranges, {len(database.place_names)} places "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Written to {output}.*.npy"))
+
+    def _address(self, value):
+        value = value.strip()
+        return int(value) if value.isdigit() else value
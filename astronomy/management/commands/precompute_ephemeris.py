@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from astronomy.ephemeris import get_registry
+from astronomy.tables import EphemerisTables, tables_path, tabulate
+import pytz
+
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Tabulate apparent geocentric positions of every body on a fine grid "
+        "so requests inside the window interpolate instead of evaluating the kernel"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Window start (ISO 8601), default two years ago")
+        parser.add_argument('--end', help="Window end (ISO 8601), default two years ahead")
+        parser.add_argument('--step-hours', type=float, default=1.0, help="Grid spacing in hours")
+        parser.add_argument('--output', help="Output path without extension, default from the settings")
+
+    def handle(self, *args, **options):
+        now = datetime.now(pytz.UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = self._parse(options['start']) if options['start'] else now - timedelta(days=2 * 366)
+        end = self._parse(options['end']) if options['end'] else now + timedelta(days=2 * 366)
+        if start >= end:
+            raise CommandError("--start must be before --end")
+
+        output = options['output'] or tables_path()
+        if output is None:
+            raise CommandError("Set ASTRONOMY_TABLES_DIR or pass --output")
+
+        registry = get_registry().acquire()
+        started = time.perf_counter()
+        max_error = getattr(settings, 'ASTRONOMY_TABLES_MAX_ERROR_ARCSEC', 0.01)
+        data, metadata = tabulate(registry, start, end, options['step_hours'] / 24.0, max_error)
+        EphemerisTables.save(output, data, metadata)
+
+        self.stdout.write(
+            f"Tabulated {len(metadata['bodies'])} bodies x {data.shape[2]} samples "
+            f"({data.nbytes / 1e6:.1f} MB) from {metadata['start']} to {metadata['end']} "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+        for obj_id, error in metadata['max_error_arcsec'].items():
+            live = len(metadata['live_intervals'].get(obj_id, []))
+            self.stdout.write(f"  {obj_id:<10} max interpolation error {error:.2e} arcsec, {live} intervals left live")
+        self.stdout.write(self.style.SUCCESS(f"Written to {output}.npy"))
+
+    def _parse(self, value):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+        return date if date.tzinfo else date.replace(tzinfo=pytz.UTC)
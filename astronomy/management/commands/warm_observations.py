@@ -0,0 +1,218 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from pathlib import Path
+from astronomy.cache import DEFAULT_RESULT_CACHE, build_result_cache, get_result_cache
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.ephemeris import get_registry
+from astronomy.store import build_observation_store
+from astronomy.timegrid import TimeGrid
+import numpy as np
+import pytz
+
+import csv
+import json
+import os
+import time
+
+TARGETS = ('cache', 'store')
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute observations for every location in a file over a date span, "
+        "one task per location and calendar year across a process pool, and write "
+        "them to the result cache and/or the observation store. Finished tasks are "
+        "recorded so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('locations', help="CSV with latitude,longitude[,elevation] columns, or a JSON list of locations")
+        parser.add_argument('--start', required=True, help="Span start (ISO 8601)")
+        parser.add_argument('--end', required=True, help="Span end (ISO 8601)")
+        parser.add_argument('--step-hours', type=float, default=24.0, help="Sample spacing in hours")
+        parser.add_argument(
+            '--targets', nargs='+', choices=TARGETS,
+            help="Default: the store, and the result cache when it is shared between processes"
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+        parser.add_argument('--progress-file', help="Record of finished tasks, default <locations>.progress")
+        parser.add_argument('--restart', action='store_true', help="Ignore the progress file and start over")
+
+    def handle(self, *args, **options):
+        start = self._parse(options['start'])
+        end = self._parse(options['end'])
+        if start >= end:
+            raise CommandError("--start must be before --end")
+        step = options['step_hours'] * 3600
+
+        use_cache, use_store = self._targets(options['targets'])
+        locations = self._read_locations(options['locations'], use_cache)
+
+        progress_path = Path(options['progress_file'] or f"{options['locations']}.progress")
+        if options['restart'] and progress_path.exists():
+            progress_path.unlink()
+        finished = set(progress_path.read_text().split()) if progress_path.exists() else set()
+
+        all_tasks = list(self._tasks(locations, start, end, step))
+        tasks = [task for task in all_tasks if task[0] not in finished]
+        total_samples = sum(len(task[3]) for task in tasks)
+        skipped = len(all_tasks) - len(tasks)
+        self.stdout.write(
+            f"{len(locations)} locations, {len(tasks)} tasks to run ({skipped} already done), "
+            f"{total_samples} samples x {len(get_registry().acquire().celestial_bodies)} bodies, "
+            f"{options['workers']} workers"
+        )
+        if not tasks:
+            return
+
+        started = time.perf_counter()
+        done_samples = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor, \
+                progress_path.open('a') as progress:
+            pending = {
+                executor.submit(_warm, location, task_start, offsets, use_cache, use_store): (key, len(offsets))
+                for key, location, task_start, offsets in tasks
+            }
+            done_tasks = 0
+            failed = []
+            while pending:
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    key, samples = pending.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Left out of the progress file, so the next run retries it
+                        self.stderr.write(f"  {key} failed: {e}")
+                        failed.append(key)
+                        continue
+                    progress.write(f"{key}\n")
+                    progress.flush()
+
+                    done_tasks += 1
+                    done_samples += samples
+                    elapsed = time.perf_counter() - started
+                    rate = done_samples / elapsed
+                    remaining = (total_samples - done_samples) / rate if rate else 0
+                    self.stdout.write(
+                        f"  [{done_tasks}/{len(tasks)}] {key}: {samples} samples, "
+                        f"{rate:.0f} samples/s, about {remaining:.0f} s left"
+                    )
+
+        elapsed = time.perf_counter() - started
+        if failed:
+            raise CommandError(f"{len(failed)} tasks failed; run the command again to retry them")
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {done_samples} samples in {elapsed:.1f} s ({done_samples / elapsed:.0f} samples/s)"
+        ))
+
+    def _targets(self, targets):
+        """
+        (use_cache, use_store) for --targets, or by default for what the
+        settings allow
+        """
+        problem = self._cache_problem()
+        if targets is None:
+            if problem is not None:
+                self.stdout.write(f"Not warming the result cache: {problem}")
+            return problem is None, True
+        if 'cache' in targets and problem is not None:
+            raise CommandError(f"{problem}; drop 'cache' from --targets")
+        return 'cache' in targets, 'store' in targets
+
+    def _cache_problem(self):
+        """
+        Why the configured result cache cannot be warmed from the worker
+        processes, or None when it can
+        """
+        config = getattr(settings, 'ASTRONOMY_RESULT_CACHE', None) or {}
+        if build_result_cache(config) is None:
+            return "the result cache is disabled"
+        config = {**DEFAULT_RESULT_CACHE, **config}
+        if config['BACKEND'] == 'lru':
+            return "the in-process LRU result cache lives in each server process"
+        cache = caches[config['CACHE_ALIAS']]
+        if isinstance(cache, (LocMemCache, DummyCache)):
+            return (
+                f"the '{config['CACHE_ALIAS']}' cache is a {type(cache).__name__}, "
+                f"which is not shared between processes"
+            )
+        return None
+
+    def _read_locations(self, path, use_cache):
+        """
+        Locations from the file as (latitude, longitude, elevation), rounded
+        like the view rounds request locations
+        """
+        try:
+            text = Path(path).read_text()
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        try:
+            if path.endswith('.json'):
+                rows = json.loads(text)
+            else:
+                rows = list(csv.DictReader(text.splitlines()))
+            locations = [
+                (float(row['latitude']), float(row['longitude']), float(row.get('elevation') or 0))
+                for row in rows
+            ]
+        except (KeyError, TypeError, ValueError) as e:
+            raise CommandError(f"Invalid locations file {path}: {e}")
+
+        rounding = get_result_cache() if use_cache else _writable_store()
+        return list(dict.fromkeys(rounding.quantize(*location) for location in locations))
+
+    def _tasks(self, locations, start, end, step):
+        """
+        (key, location, start, offsets) per location and calendar year of the span
+        """
+        grid = TimeGrid.from_range(start, end, step)
+        instants = grid.instants
+        boundaries = [
+            datetime(year, 1, 1, tzinfo=pytz.UTC).timestamp()
+            for year in range(start.astimezone(pytz.UTC).year + 1, end.astimezone(pytz.UTC).year + 1)
+        ]
+        pieces = np.split(grid.offsets, np.searchsorted(instants, boundaries))
+        for location in locations:
+            for offsets in pieces:
+                if not len(offsets):
+                    continue
+                year = datetime.fromtimestamp(start.timestamp() + offsets[0], tz=pytz.UTC).year
+                key = f"{location[0]}:{location[1]}:{location[2]}:{year}:{step:g}:{start.isoformat()}"
+                yield key, location, start, offsets
+
+    def _parse(self, value):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+        return date if date.tzinfo else date.replace(tzinfo=pytz.UTC)
+
+
+def _writable_store():
+    # Warming writes to the store even where requests do not read it yet
+    config = getattr(settings, 'ASTRONOMY_OBSERVATION_STORE', None) or {}
+    return build_observation_store({**config, 'ENABLED': True})
+
+
+def _init_worker():
+    get_registry().load()
+
+
+def _warm(location, start, offsets, use_cache, use_store, chunk_size=2048):
+    cache = get_result_cache() if use_cache else None
+    calculator = CelestialCalculator(*location, store=_writable_store() if use_store else None)
+    grid = TimeGrid(start, offsets)
+    for offset in range(0, len(grid), chunk_size):
+        chunk = grid[offset:offset + chunk_size]
+        if cache is not None:
+            cache.get_or_compute(calculator, chunk)
+        else:
+            calculator._calculate_objects(chunk)
@@ -0,0 +1,77 @@
+from .ephemeris import get_registry
+from .tables import get_ephemeris_tables
+
+import os
+import resource
+
+# Reported figures and the /proc/<pid>/smaps_rollup fields (kB) they sum
+SMAPS_FIELDS = {
+    'rss': ('Rss',),
+    'pss': ('Pss',),
+    'shared': ('Shared_Clean', 'Shared_Dirty'),
+    'private': ('Private_Clean', 'Private_Dirty'),
+}
+
+
+def memory_usage(pid=None):
+    """
+    Memory of a process in MB
+
+    On Linux this reads smaps_rollup, whose PSS splits shared pages between
+    the processes mapping them, so summing PSS over workers gives their real
+    footprint. Elsewhere only the peak RSS of the current process is known.
+    """
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    try:
+        with open(path) as rollup:
+            lines = rollup.readlines()
+    except OSError:
+        if pid is not None and pid != os.getpid():
+            return {}
+        # ru_maxrss is in kB on Linux and bytes on macOS
+        scale = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+        return {'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale}
+
+    fields = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        if value.strip().endswith('kB'):
+            fields[name] = int(value.split()[0])
+    return {
+        f"{figure}_mb": sum(fields.get(name, 0) for name in names) / 1024
+        for figure, names in SMAPS_FIELDS.items()
+    }
+
+
+def startup_report():
+    """
+    Ephemeris load time and memory of the current process
+    """
+    registry = get_registry()
+    tables = get_ephemeris_tables()
+    return {
+        'pid': os.getpid(),
+        'ephemeris': registry.stats(),
+        'tables_bytes': tables.data.nbytes if tables is not None else 0,
+        'memory': memory_usage(),
+    }
+
+
+def describe_startup(prefix='Worker'):
+    """
+    One-line summary of startup_report() for server logs
+    """
+    report = startup_report()
+    ephemeris = report['ephemeris']
+    memory = report['memory']
+    if ephemeris['inherited']:
+        load = "inherited from the master"
+    elif ephemeris['loaded']:
+        load = f"loaded in {ephemeris['load_seconds'] * 1000:.1f} ms"
+    else:
+        load = "not loaded"
+    sizes = ', '.join(f"{name[:-3].upper()} {value:.1f} MB" for name, value in memory.items())
+    return (
+        f"{prefix} {report['pid']}: ephemeris {load} "
+        f"({ephemeris['mapped_bytes'] / 1e6:.1f} MB kernel, {report['tables_bytes'] / 1e6:.1f} MB tables mapped); {sizes}"
+    )
@@ -0,0 +1,262 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from bisect import bisect_left
+from contextvars import ContextVar
+from django.conf import settings
+from time import perf_counter
+
+import threading
+
+DEFAULT_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': False,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    # Histogram bucket upper bounds in seconds
+    'BUCKETS': (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+}
+
+# Stage timings of the request being handled, for its Server-Timing header
+_request_timings = ContextVar('astronomy_request_timings', default=None)
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus sense: count per upper bound, sum and count
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class Metrics:
+    """
+    Process-wide stage timings and counters
+
+    Stage spans (see span()) feed one histogram per stage; requests feed a
+    histogram per view and a counter per view and status. Everything is
+    per process: each gunicorn worker and each pool process keeps its own.
+    """
+
+    def __init__(self, buckets=DEFAULT_METRICS['BUCKETS']):
+        self.buckets = tuple(buckets)
+        self.stages = {}
+        self.requests = {}
+        self.responses = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_request(self, view, status, seconds):
+        with self._lock:
+            histogram = self.requests.get(view)
+            if histogram is None:
+                histogram = self.requests[view] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            key = (view, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self, gauges=None):
+        """
+        Prometheus text exposition of everything recorded, plus `gauges`
+        ({name: {labels tuple: value}}) sampled by the caller
+        """
+        with self._lock:
+            lines = [
+                '# HELP astronomy_stage_seconds Time spent in each calculation stage.',
+                '# TYPE astronomy_stage_seconds histogram',
+            ]
+            for stage, histogram in sorted(self.stages.items()):
+                lines.extend(histogram.lines('astronomy_stage_seconds', f'stage="{stage}"'))
+
+            lines += [
+                '# HELP astronomy_request_seconds Request handling time per view.',
+                '# TYPE astronomy_request_seconds histogram',
+            ]
+            for view, histogram in sorted(self.requests.items()):
+                lines.extend(histogram.lines('astronomy_request_seconds', f'view="{view}"'))
+
+            lines += [
+                '# HELP astronomy_requests_total Responses per view and status code.',
+                '# TYPE astronomy_requests_total counter',
+            ]
+            for (view, status), count in sorted(self.responses.items()):
+                lines.append(f'astronomy_requests_total{{view="{view}",status="{status}"}} {count}')
+
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE astronomy_{name}_total counter')
+                lines.append(f'astronomy_{name}_total {value}')
+
+        for name, samples in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE astronomy_{name} gauge')
+            for labels, value in samples.items():
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f'astronomy_{name}{{{label_text}}} {value}' if label_text else f'astronomy_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class _Span:
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, perf_counter() - self.started)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+_metrics = None
+_metrics_config = None
+_metrics_lock = threading.Lock()
+
+
+def metrics_config():
+    return {**DEFAULT_METRICS, **(getattr(settings, 'ASTRONOMY_METRICS', None) or {})}
+
+
+def get_metrics():
+    """
+    Return the process-wide Metrics, or None when ASTRONOMY_METRICS disables them
+    """
+    global _metrics, _metrics_config
+    if _metrics_config is None:
+        with _metrics_lock:
+            if _metrics_config is None:
+                config = metrics_config()
+                if config['ENABLED']:
+                    _metrics = Metrics(config['BUCKETS'])
+                _metrics_config = config
+    return _metrics
+
+
+def span(stage):
+    """
+    Context manager timing one stage into the `stage` histogram; a no-op
+    when metrics are disabled
+    """
+    metrics = get_metrics()
+    if metrics is None:
+        return NULL_SPAN
+    return _Span(metrics, stage)
+
+
+def record(stage, seconds):
+    """
+    Add an already measured duration to the `stage` histogram
+    """
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.observe(stage, seconds)
+
+
+def increment(name, value=1):
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.increment(name, value)
+
+
+def server_timing(timings, total):
+    """
+    Server-Timing header value for the stage timings of one request
+    """
+    entries = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in timings.items()]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Times every request routed to a named view into the request histogram,
+    and with SERVER_TIMING adds a Server-Timing header listing the stages it
+    went through. Stages computed in another process (the parallel or
+    process pools) count in that process's metrics, not in the header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        metrics = get_metrics()
+        if metrics is None:
+            return self.get_response(request)
+        token = _request_timings.set({})
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+            return self._finish(metrics, request, response, started)
+        finally:
+            _request_timings.reset(token)
+
+    async def _acall(self, request):
+        metrics = get_metrics()
+        if metrics is None:
+            return await self.get_response(request)
+        token = _request_timings.set({})
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self._finish(metrics, request, response, started)
+        finally:
+            _request_timings.reset(token)
+
+    def _finish(self, metrics, request, response, started):
+        elapsed = perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return response
+        metrics.observe_request(match.url_name, response.status_code, elapsed)
+        if _metrics_config['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(_request_timings.get(), elapsed)
+        return response
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("astronomy", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="observation",
+            name="constellation",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="observations",
+                to="astronomy.constellation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="observation",
+            name="elevation",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="observation",
+            name="latitude",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="observation",
+            name="longitude",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="celestialbody",
+            name="constellation",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="celestial_bodies",
+                to="astronomy.constellation",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="observation",
+            name="altitude_degrees",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="observation",
+            name="azimuth_degrees",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="observation",
+            name="magnitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="observation",
+            index=models.Index(fields=["body", "date"], name="observation_body_date"),
+        ),
+        migrations.AddConstraint(
+            model_name="observation",
+            constraint=models.UniqueConstraint(
+                fields=("latitude", "longitude", "elevation", "body", "date"),
+                name="observation_location_body_date",
+            ),
+        ),
+    ]
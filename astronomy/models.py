@@ -11,7 +11,9 @@ class Constellation(models.Model):
 class CelestialBody(models.Model):
     id = models.CharField(max_length=50, primary_key=True)
     name = models.CharField(max_length=100)
-    constellation = models.ForeignKey(Constellation, related_name='celestial_bodies', on_delete=models.CASCADE)
+    constellation = models.ForeignKey(
+        Constellation, related_name='celestial_bodies', on_delete=models.CASCADE, null=True, blank=True
+    )
 
     def __str__(self):
         return self.name
@@ -19,14 +21,33 @@ class CelestialBody(models.Model):
 class Observation(models.Model):
     body = models.ForeignKey(CelestialBody, related_name='observations', on_delete=models.CASCADE)
     date = models.DateTimeField()
+    # Observer location cell, rounded as by the observation store
+    latitude = models.FloatField(default=0)
+    longitude = models.FloatField(default=0)
+    elevation = models.FloatField(default=0)
     distance_au = models.FloatField()
     distance_km = models.FloatField()
-    altitude_degrees = models.FloatField()
-    azimuth_degrees = models.FloatField()
+    altitude_degrees = models.FloatField(null=True, blank=True)
+    azimuth_degrees = models.FloatField(null=True, blank=True)
     right_ascension_hours = models.FloatField()
     declination_degrees = models.FloatField()
-    magnitude = models.FloatField()
+    constellation = models.ForeignKey(
+        Constellation, related_name='observations', on_delete=models.PROTECT, null=True, blank=True
+    )
+    magnitude = models.FloatField(null=True, blank=True)
+    # Moon-Sun separation in degrees, from which the moon phase is derived
     elongation = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['body', 'date'], name='observation_body_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['latitude', 'longitude', 'elevation', 'body', 'date'],
+                name='observation_location_body_date',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.body.name} on {self.date}"
\ No newline at end of file
@@ -0,0 +1,117 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from .cache import get_result_cache
+from .celestial_calculator import CelestialCalculator, merge_chunk_entry
+from .ephemeris import get_registry
+from .store import get_observation_store
+from .timegrid import DAY_SECONDS, TimeGrid
+import numpy as np
+
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelCalculator:
+    """
+    Celestial data for long ranges computed across a pool of processes
+
+    The range is cut into time chunks of at most `chunk_size` samples; when
+    that leaves fewer chunks than workers, the bodies are split into groups
+    as well so every worker gets a share. Each worker process loads the
+    ephemeris once and keeps it for every task it runs. Chunks are merged
+    back in time order into the get_celestial_objects_data structure.
+    """
+
+    def __init__(self, workers, chunk_size=4096):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    def get_celestial_objects_data(self, latitude, longitude, elevation, start_date, end_date,
+                                   step=DAY_SECONDS, use_cache=False, bodies=None, fields=None):
+        """
+        Same result as CelestialCalculator.get_celestial_objects_data
+        """
+        calculator = CelestialCalculator(latitude, longitude, elevation, bodies=bodies, fields=fields)
+        start_date, end_date = calculator._check_range(start_date, end_date)
+        grid = TimeGrid.from_range(start_date, end_date, step)
+
+        futures = [
+            self.executor.submit(
+                _compute_task, latitude, longitude, elevation, start_date, offsets, task_bodies, use_cache, fields
+            )
+            for offsets, task_bodies in self.plan(grid, list(calculator.celestial_bodies))
+        ]
+
+        # Tasks are in time order, so merging as submitted keeps observations in order
+        objects = {}
+        for future in futures:
+            for entry in future.result():
+                merge_chunk_entry(objects, entry)
+
+        return {
+            'metadata': calculator._metadata(start_date, end_date),
+            'celestial_objects': [objects[obj_id] for obj_id in calculator.celestial_bodies if obj_id in objects],
+        }
+
+    def plan(self, grid, bodies):
+        """
+        (offsets, body ids) per task, in time order
+        """
+        chunks = max(1, math.ceil(len(grid) / self.chunk_size))
+        groups = min(len(bodies), max(1, math.ceil(self.workers / chunks)))
+        body_groups = [bodies[i::groups] for i in range(groups)]
+        return [
+            (offsets, body_group)
+            for offsets in np.array_split(grid.offsets, chunks)
+            for body_group in body_groups
+        ]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _init_worker():
+    get_registry().load()
+
+
+def _compute_task(latitude, longitude, elevation, start_date, offsets, bodies, use_cache, fields=None):
+    cache = get_result_cache() if use_cache else None
+    store = get_observation_store() if use_cache else None
+    calculator = CelestialCalculator(latitude, longitude, elevation, bodies=bodies, store=store, fields=fields)
+    grid = TimeGrid(start_date, offsets)
+    if cache is not None:
+        return cache.get_or_compute(calculator, grid)
+    return calculator._calculate_objects(grid)
+
+
+_parallel = None
+_parallel_lock = threading.Lock()
+
+
+def get_parallel_calculator():
+    """
+    Return the process-wide parallel calculator, or None when it is disabled
+    """
+    global _parallel
+    if _parallel is None:
+        with _parallel_lock:
+            if _parallel is None:
+                workers = getattr(settings, 'ASTRONOMY_PARALLEL_WORKERS', 0)
+                chunk_size = getattr(settings, 'ASTRONOMY_PARALLEL_CHUNK_SIZE', 4096)
+                _parallel = ParallelCalculator(workers, chunk_size) if workers > 1 else False
+    return _parallel or None
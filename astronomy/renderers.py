@@ -0,0 +1,102 @@
+from rest_framework.renderers import BaseRenderer
+from .columnar import to_columns
+
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON.
+
+    Streamed responses write their own lines; this renderer lets content
+    negotiation accept application/x-ndjson and renders non-streamed
+    payloads (errors) as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack of the columnar form (astronomy.columnar.to_columns)
+
+    Needs the msgpack package (requirements.txt); `available` is False
+    without it.
+    Payloads that are not celestial data (errors) are packed as they are.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    available = msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if 'celestial_objects' in data:
+            data = to_columns(data)
+        return msgpack.packb(data, use_bin_type=True)
+
+
+class ArrowRenderer(BaseRenderer):
+    """
+    Arrow IPC stream of the columnar form, one packed column per body field
+
+    The table has a `time` column (POSIX seconds) and `<body id>.<field>`
+    columns; constellations and moon phase names are dictionary encoded.
+    The response metadata, body names and any errors are stored as JSON in
+    the schema metadata under b'astronomy'. Needs the pyarrow package
+    (requirements.txt); `available` is False without it.
+    """
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+    available = pa is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        arrays = {}
+        if 'celestial_objects' in data:
+            columnar = to_columns(data)
+            arrays['time'] = pa.array(columnar['time'], type=pa.float64())
+            for entry in columnar['celestial_objects']:
+                for name, values in entry.pop('columns', {}).items():
+                    array = pa.array(values)
+                    if pa.types.is_string(array.type):
+                        array = array.dictionary_encode()
+                    arrays[f"{entry['id']}.{name}"] = array
+            metadata = {
+                'metadata': columnar['metadata'],
+                'celestial_objects': columnar['celestial_objects'],
+            }
+        else:
+            metadata = data
+
+        table = pa.table(arrays, metadata={b'astronomy': json.dumps(metadata).encode('utf-8')})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+# Columnar renderers whose optional dependency is installed
+COLUMNAR_RENDERERS = [renderer for renderer in (MessagePackRenderer, ArrowRenderer) if renderer.available]
@@ -0,0 +1,63 @@
+from django.conf import settings
+from .metrics import increment
+
+import threading
+import time
+
+
+class ErrorReporter:
+    """
+    Rate-limited logging of calculation errors
+
+    Errors are grouped by call site and exception type. The first of a group
+    in each `interval` seconds is logged with its traceback; the rest are
+    only counted, and the count is reported with the next record logged for
+    the group. One bad request therefore logs a handful of records rather
+    than one per body and chunk. Records carry `site`, `body`, `error_type`
+    and `suppressed` as extra attributes for structured handlers.
+    """
+
+    def __init__(self, interval=60.0):
+        self.interval = interval
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def report(self, logger, site, error, body=None):
+        increment('calculation_errors')
+        key = (site, type(error).__name__)
+        now = time.monotonic()
+        with self._lock:
+            logged_at, suppressed = self._groups.get(key, (None, 0))
+            if logged_at is not None and now - logged_at < self.interval:
+                self._groups[key] = (logged_at, suppressed + 1)
+                return
+            self._groups[key] = (now, 0)
+
+        message = f"{site} failed for {body}: {error}" if body else f"{site} failed: {error}"
+        if suppressed:
+            message += f" ({suppressed} similar errors suppressed)"
+        logger.error(
+            message,
+            exc_info=(type(error), error, error.__traceback__),
+            extra={'site': site, 'body': body, 'error_type': key[1], 'suppressed': suppressed},
+        )
+
+
+_reporter = None
+_reporter_lock = threading.Lock()
+
+
+def get_error_reporter():
+    """
+    Return the process-wide ErrorReporter, creating it on first use
+    """
+    global _reporter
+    if _reporter is None:
+        with _reporter_lock:
+            if _reporter is None:
+                _reporter = ErrorReporter(getattr(settings, 'ASTRONOMY_ERROR_LOG_INTERVAL', 60))
+    return _reporter
+
+
+def report_error(logger, site, error, body=None):
+    get_error_reporter().report(logger, site, error, body)
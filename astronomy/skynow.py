@@ -0,0 +1,164 @@
+from datetime import datetime
+from django.conf import settings
+from .celestial_calculator import CelestialCalculator
+from .metrics import span
+from .timegrid import TimeGrid
+import pytz
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SkySnapshot:
+    """
+    Geocentric records of every body at one tick instant
+    """
+
+    def __init__(self, instant, grid, times, records):
+        self.instant = instant
+        self.grid = grid
+        self.times = times
+        self.records = records
+
+
+class SkyNow:
+    """
+    The current sky, refreshed once per `tick` seconds and shared by every request
+
+    Time is bucketed to multiples of `tick`; a daemon thread computes the
+    geocentric records of every body at each bucket boundary, so a request
+    only derives the horizontal coordinates for its own location. A request
+    arriving before the thread has caught up computes the snapshot itself,
+    once, under the same lock. The thread stops after `idle_ticks` ticks
+    without requests and the next request starts it again.
+    """
+
+    def __init__(self, tick=10, idle_ticks=30):
+        self.tick = tick
+        self.idle_ticks = idle_ticks
+        self.refreshes = 0
+        self._last_request = 0.0
+        self._snapshot = None
+        self._calculator = None
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    def bucket(self, now=None):
+        """
+        POSIX timestamp of the tick containing `now` (default: the current time)
+        """
+        now = time.time() if now is None else now
+        return now - now % self.tick
+
+    def expires_in(self, now=None):
+        """
+        Seconds until the next tick
+        """
+        now = time.time() if now is None else now
+        return self.tick - now % self.tick
+
+    def snapshot(self, instant=None):
+        """
+        The snapshot of the tick containing `instant` (default: now)
+        """
+        instant = self.bucket() if instant is None else instant
+        self._last_request = time.time()
+        self._ensure_thread()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.instant != instant:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.instant != instant:
+                    snapshot = self._refresh(instant)
+        return snapshot
+
+    def observe(self, latitude, longitude, elevation, snapshot=None):
+        """
+        get_celestial_objects_data-shaped result for one location at the snapshot's instant
+        """
+        snapshot = snapshot or self.snapshot()
+        calculator = CelestialCalculator(latitude, longitude, elevation)
+        state = calculator._observer_state(snapshot.times)
+        date = snapshot.grid.start
+        horizontal = calculator._horizontal(snapshot.records, state)
+        return {
+            'metadata': {**calculator._metadata(date, date), 'tick': self.tick},
+            'celestial_objects': [
+                calculator._calculate_object_details(
+                    obj_id, obj_data, snapshot.grid, snapshot.times, state, snapshot.records[obj_id],
+                    horizontal.get(obj_id)
+                )
+                for obj_id, obj_data in calculator.celestial_bodies.items()
+            ],
+        }
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'tick': self.tick,
+            'refreshes': self.refreshes,
+            'age_seconds': time.time() - snapshot.instant if snapshot is not None else 0.0,
+        }
+
+    def _refresh(self, instant):
+        # Geocentric records do not depend on the observer; any location will do
+        if self._calculator is None:
+            self._calculator = CelestialCalculator(0, 0, 0)
+        calculator = self._calculator
+        with span('sky_now_refresh'):
+            grid = TimeGrid(datetime.fromtimestamp(instant, tz=pytz.UTC), [0.0])
+            times = grid.times(calculator.ts)
+            state = calculator._observer_state(times)
+            records = calculator._geocentric_records(calculator.celestial_bodies, grid, times, state)
+            snapshot = SkySnapshot(instant, grid, times, records)
+        # A request that straddled a tick boundary must not replace the newer snapshot
+        if self._snapshot is None or instant > self._snapshot.instant:
+            self._snapshot = snapshot
+        self.refreshes += 1
+        return snapshot
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked worker, whose parent's thread did not survive the fork
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='astronomy-sky-now', daemon=True)
+                self._thread.start()
+                self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.expires_in())
+            instant = self.bucket()
+            try:
+                with self._lock:
+                    if instant - self._last_request > self.idle_ticks * self.tick:
+                        self._thread_pid = None
+                        return
+                    if self._snapshot is None or self._snapshot.instant != instant:
+                        self._refresh(instant)
+            except Exception as e:
+                # Requests compute the snapshot themselves (and report the error) meanwhile
+                logger.error(f"Sky snapshot refresh failed: {e}")
+
+
+_sky_now = None
+_sky_now_lock = threading.Lock()
+
+
+def get_sky_now():
+    """
+    Return the process-wide SkyNow, creating it on first use
+    """
+    global _sky_now
+    if _sky_now is None:
+        with _sky_now_lock:
+            if _sky_now is None:
+                _sky_now = SkyNow(getattr(settings, 'ASTRONOMY_SKY_NOW_TICK', 10))
+    return _sky_now
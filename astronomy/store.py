@@ -0,0 +1,279 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from .celestial_calculator import airmass
+from .cells import DecimalCells, configured_cells
+from .constellations import get_constellation_index
+from .ephemeris import get_registry
+from .models import CelestialBody, Constellation, Observation
+import numpy as np
+import pytz
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+MICROSECOND = timedelta(microseconds=1)
+
+DEFAULT_OBSERVATION_STORE = {
+    "ENABLED": False,
+    "BATCH_SIZE": 2000,
+}
+
+
+class ObservationStore:
+    """
+    Write-through store of computed observations in the Observation table
+
+    Rows are keyed on the observer's location cell (LocationCells, as for the
+    result cache), the body and the instant. A request reads the rows covering its
+    range and only computes the (body, instant) pairs that are missing, which
+    are then bulk-inserted for the next request. Unlike the result cache the
+    rows are shared by every process and survive restarts.
+    """
+
+    def __init__(self, precision=4, elevation_precision=0, batch_size=2000, cells=None):
+        self.cells = cells or DecimalCells(precision, elevation_precision)
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._references_ready = False
+        self._constellations = None
+        self._lock = threading.Lock()
+
+    def quantize(self, latitude, longitude, elevation=0):
+        """
+        Snap a location to its cell's representative
+        """
+        return self.cells.quantize(latitude, longitude, elevation)
+
+    def cell(self, location):
+        return self.quantize(location.latitude.degrees, location.longitude.degrees, location.elevation.m)
+
+    def get_or_compute(self, calculator, grid):
+        """
+        Return the celestial objects for a TimeGrid, computing only what is not stored
+        """
+        cell = self.cell(calculator.location)
+        keys = np.round(grid.instants * 1e6).astype(np.int64).tolist()
+        stored = self.load(cell, list(calculator.celestial_bodies), grid)
+
+        missing = sorted({
+            i for obj_id in calculator.celestial_bodies for i, key in enumerate(keys) if key not in stored[obj_id]
+        })
+        bodies = len(calculator.celestial_bodies)
+        self._count((len(grid) - len(missing)) * bodies, len(missing) * bodies)
+
+        computed = {}
+        if missing:
+            for object_details in calculator._compute_objects(grid[missing]):
+                computed[object_details['id']] = object_details
+            self.save(cell, grid[missing], computed.values())
+
+        labels = grid.labels()
+        celestial_objects = []
+        for obj_id, obj_data in calculator.celestial_bodies.items():
+            object_details = computed.get(obj_id)
+            if object_details is not None and 'observations' not in object_details:
+                # Whole-body failure: report it as the calculator does
+                celestial_objects.append(object_details)
+                continue
+
+            fresh = dict(zip(missing, object_details['observations'])) if object_details else {}
+            body_rows = stored[obj_id]
+            observations = []
+            for i, (label, key) in enumerate(zip(labels, keys)):
+                row = body_rows.get(key)
+                observations.append(self._observation(calculator, label, row) if row is not None else fresh[i])
+
+            celestial_objects.append({
+                'id': obj_id,
+                'name': obj_data['name'],
+                'observations': observations
+            })
+
+        return celestial_objects
+
+    def load(self, cell, bodies, grid):
+        """
+        Stored rows for `bodies` over the grid's span, as body id -> {microseconds: row}
+        """
+        latitude, longitude, elevation = cell
+        rows = {obj_id: {} for obj_id in bodies}
+        if not len(grid):
+            return rows
+
+        first, last = grid.instants.min(), grid.instants.max()
+        queryset = Observation.objects.filter(
+            latitude=latitude,
+            longitude=longitude,
+            elevation=elevation,
+            body_id__in=bodies,
+            date__gte=self._datetime(first),
+            date__lte=self._datetime(last),
+        ).values_list(
+            'body_id', 'date', 'distance_au', 'distance_km', 'right_ascension_hours', 'declination_degrees',
+            'altitude_degrees', 'azimuth_degrees', 'constellation_id', 'elongation'
+        )
+        for row in queryset.iterator(chunk_size=self.batch_size):
+            # Rows stored before every body had horizontal coordinates are recomputed
+            if row[6] is not None:
+                rows[row[0]][(row[1] - EPOCH) // MICROSECOND] = row
+        return rows
+
+    def save(self, cell, grid, celestial_objects):
+        """
+        Bulk-insert computed observations
+
+        Existing rows for the same cell, body and instant are overwritten
+        where the database supports it (they may predate horizontal
+        coordinates for every body), and kept otherwise.
+        """
+        latitude, longitude, elevation = cell
+        dates = [self._datetime(instant) for instant in grid.instants.tolist()]
+        rows = []
+        for object_details in celestial_objects:
+            for date, observation in zip(dates, object_details.get('observations', ())):
+                if 'error' in observation or 'horizontal_error' in observation['position']:
+                    continue
+                equatorial = observation['position']['equatorial']
+                horizontal = observation['position'].get('horizontal', {})
+                moon_phase = observation.get('moon_phase', {}).get('moon_phase', {})
+                if 'error' in moon_phase:
+                    continue
+                rows.append(Observation(
+                    body_id=object_details['id'],
+                    date=date,
+                    latitude=latitude,
+                    longitude=longitude,
+                    elevation=elevation,
+                    distance_au=observation['distance']['au'],
+                    distance_km=observation['distance']['km'],
+                    right_ascension_hours=equatorial['right_ascension'],
+                    declination_degrees=equatorial['declination'],
+                    altitude_degrees=horizontal.get('altitude'),
+                    azimuth_degrees=horizontal.get('azimuth'),
+                    constellation_id=observation['constellation']['id'],
+                    elongation=moon_phase.get('elongation'),
+                ))
+
+        if not rows:
+            return
+        self._ensure_references()
+        with transaction.atomic():
+            if connection.features.supports_update_conflicts_with_target:
+                Observation.objects.bulk_create(
+                    rows,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['latitude', 'longitude', 'elevation', 'body', 'date'],
+                    update_fields=[
+                        'distance_au', 'distance_km', 'right_ascension_hours', 'declination_degrees',
+                        'altitude_degrees', 'azimuth_degrees', 'constellation', 'elongation'
+                    ],
+                )
+            else:
+                Observation.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def _observation(self, calculator, label, row):
+        """
+        Response observation rebuilt from a stored row
+        """
+        _, _, distance_au, distance_km, right_ascension, declination, altitude, azimuth, constellation, elongation = row
+        observation = {
+            'date': label,
+            'distance': {
+                'au': distance_au,
+                'km': distance_km
+            },
+            'position': {
+                'equatorial': {
+                    'right_ascension': right_ascension,
+                    'declination': declination
+                }
+            }
+        }
+        if altitude is not None:
+            observation['position']['horizontal'] = {
+                'altitude': altitude,
+                'azimuth': azimuth,
+                'above_horizon': altitude > 0,
+                'airmass': airmass(altitude).tolist()
+            }
+        observation['constellation'] = self._constellation(constellation)
+        if elongation is not None:
+            observation['moon_phase'] = calculator._moon_phases(np.array([elongation]))[0]
+        return observation
+
+    def _constellation(self, constellation_id):
+        if self._constellations is None:
+            self._constellations = {
+                constellation['id']: constellation for constellation in get_constellation_index().constellations
+            }
+        return self._constellations[constellation_id]
+
+    def _ensure_references(self):
+        """
+        Create the CelestialBody and Constellation rows observations point at, once per process
+        """
+        if self._references_ready:
+            return
+
+        registry = get_registry().acquire()
+        Constellation.objects.bulk_create(
+            [
+                Constellation(id=constellation['id'], name=constellation['name'], short=constellation['short'])
+                for constellation in get_constellation_index().constellations
+            ],
+            ignore_conflicts=True,
+        )
+        CelestialBody.objects.bulk_create(
+            [CelestialBody(id=obj_id, name=obj_data['name']) for obj_id, obj_data in registry.celestial_bodies.items()],
+            ignore_conflicts=True,
+        )
+        self._references_ready = True
+
+    @staticmethod
+    def _datetime(instant):
+        return datetime.fromtimestamp(instant, tz=pytz.UTC)
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+
+def build_observation_store(config=None):
+    """
+    Build an ObservationStore from an ASTRONOMY_OBSERVATION_STORE style dict
+    """
+    config = {**DEFAULT_OBSERVATION_STORE, **(config or {})}
+    if not config['ENABLED']:
+        return None
+    return ObservationStore(batch_size=config['BATCH_SIZE'], cells=configured_cells(config))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_observation_store():
+    """
+    Return the process-wide observation store, or None when it is disabled
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_observation_store(getattr(settings, 'ASTRONOMY_OBSERVATION_STORE', None)) or False
+    return _store or None
@@ -0,0 +1,225 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from pathlib import Path
+from skyfield.functions import angle_between
+import numpy as np
+
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Rows stored per body and sample: apparent GCRS x, y, z then astrometric
+# x, y, z, all in AU
+APPARENT = slice(0, 3)
+ASTROMETRIC = slice(3, 6)
+ROWS = 6
+
+
+class EphemerisTables:
+    """
+    Geocentric positions of every body tabulated on a uniform TT grid
+
+    Samples live in one float64 array shaped (bodies, 6, samples), memory
+    mapped so pre-forked workers share the pages. Positions between samples
+    come from 4-point (cubic) Lagrange interpolation; `max_error_arcsec`
+    records the worst error measured against live Skyfield when the tables
+    were built. Intervals where interpolation could not meet the bound
+    (a body passing behind the Sun, where light deflection changes too
+    quickly) are listed per body and left to live Skyfield.
+    """
+
+    def __init__(self, data, metadata):
+        self.data = data
+        self.metadata = metadata
+        self.start_tt = metadata['start_tt']
+        self.step_days = metadata['step_days']
+        self.body_index = {obj_id: i for i, obj_id in enumerate(metadata['bodies'])}
+        self.live = np.zeros((len(metadata['bodies']), data.shape[2]), dtype=bool)
+        for obj_id, intervals in metadata.get('live_intervals', {}).items():
+            self.live[self.body_index[obj_id], intervals] = True
+        # Interpolation needs one sample before and two after each instant
+        self.first_tt = self.start_tt + self.step_days
+        self.last_tt = self.start_tt + (data.shape[2] - 3) * self.step_days
+
+    @property
+    def max_error_arcsec(self):
+        return max(self.metadata['max_error_arcsec'].values(), default=0.0)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load tables written by the precompute_ephemeris command
+        """
+        path = Path(path)
+        metadata = json.loads(path.with_suffix('.json').read_text())
+        data = np.load(path.with_suffix('.npy'), mmap_mode='r')
+        return cls(data, metadata)
+
+    @staticmethod
+    def save(path, data, metadata):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path.with_suffix('.npy'), data)
+        path.with_suffix('.json').write_text(json.dumps(metadata, indent=2))
+
+    def interpolable(self, obj_id, tt):
+        """
+        Boolean mask of the instants that can be interpolated for `obj_id`
+        """
+        tt = np.asarray(tt)
+        inside = (tt >= self.first_tt) & (tt <= self.last_tt)
+        intervals = np.floor((np.where(inside, tt, self.first_tt) - self.start_tt) / self.step_days)
+        return inside & ~self.live[self.body_index[obj_id], intervals.astype(np.int64)]
+
+    def interpolate(self, obj_id, tt):
+        """
+        (apparent, astrometric) GCRS positions in AU, each shaped (3, len(tt))
+        """
+        x = (np.asarray(tt) - self.start_tt) / self.step_days
+        i = np.floor(x).astype(np.int64)
+        u = x - i
+        weights = (
+            -u * (u - 1) * (u - 2) / 6,
+            (u + 1) * (u - 1) * (u - 2) / 2,
+            -(u + 1) * u * (u - 2) / 2,
+            (u + 1) * u * (u - 1) / 6,
+        )
+        table = self.data[self.body_index[obj_id]]
+        values = sum(weight * table[:, i + offset] for offset, weight in zip((-1, 0, 1, 2), weights))
+        return values[APPARENT], values[ASTROMETRIC]
+
+
+def tabulate(registry, start, end, step_days, max_error_arcsec, chunk_size=4096):
+    """
+    Build (data, metadata) for EphemerisTables from live Skyfield
+
+    `start` and `end` are timezone-aware datetimes. Every interval midpoint
+    is also computed live to measure the interpolation error; intervals over
+    `max_error_arcsec` (and their neighbours) are marked for live evaluation
+    and the worst remaining error is recorded per body.
+    """
+    ts = registry.ts
+    start_tt = ts.from_datetime(start).tt - step_days
+    count = int(np.ceil((ts.from_datetime(end).tt - start_tt) / step_days)) + 3
+    grid_tt = start_tt + np.arange(count) * step_days
+    bodies = list(registry.celestial_bodies)
+
+    data = np.empty((len(bodies), ROWS, count))
+    for offset in range(0, count, chunk_size):
+        times = ts.tt_jd(grid_tt[offset:offset + chunk_size])
+        data[:, :, offset:offset + chunk_size] = _positions(registry, bodies, times)
+
+    metadata = {
+        'ephemeris': registry.ephemeris,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'start_tt': float(start_tt),
+        'step_days': float(step_days),
+        'bodies': bodies,
+        'max_error_arcsec': {},
+        'live_intervals': {},
+    }
+    tables = EphemerisTables(data, metadata)
+
+    # Midpoints of every interval that has the samples interpolation needs
+    intervals = np.arange(1, count - 2)
+    errors = np.empty((len(bodies), len(intervals)))
+    for offset in range(0, len(intervals), chunk_size):
+        chunk = intervals[offset:offset + chunk_size]
+        check_tt = grid_tt[chunk] + step_days / 2
+        live = _positions(registry, bodies, ts.tt_jd(check_tt))
+        for i, obj_id in enumerate(bodies):
+            apparent, _ = tables.interpolate(obj_id, check_tt)
+            angle = angle_between(apparent, live[i, APPARENT])
+            errors[i, offset:offset + chunk_size] = np.degrees(angle) * 3600
+
+    for i, obj_id in enumerate(bodies):
+        over = errors[i] > max_error_arcsec
+        failed = over.copy()
+        failed[1:] |= over[:-1]
+        failed[:-1] |= over[1:]
+        if failed.any():
+            metadata['live_intervals'][obj_id] = intervals[failed].tolist()
+        metadata['max_error_arcsec'][obj_id] = float(errors[i][~failed].max(initial=0.0))
+
+    return data, metadata
+
+
+def _positions(registry, bodies, times):
+    geocentric = registry.earth.at(times)
+    positions = np.empty((len(bodies), ROWS, len(times)))
+    for i, obj_id in enumerate(bodies):
+        astrometric = geocentric.observe(registry.celestial_bodies[obj_id]['body'])
+        positions[i, APPARENT] = astrometric.apparent().position.au
+        positions[i, ASTROMETRIC] = astrometric.position.au
+    return positions
+
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def get_ephemeris_tables():
+    """
+    Return the process-wide ephemeris tables, or None when none are usable
+
+    Tables are looked up in ASTRONOMY_TABLES_DIR under the kernel's name and
+    are only used if they were built from the same kernel and their measured
+    error is within ASTRONOMY_TABLES_MAX_ERROR_ARCSEC.
+    """
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = _load_configured_tables() or False
+    return _tables or None
+
+
+def tables_path():
+    ephemeris = getattr(settings, 'ASTRONOMY_EPHEMERIS', 'de440s.bsp')
+    directory = getattr(settings, 'ASTRONOMY_TABLES_DIR', None)
+    if not directory:
+        return None
+    return Path(directory) / Path(ephemeris).stem
+
+
+def _load_configured_tables():
+    path = tables_path()
+    if path is None or not path.with_suffix('.npy').exists():
+        return None
+
+    try:
+        tables = EphemerisTables.load(path)
+    except Exception as e:
+        logger.warning(f"Ephemeris tables at {path} could not be loaded: {e}")
+        return None
+
+    ephemeris = getattr(settings, 'ASTRONOMY_EPHEMERIS', 'de440s.bsp')
+    if tables.metadata['ephemeris'] != ephemeris:
+        logger.warning(f"Ephemeris tables at {path} were built from {tables.metadata['ephemeris']}, not {ephemeris}")
+        return None
+
+    max_error = getattr(settings, 'ASTRONOMY_TABLES_MAX_ERROR_ARCSEC', 0.01)
+    if tables.max_error_arcsec > max_error:
+        logger.warning(
+            f"Ephemeris tables at {path} exceed the error bound "
+            f"({tables.max_error_arcsec:.3g} > {max_error} arcsec); not using them"
+        )
+        return None
+
+    logger.info(f"Ephemeris tables loaded from {path}: {tables.metadata['start']} to {tables.metadata['end']}")
+    return tables
+
+
+@receiver(setting_changed)
+def _reset_tables(setting, **kwargs):
+    """
+    Look the tables up again when the kernel or tables settings change
+    """
+    global _tables
+    if setting in ('ASTRONOMY_EPHEMERIS', 'ASTRONOMY_TABLES_DIR', 'ASTRONOMY_TABLES_MAX_ERROR_ARCSEC'):
+        with _tables_lock:
+            _tables = None
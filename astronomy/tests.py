@@ -1,3 +1,1031 @@
-from django.test import TestCase
+from django.apps import apps
+from django.core.management.base import CommandError
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from skyfield import almanac
+from skyfield.api import Loader, Topos, load, load_constellation_map, position_of_radec
+from skyfield.framelib import itrs
+from skyfield.functions import mxv, to_spherical
+from skyfield.vectorlib import VectorFunction
+from unittest import mock, skipUnless
+from datetime import datetime, timedelta
+import asyncio
+import json
+import numpy as np
+import os
+import pytz
+import tempfile
+import threading
 
-# Create your tests here.
+from .batch import ObserverArray
+from .cache import LRUCacheBackend, ResultCache
+from .celestial_calculator import CelestialCalculator, airmass, merge_chunk_entry
+from .cells import DecimalCells, GeohashCells
+from .columnar import to_columns
+from .constellations import get_constellation_index
+from .dispatch import CalculationPool, PoolSaturated
+from .ephemeris import EphemerisRegistry
+from .events import EventCalculator, _months
+from .geocentric import GeocentricEphemeris
+from .geolocation import ElevationModel, GeoResolver, IPDatabase
+from .management.commands.warm_observations import Command as WarmObservationsCommand
+from .metrics import Metrics, server_timing
+from .models import Observation
+from .parallel import ParallelCalculator
+from .renderers import ArrowRenderer, MessagePackRenderer, msgpack, pa
+from .reporting import ErrorReporter
+from .skynow import SkyNow
+from .store import ObservationStore
+from .tables import EphemerisTables
+from .timegrid import TimeGrid
+from .views import AstronomyRequestMixin
+
+# A de421 excerpt covering 2023-12-01..2025-04-01, the dates the tests use,
+# so the suite neither downloads the production kernel nor reads tables
+# built from it
+local_kernel = override_settings(
+    ASTRONOMY_DATA_DIR=os.path.join(os.path.dirname(__file__), 'testdata'),
+    ASTRONOMY_EPHEMERIS='de421-2024.bsp',
+    ASTRONOMY_TABLES_DIR=None,
+)
+
+
+@local_kernel
+class EphemerisRegistryTests(SimpleTestCase):
+    def test_kernel_is_loaded_once(self):
+        registry = EphemerisRegistry()
+        with mock.patch('astronomy.ephemeris.Loader', wraps=Loader) as loader:
+            threads = [threading.Thread(target=registry.load) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIs(registry.load(), registry)
+            self.assertIs(registry.acquire(), registry)
+        self.assertEqual(loader.call_count, 1)
+        self.assertTrue(registry.loaded)
+        self.assertEqual(registry.stats()['reuse_count'], 1)
+
+    def test_preload_setting(self):
+        app = apps.get_app_config('astronomy')
+        for preload in (False, True):
+            registry = EphemerisRegistry()
+            with self.subTest(preload=preload), self.settings(ASTRONOMY_PRELOAD_EPHEMERIS=preload), \
+                    mock.patch('astronomy.ephemeris.get_registry', return_value=registry):
+                app.ready()
+                self.assertEqual(registry.loaded, preload)
+
+    def test_failed_load_leaves_the_registry_unloaded(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            with open(os.path.join(data_dir, 'broken.bsp'), 'wb') as f:
+                f.write(b'not a kernel' * 100)
+            registry = EphemerisRegistry(data_dir, 'broken.bsp')
+
+            # The preload logs the failure instead of stopping the app
+            app = apps.get_app_config('astronomy')
+            with mock.patch('astronomy.ephemeris.get_registry', return_value=registry), \
+                    self.settings(ASTRONOMY_PRELOAD_EPHEMERIS=True), self.assertLogs('astronomy.apps', 'WARNING'):
+                app.ready()
+
+            with self.assertRaises(ValueError):
+                registry.load()
+            self.assertFalse(registry.loaded)
+            self.assertIsNone(registry.coverage)
+
+
+@local_kernel
+class VectorizedEngineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        cls.calculator = CelestialCalculator(35.6824, 51.4158, 1156)
+        cls.data = cls.calculator.get_celestial_objects_data(start, start + timedelta(days=2), step=6 * 3600)
+
+    def test_matches_scalar_skyfield(self):
+        # RA/Dec within the precomputed tables' error bound; alt/az within the
+        # 0.5 arcsec the parallax shift leaves out (diurnal aberration, and
+        # for the Moon the topocentric light time)
+        equatorial_tolerance = 0.01 / 3600
+        horizontal_tolerance = 0.5 / 3600
+        calculator = self.calculator
+        observer = calculator.earth + calculator.location
+        for object_details in self.data['celestial_objects']:
+            body = calculator.celestial_bodies[object_details['id']]['body']
+            for observation in object_details['observations']:
+                with self.subTest(body=object_details['id'], date=observation['date']):
+                    t = calculator.ts.from_datetime(datetime.fromisoformat(observation['date']))
+                    astrometric = calculator.earth.at(t).observe(body)
+                    ra, dec, _ = astrometric.apparent().radec()
+                    altitude, azimuth, _ = observer.at(t).observe(body).apparent().altaz()
+
+                    equatorial = observation['position']['equatorial']
+                    horizontal = observation['position']['horizontal']
+                    ra_offset = ((equatorial['right_ascension'] - ra.hours + 12) % 24 - 12) * 15
+                    self.assertLess(abs(ra_offset * np.cos(dec.radians)), equatorial_tolerance)
+                    self.assertLess(abs(equatorial['declination'] - dec.degrees), equatorial_tolerance)
+                    self.assertAlmostEqual(observation['distance']['au'] / astrometric.distance().au, 1, places=9)
+                    self.assertLess(abs(horizontal['altitude'] - altitude.degrees), horizontal_tolerance)
+                    azimuth_offset = (horizontal['azimuth'] - azimuth.degrees + 180) % 360 - 180
+                    self.assertLess(abs(azimuth_offset * np.cos(altitude.radians)), horizontal_tolerance)
+
+    def test_every_observation_has_a_constellation(self):
+        # The old lookup left `constellation` out where no box matched
+        for object_details in self.data['celestial_objects']:
+            for observation in object_details['observations']:
+                self.assertEqual(set(observation['constellation']), {'id', 'short', 'name'})
+                self.assertEqual('moon_phase' in observation, object_details['id'] == 'moon')
+
+
+@local_kernel
+class ObserverStateTests(SimpleTestCase):
+    def evaluations(self, compute):
+        """
+        Count VectorFunction.at calls on the Earth and on the observer's Topos
+        """
+        calculator = CelestialCalculator(35.6824, 51.4158, 1156, geocentric=GeocentricEphemeris(10000))
+        # Evaluate live rather than from precomputed tables
+        calculator.tables = None
+        with mock.patch.object(VectorFunction, 'at', autospec=True, side_effect=VectorFunction.at) as at:
+            compute(calculator)
+        callers = [call.args[0] for call in at.call_args_list]
+        return (
+            sum(caller is calculator.earth for caller in callers),
+            sum(caller is calculator.location for caller in callers)
+        )
+
+    def test_one_geocentric_and_one_topocentric_evaluation_per_time_vector(self):
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        end = start + timedelta(days=9)
+
+        def whole_range(calculator):
+            calculator.get_celestial_objects_data(start, end, step=3600)
+
+        def chunks(calculator):
+            list(calculator.iter_celestial_objects_data(start, end, chunk_size=100, step=3600))
+
+        # Ten bodies and the moon phase, over 217 hourly samples
+        self.assertEqual(self.evaluations(whole_range), (1, 1))
+        # Three chunks, each its own time vector
+        self.assertEqual(self.evaluations(chunks), (3, 3))
+
+
+@local_kernel
+class GeocentricEphemerisTests(SimpleTestCase):
+    def test_second_location_reuses_the_geocentric_pass(self):
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        end = start + timedelta(days=3)
+        shared = GeocentricEphemeris(10000)
+        CelestialCalculator(35.6824, 51.4158, 1156, geocentric=shared).get_celestial_objects_data(start, end, step=3600)
+        self.assertEqual(shared.stats()['misses'], 73 * 10)
+
+        data = CelestialCalculator(-33.8688, 151.2093, 58, geocentric=shared).get_celestial_objects_data(
+            start, end, step=3600
+        )
+        stats = shared.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (73 * 10, 73 * 10))
+
+        fresh = CelestialCalculator(-33.8688, 151.2093, 58, geocentric=GeocentricEphemeris(10000))
+        # Distance, RA/Dec, constellation and moon phase from the store, and
+        # the horizontal coordinates derived from them, match a fresh pass
+        self.assertEqual(data, fresh.get_celestial_objects_data(start, end, step=3600))
+        self.assertIn('moon_phase', data['celestial_objects'][1]['observations'][0])
+
+
+@local_kernel
+class StreamingTests(SimpleTestCase):
+    # Ten hourly samples, so chunks of four end on a partial chunk of two
+    REQUEST = {
+        'location': {'latitude': 35.6824, 'longitude': 51.4158, 'elevation': 1156},
+        'date_range': {'start_date': '2024-01-01', 'end_date': '2024-01-01T09:00:00', 'step': '1h'},
+        'cache': False,
+    }
+
+    def post(self, data, **headers):
+        return self.client.post('/api/astronomy/', data, content_type='application/json', **headers)
+
+    def read_stream(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_streamed_chunks_rebuild_the_regular_response(self):
+        with self.settings(ASTRONOMY_STREAM_CHUNK_SIZE=4):
+            expected = self.post(self.REQUEST).json()
+            for response in (
+                self.post({**self.REQUEST, 'stream': True}),
+                self.post(self.REQUEST, HTTP_ACCEPT='application/x-ndjson'),
+            ):
+                entries = self.read_stream(response)
+                self.assertEqual(entries[0], {'metadata': expected['metadata']})
+                # Three chunks of every body: four, four and two dates
+                self.assertEqual(len(entries), 1 + 3 * 10)
+                self.assertEqual([len(entry['observations']) for entry in entries[1::10]], [4, 4, 2])
+
+                objects = {}
+                for entry in entries[1:]:
+                    merge_chunk_entry(objects, entry)
+                self.assertEqual(list(objects.values()), expected['celestial_objects'])
+
+
+@local_kernel
+class BatchTests(SimpleTestCase):
+    LOCATIONS = (
+        {'latitude': 35.6824, 'longitude': 51.4158, 'elevation': 1156},
+        {'latitude': -33.8688, 'longitude': 151.2093, 'elevation': 58},
+        {'latitude': 64.1466, 'longitude': -21.9426},
+    )
+    DATE_RANGE = {'start_date': '2024-01-01', 'end_date': '2024-01-02', 'step': '6h'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        cls.expected = [
+            CelestialCalculator(
+                location['latitude'], location['longitude'], location.get('elevation', 0)
+            ).get_celestial_objects_data(start, start + timedelta(days=1), step=6 * 3600)
+            for location in cls.LOCATIONS
+        ]
+
+    def post(self, layout, locations=LOCATIONS):
+        data = {'locations': list(locations), 'date_range': self.DATE_RANGE, 'layout': layout}
+        return self.client.post('/api/astronomy/batch/', data, content_type='application/json')
+
+    def assertHorizontalClose(self, actual, expected):
+        # The batch rotates ITRS positions rather than going through each Topos
+        for name in ('altitude', 'azimuth', 'airmass'):
+            np.testing.assert_allclose(
+                np.array(actual[name], dtype=float), np.array(expected[name], dtype=float), atol=1e-9
+            )
+        self.assertEqual(actual['above_horizon'], expected['above_horizon'])
+
+    def split_horizontal(self, celestial_objects):
+        """
+        Single-location objects without their horizontal coordinates, and
+        those coordinates as name -> list per body
+        """
+        stripped, horizontal = [], []
+        for object_details in celestial_objects:
+            observations = object_details['observations']
+            stripped.append({**object_details, 'observations': [
+                {**o, 'position': {k: v for k, v in o['position'].items() if k != 'horizontal'}} for o in observations
+            ]})
+            horizontal.append({
+                name: [o['position']['horizontal'][name] for o in observations]
+                for name in ('altitude', 'azimuth', 'above_horizon', 'airmass')
+            })
+        return stripped, horizontal
+
+    def test_locations_layout_matches_single_location_requests(self):
+        response = self.post('locations')
+        self.assertEqual(response.status_code, 200)
+        documents = response.json()
+        self.assertEqual(len(documents), len(self.LOCATIONS))
+        for document, expected in zip(documents, self.expected):
+            self.assertEqual(document['metadata'], expected['metadata'])
+            objects, horizontal = self.split_horizontal(document['celestial_objects'])
+            expected_objects, expected_horizontal = self.split_horizontal(expected['celestial_objects'])
+            self.assertEqual(objects, expected_objects)
+            for actual, wanted in zip(horizontal, expected_horizontal):
+                self.assertHorizontalClose(actual, wanted)
+
+    def test_columnar_layout_matches_single_location_requests(self):
+        response = self.post('columnar')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            data['metadata']['observers'], [expected['metadata']['observer']['location'] for expected in self.expected]
+        )
+        horizontal = [self.split_horizontal(expected['celestial_objects'])[1] for expected in self.expected]
+        for b, object_details in enumerate(data['celestial_objects']):
+            observations = self.expected[0]['celestial_objects'][b]['observations']
+            self.assertEqual(data['dates'], [o['date'] for o in observations])
+            self.assertEqual(object_details['distance']['au'], [o['distance']['au'] for o in observations])
+            self.assertEqual(
+                object_details['position']['equatorial']['right_ascension'],
+                [o['position']['equatorial']['right_ascension'] for o in observations]
+            )
+            self.assertEqual(object_details['constellation'], [o['constellation'] for o in observations])
+            if object_details['id'] == 'moon':
+                self.assertEqual(object_details['moon_phase'], [o['moon_phase'] for o in observations])
+
+            for i in range(len(self.LOCATIONS)):
+                self.assertHorizontalClose(
+                    {name: values[i] for name, values in object_details['position']['horizontal'].items()},
+                    horizontal[i][b]
+                )
+
+    def test_location_limit(self):
+        with self.settings(ASTRONOMY_MAX_BATCH_LOCATIONS=2):
+            response = self.post('columnar')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'At most 2 locations per request.')
+            self.assertEqual(self.post('columnar', self.LOCATIONS[:2]).status_code, 200)
+
+
+@local_kernel
+class MoonPhaseTests(SimpleTestCase):
+    def test_every_phase_name_is_reachable(self):
+        calculator = CelestialCalculator(35.6824, 51.4158, 1156)
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        t = calculator.ts.from_datetimes([start + timedelta(hours=12 * i) for i in range(60)])
+        phases = [entry['moon_phase'] for entry in calculator._calculate_moon_phase(t)]
+        self.assertEqual({phase['phase'] for phase in phases}, set(CelestialCalculator.MOON_PHASE_NAMES))
+
+        # almanac.moon_phase measures along the ecliptic; the Moon's latitude
+        # keeps the two within a few degrees
+        longitudes = almanac.moon_phase(calculator.planets, t).degrees
+        for phase, longitude in zip(phases, longitudes):
+            self.assertLess(abs((phase['elongation'] - longitude + 180) % 360 - 180), 6)
+            self.assertAlmostEqual(phase['angle'], min(phase['elongation'], 360 - phase['elongation']))
+
+
+@local_kernel
+class ConstellationIndexTests(SimpleTestCase):
+    # Bright stars with ICRS (J2000) RA/Dec in degrees
+    KNOWN_STARS = (
+        ('Polaris', 37.9546, 89.2641, 'UMi'),
+        ('Sirius', 101.2872, -16.7161, 'CMa'),
+        ('Canopus', 95.9880, -52.6957, 'Car'),
+        ('Betelgeuse', 88.7929, 7.4071, 'Ori'),
+        ('Aldebaran', 68.9802, 16.5093, 'Tau'),
+        ('Vega', 279.2347, 38.7837, 'Lyr'),
+        ('Deneb', 310.3580, 45.2803, 'Cyg'),
+        ('Antares', 247.3519, -26.4320, 'Sco'),
+        ('Spica', 201.2983, -11.1613, 'Vir'),
+        ('Acrux', 186.6496, -63.0991, 'Cru'),
+        ('Fomalhaut', 344.4128, -29.6222, 'PsA'),
+        ('Alpheratz', 2.0969, 29.0904, 'And'),
+    )
+
+    # Ecliptic points 0.01 degrees either side of a boundary, ICRS RA/Dec in degrees
+    BOUNDARY_POINTS = (
+        (245.840, -21.583, 'Sco'),
+        (245.861, -21.586, 'Oph'),
+        (265.891, -23.386, 'Oph'),
+        (265.913, -23.386, 'Sgr'),
+        (352.324, -3.314, 'Aqr'),
+        (352.342, -3.307, 'Psc'),
+        (26.650, 11.005, 'Psc'),
+        (26.669, 11.012, 'Ari'),
+        (140.469, 15.427, 'Cnc'),
+        (140.488, 15.421, 'Leo'),
+    )
+
+    def setUp(self):
+        self.index = get_constellation_index()
+
+    def test_either_side_of_boundaries(self):
+        for ra, dec, expected in self.BOUNDARY_POINTS:
+            with self.subTest(ra=ra, dec=dec):
+                self.assertEqual(self.index.lookup(ra, dec)['short'], expected)
+
+    def test_poles_and_right_ascension_wrap(self):
+        self.assertEqual(self.index.lookup(0.0, 90.0)['short'], 'UMi')
+        self.assertEqual(self.index.lookup(123.0, -90.0)['short'], 'Oct')
+        for ra in (0.0, 359.9999, 360.0):
+            self.assertEqual(self.index.lookup(ra, 0.0)['short'], 'Psc')
+
+    def test_sun_passes_from_scorpius_to_ophiuchus_and_aquarius_to_pisces(self):
+        calculator = CelestialCalculator(0, 0)
+        for date, expected in (
+            ((2024, 11, 25), 'Sco'),
+            ((2024, 12, 5), 'Oph'),
+            ((2024, 3, 5), 'Aqr'),
+            ((2024, 3, 15), 'Psc'),
+        ):
+            with self.subTest(date=date):
+                instant = datetime(*date, tzinfo=pytz.UTC)
+                data = calculator.get_celestial_objects_data(instant, instant)
+                observation = data['celestial_objects'][0]['observations'][0]
+                self.assertEqual(observation['constellation']['short'], expected)
+
+    def test_known_stars(self):
+        for name, ra, dec, expected in self.KNOWN_STARS:
+            with self.subTest(star=name):
+                self.assertEqual(self.index.lookup(ra, dec)['short'], expected)
+
+    def test_vectorized_lookup_matches_scalar(self):
+        ra = np.array([star[1] for star in self.KNOWN_STARS])
+        dec = np.array([star[2] for star in self.KNOWN_STARS])
+        shorts = [constellation['short'] for constellation in self.index.lookup(ra, dec)]
+        self.assertEqual(shorts, [star[3] for star in self.KNOWN_STARS])
+
+    def test_matches_skyfield_reference(self):
+        rng = np.random.default_rng(1875)
+        ra = rng.uniform(0, 360, 20000)
+        dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 20000)))
+        expected = load_constellation_map()(position_of_radec(ra / 15, dec))
+        actual = self.index.abbreviations[self.index.indices(ra, dec)]
+        np.testing.assert_array_equal(actual, expected)
+
+
+class ObserverArrayTests(SimpleTestCase):
+    def test_matches_per_observer_rotation(self):
+        ts = load.timescale()
+        times = ts.utc(2024, 12, 9, range(0, 24, 6))
+        locations = ((35.6824, 51.4158, 1156.0), (-33.9, 18.4, 10.0), (64.1, -21.9, 50.0))
+        position_au = np.array([[0.3, 0.5, 0.6, -0.2], [-0.7, 0.1, 0.4, 0.9], [0.2, -0.8, 0.3, 0.1]]) * 1e-3
+
+        observers = ObserverArray(*zip(*locations))
+        altitudes, azimuths = observers.altaz(position_au, itrs.rotation_at(times))
+
+        for i, (latitude, longitude, elevation) in enumerate(locations):
+            topos = Topos(latitude_degrees=latitude, longitude_degrees=longitude, elevation_m=elevation)
+            offset = position_au - topos.at(times).position.au
+            _, altitude, azimuth = to_spherical(mxv(topos.rotation_at(times), offset))
+            np.testing.assert_allclose(altitudes[i], np.degrees(altitude), atol=1e-9)
+            np.testing.assert_allclose(azimuths[i], np.degrees(azimuth), atol=1e-9)
+
+
+class AirmassTests(SimpleTestCase):
+    def test_zenith_horizon_and_below(self):
+        masses = airmass([90.0, 30.0, 0.01, 0.0, -5.0])
+        self.assertAlmostEqual(masses[0], 1.0, places=3)
+        self.assertAlmostEqual(masses[1], 1.995, places=2)
+        self.assertAlmostEqual(masses[2], 38.0, delta=0.5)
+        self.assertEqual(masses[3:].tolist(), [None, None])
+
+
+@local_kernel
+class CalculationPoolTests(SimpleTestCase):
+    def test_saturation_and_cancellation(self):
+        pool = CalculationPool(workers=1, queue_size=1)
+        release = threading.Event()
+
+        def work(cancel):
+            release.wait(5)
+            return cancel.is_set()
+
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(work))
+            queued = asyncio.ensure_future(pool.run(work))
+            await asyncio.sleep(0.05)
+            with self.assertRaises(PoolSaturated):
+                await pool.run(work)
+
+            running.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await running
+            release.set()
+            return await queued
+
+        self.assertFalse(asyncio.run(scenario()))
+        pool.shutdown()
+        stats = pool.stats()
+        self.assertEqual((stats['rejected'], stats['cancelled'], stats['pending']), (1, 1, 0))
+
+    async def test_async_view_answers_429_with_retry_after_when_full(self):
+        pool = CalculationPool(workers=1, queue_size=1)
+        release = threading.Event()
+        data = {
+            'location': {'latitude': 35.6824, 'longitude': 51.4158},
+            'date_range': {'start_date': '2024-01-01', 'end_date': '2024-01-02'},
+        }
+
+        def blocked(*args):
+            release.wait(5)
+            return {'celestial_objects': []}
+
+        def post():
+            return self.async_client.post('/api/astronomy/async/', data, content_type='application/json')
+
+        with mock.patch('astronomy.views.get_calculation_pool', return_value=pool), \
+                mock.patch('astronomy.views.compute_celestial_data', blocked), \
+                self.settings(ASTRONOMY_ASYNC_RETRY_AFTER=7):
+            running = asyncio.ensure_future(post())
+            queued = asyncio.ensure_future(post())
+            await asyncio.sleep(0.05)
+
+            response = await post()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '7')
+            self.assertIn('error', response.json())
+
+            # A client going away gives up its place
+            running.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await running
+            release.set()
+            response = await queued
+            self.assertEqual(response.status_code, 200)
+
+        pool.shutdown()
+        stats = pool.stats()
+        self.assertEqual((stats['rejected'], stats['cancelled'], stats['completed']), (1, 1, 2))
+
+    async def test_async_view_parses_outside_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        threads = []
+        parse_date_range = AstronomyRequestMixin._parse_date_range
+
+        def recording(view, date_range):
+            threads.append(threading.get_ident())
+            return parse_date_range(view, date_range)
+
+        data = {
+            'location': {'latitude': 35.6824, 'longitude': 51.4158},
+            'date_range': {'start_date': '2024-01-01', 'end_date': '2024-01-02'},
+        }
+        with mock.patch.object(AstronomyRequestMixin, '_parse_date_range', autospec=True, side_effect=recording), \
+                mock.patch('astronomy.views.compute_celestial_data', return_value={'celestial_objects': []}):
+            response = await self.async_client.post('/api/astronomy/async/', data, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+
+
+class ParallelPlanTests(SimpleTestCase):
+    def test_plan_splits_bodies_only_when_chunks_are_short(self):
+        bodies = ['sun', 'moon', 'mercury', 'venus', 'mars']
+        grid = TimeGrid(None, np.arange(150))
+
+        tasks = ParallelCalculator(workers=4, chunk_size=100).plan(grid, bodies)
+        self.assertEqual([len(offsets) for offsets, _ in tasks], [75, 75, 75, 75])
+        self.assertEqual([group for _, group in tasks[:2]], [['sun', 'mercury', 'mars'], ['moon', 'venus']])
+        self.assertEqual(np.concatenate([offsets for offsets, _ in tasks[::2]]).tolist(), list(range(150)))
+
+        tasks = ParallelCalculator(workers=2, chunk_size=50).plan(grid, bodies)
+        self.assertEqual(len(tasks), 3)
+        self.assertTrue(all(group == bodies for _, group in tasks))
+
+
+class EphemerisTablesTests(SimpleTestCase):
+    def make_tables(self, live_intervals=None):
+        # Cubic in time on every row, which 4-point interpolation reproduces exactly
+        tt = 2460000.0 + np.arange(20) * 0.5
+        rows = np.array([(tt - 2460000.0) ** 3 + k for k in range(6)])
+        metadata = {
+            'start_tt': 2460000.0,
+            'step_days': 0.5,
+            'bodies': ['sun', 'moon'],
+            'max_error_arcsec': {'sun': 0.0, 'moon': 0.0},
+            'live_intervals': live_intervals or {},
+        }
+        return EphemerisTables(np.array([rows, rows]), metadata)
+
+    def test_interpolation_is_exact_for_cubics(self):
+        tables = self.make_tables()
+        tt = np.array([2460000.6, 2460003.3, 2460008.5])
+        apparent, astrometric = tables.interpolate('sun', tt)
+        expected = (tt - 2460000.0) ** 3
+        np.testing.assert_allclose(apparent[0], expected, rtol=1e-9)
+        np.testing.assert_allclose(astrometric[2], expected + 5, rtol=1e-9)
+
+    def test_interpolable_excludes_edges_and_live_intervals(self):
+        tables = self.make_tables({'moon': [6]})
+        tt = 2460000.0 + np.array([0.2, 0.6, 3.1, 3.6, 8.5, 9.0])
+        np.testing.assert_array_equal(tables.interpolable('sun', tt), [False, True, True, True, True, False])
+        np.testing.assert_array_equal(tables.interpolable('moon', tt), [False, True, False, True, True, False])
+
+
+@local_kernel
+class LRUCacheBackendTests(SimpleTestCase):
+    def test_evicts_least_recently_used_over_memory_cap(self):
+        backend = LRUCacheBackend(max_bytes=200, ttl=None)
+        backend.set_many({'a': 'x' * 60, 'b': 'y' * 60})
+        backend.get_many(['a'])
+        backend.set_many({'c': 'z' * 60})
+        self.assertEqual(set(backend.get_many(['a', 'b', 'c'])), {'a', 'c'})
+        self.assertLessEqual(backend.size, 200)
+
+    def test_entries_expire_after_ttl(self):
+        backend = LRUCacheBackend(max_bytes=1024, ttl=10)
+        with mock.patch('astronomy.cache.time.monotonic', return_value=100.0):
+            backend.set_many({'a': 1})
+        with mock.patch('astronomy.cache.time.monotonic', return_value=105.0):
+            self.assertEqual(backend.get_many(['a']), {'a': 1})
+        with mock.patch('astronomy.cache.time.monotonic', return_value=111.0):
+            self.assertEqual(backend.get_many(['a']), {})
+        self.assertEqual(backend.size, 0)
+
+    def test_quantize_rounds_location(self):
+        cache = ResultCache(LRUCacheBackend(1024, None), precision=3)
+        self.assertEqual(cache.quantize(35.68241, 51.41589, 1156.4), (35.682, 51.416, 1156.0))
+
+    def test_grids_over_max_samples_bypass_the_cache(self):
+        cache = ResultCache(LRUCacheBackend(16 * 1024 * 1024, None), max_samples=5)
+        calculator = CelestialCalculator(*cache.quantize(35.6824, 51.4158, 1156), bodies=['sun', 'moon'])
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+
+        uncached = calculator.get_celestial_objects_data(start, start + timedelta(hours=6), step=3600)
+        bypassed = calculator.get_celestial_objects_data(start, start + timedelta(hours=6), cache=cache, step=3600)
+        self.assertEqual(bypassed, uncached)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bypassed'], stats['entries']), (0, 0, 1, 0))
+
+        # Streamed chunks under the limit are still cached
+        chunks = list(calculator.iter_celestial_objects_data(
+            start, start + timedelta(hours=6), chunk_size=4, cache=cache, step=3600
+        ))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(cache.stats()['entries'], 7 * 2)
+
+
+@local_kernel
+class StepTests(SimpleTestCase):
+    def test_seconds_and_suffixed_steps(self):
+        parse_step = AstronomyRequestMixin()._parse_step
+        self.assertEqual(parse_step(3600), 3600.0)
+        self.assertEqual(parse_step('90'), 90.0)
+        self.assertEqual(parse_step('15m'), 900.0)
+        self.assertEqual(parse_step('1h'), 3600.0)
+        self.assertEqual(parse_step('0.5d'), 43200.0)
+        self.assertEqual(parse_step(1), 1.0)
+        self.assertEqual(parse_step('366d'), 366 * 86400.0)
+
+    def test_malformed_and_out_of_range_steps_are_rejected(self):
+        for step in (True, False, None, [60], '', 'h', '15x', 'abc', 0, 0.5, -60, '367d'):
+            with self.subTest(step=step):
+                with self.assertRaises(ValueError):
+                    AstronomyRequestMixin()._parse_step(step)
+
+    def test_sample_limit(self):
+        date_range = {'start_date': '2024-01-01', 'end_date': '2024-01-02', 'step': '1h'}
+        with self.settings(ASTRONOMY_MAX_SAMPLES=25):
+            self.assertEqual(AstronomyRequestMixin()._parse_date_range(date_range)[2], 3600.0)
+            with self.assertRaisesMessage(ValueError, 'give 49 samples; the limit is 25'):
+                AstronomyRequestMixin()._parse_date_range({**date_range, 'step': '30m'})
+            with self.assertRaisesMessage(ValueError, 'give 50 samples; the limit is 25'):
+                AstronomyRequestMixin()._parse_date_range(date_range, observers=2)
+
+
+@local_kernel
+class EventWindowTests(SimpleTestCase):
+    def test_months_of_a_range(self):
+        tehran = pytz.timezone('Asia/Tehran')
+        start = tehran.localize(datetime(2024, 12, 1, 2))
+        end = tehran.localize(datetime(2025, 2, 1, 1))
+        # Both ends are in the previous UTC month
+        self.assertEqual(list(_months(start, end)), [(2024, 11), (2024, 12), (2025, 1)])
+
+    def test_uncached_span_matches_cached_months(self):
+        start = datetime(2024, 12, 28, tzinfo=pytz.UTC)
+        end = datetime(2025, 1, 4, tzinfo=pytz.UTC)
+        calculator = EventCalculator(35.6824, 51.4158, 1156)
+        cache = ResultCache(LRUCacheBackend(16 * 1024 * 1024, None))
+
+        uncached = calculator.get_events(start, end, kinds=['rise', 'set', 'twilight'])
+        cached = calculator.get_events(start, end, kinds=['rise', 'set', 'twilight'], cache=cache)
+        # The sun's events; those of the moon can move by a second with the sample grid
+        self.assertEqual(len(uncached['celestial_objects'][0]['events']), 14)
+        self.assertEqual(uncached['celestial_objects'][0], cached['celestial_objects'][0])
+        self.assertEqual(uncached['twilight'], cached['twilight'])
+        self.assertEqual(cache.stats()['misses'], 6)
+
+
+@local_kernel
+class ObservationStoreTests(TestCase):
+    LOCATION = (35.68243, 51.41581, 1156.2)
+
+    def setUp(self):
+        self.store = ObservationStore()
+        self.start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+
+    def data(self, hours, store):
+        calculator = CelestialCalculator(*self.store.quantize(*self.LOCATION), store=store)
+        return calculator.get_celestial_objects_data(self.start, self.start + timedelta(hours=hours), step=3600)
+
+    def test_stored_observations_read_back_like_computed_ones(self):
+        computed = self.data(6, None)
+        self.assertEqual(self.data(6, self.store), computed)
+        self.assertEqual(Observation.objects.count(), 7 * 10)
+        self.assertEqual(Observation.objects.filter(latitude=35.6824, longitude=51.4158, elevation=1156).count(), 70)
+
+        self.assertEqual(self.data(6, self.store), computed)
+        self.assertEqual((self.store.hits, self.store.misses), (70, 70))
+
+    def test_only_missing_instants_are_computed(self):
+        self.data(3, self.store)
+        with mock.patch.object(
+            CelestialCalculator, '_compute_objects', autospec=True, side_effect=CelestialCalculator._compute_objects
+        ) as compute:
+            self.data(6, self.store)
+        grid = compute.call_args.args[1]
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(len(grid), 3)
+        self.assertEqual(grid.instants[0], (self.start + timedelta(hours=4)).timestamp())
+        self.assertEqual(Observation.objects.count(), 7 * 10)
+
+    def test_cache_false_bypasses_the_store(self):
+        request = {
+            'location': dict(zip(('latitude', 'longitude', 'elevation'), self.LOCATION)),
+            'date_range': {'start_date': '2024-01-01', 'end_date': '2024-01-01T02:00:00', 'step': '1h'},
+        }
+        with mock.patch('astronomy.views.get_observation_store', return_value=self.store), \
+                mock.patch('astronomy.views.get_result_cache', return_value=None):
+            response = self.client.post('/api/astronomy/', {**request, 'cache': False}, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(Observation.objects.count(), 0)
+
+            response = self.client.post('/api/astronomy/', request, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(Observation.objects.count(), 3 * 10)
+
+
+class WarmTargetsTests(SimpleTestCase):
+    def targets(self, targets, result_cache, cache_backend='django.core.cache.backends.locmem.LocMemCache'):
+        with self.settings(
+            ASTRONOMY_RESULT_CACHE=result_cache,
+            CACHES={'default': {'BACKEND': cache_backend}},
+        ):
+            return WarmObservationsCommand(stdout=mock.Mock())._targets(targets)
+
+    def test_default_warms_the_cache_only_when_it_is_shared(self):
+        self.assertEqual(self.targets(None, {'BACKEND': 'lru'}), (False, True))
+        self.assertEqual(self.targets(None, {'BACKEND': None}), (False, True))
+        self.assertEqual(self.targets(None, {'BACKEND': 'django', 'CACHE_ALIAS': 'default'}), (False, True))
+        self.assertEqual(
+            self.targets(
+                None, {'BACKEND': 'django', 'CACHE_ALIAS': 'default'},
+                'django.core.cache.backends.filebased.FileBasedCache'
+            ),
+            (True, True)
+        )
+
+    def test_per_process_caches_are_refused(self):
+        for result_cache, cache_backend in (
+            ({'BACKEND': 'lru'}, 'django.core.cache.backends.locmem.LocMemCache'),
+            ({'BACKEND': 'django', 'CACHE_ALIAS': 'default'}, 'django.core.cache.backends.locmem.LocMemCache'),
+            ({'BACKEND': 'django', 'CACHE_ALIAS': 'default'}, 'django.core.cache.backends.dummy.DummyCache'),
+        ):
+            with self.subTest(cache_backend=cache_backend, result_cache=result_cache):
+                with self.assertRaises(CommandError):
+                    self.targets(['cache', 'store'], result_cache, cache_backend)
+        self.assertEqual(self.targets(['store'], {'BACKEND': 'lru'}), (False, True))
+
+
+@local_kernel
+class ColumnarTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        calculator = CelestialCalculator(35.6824, 51.4158, 1156)
+        cls.data = calculator.get_celestial_objects_data(start, start + timedelta(hours=6), step=3600)
+
+    def test_columns_match_observations(self):
+        columnar = to_columns(self.data)
+        observations = self.data['celestial_objects'][1]['observations']
+        moon = columnar['celestial_objects'][1]
+        self.assertEqual(moon['id'], 'moon')
+        self.assertEqual(columnar['time'], [datetime.fromisoformat(o['date']).timestamp() for o in observations])
+        self.assertEqual(moon['columns']['altitude'], [o['position']['horizontal']['altitude'] for o in observations])
+        self.assertEqual(moon['columns']['airmass'], [o['position']['horizontal']['airmass'] for o in observations])
+        self.assertEqual(moon['columns']['constellation'], [o['constellation']['short'] for o in observations])
+        self.assertEqual(moon['columns']['moon_phase'], [o['moon_phase']['moon_phase']['phase'] for o in observations])
+        self.assertNotIn('moon_phase', columnar['celestial_objects'][0]['columns'])
+
+    def test_moon_phase_error_replaces_its_columns(self):
+        moon = dict(self.data['celestial_objects'][1])
+        moon['observations'] = [
+            {**observation, 'moon_phase': {'moon_phase': {'error': 'no sun'}}} for observation in moon['observations']
+        ]
+        columnar = to_columns({**self.data, 'celestial_objects': [moon]})
+        entry = columnar['celestial_objects'][0]
+        self.assertEqual(entry['moon_phase_error'], 'no sun')
+        self.assertFalse(any(name.startswith('moon_phase') for name in entry['columns']))
+        self.assertIn('altitude', entry['columns'])
+
+    @skipUnless(msgpack is not None, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        packed = MessagePackRenderer().render(self.data)
+        self.assertEqual(msgpack.unpackb(packed), to_columns(self.data))
+
+    @skipUnless(pa is not None, 'pyarrow is not installed')
+    def test_arrow_round_trip(self):
+        table = pa.ipc.open_stream(ArrowRenderer().render(self.data)).read_all()
+        columnar = to_columns(self.data)
+        self.assertEqual(table.column('time').to_pylist(), columnar['time'])
+        for entry in columnar['celestial_objects']:
+            for name, values in entry.pop('columns').items():
+                self.assertEqual(table.column(f"{entry['id']}.{name}").to_pylist(), values)
+        metadata = json.loads(table.schema.metadata[b'astronomy'])
+        self.assertEqual(metadata['celestial_objects'], columnar['celestial_objects'])
+class LocationCellsTests(SimpleTestCase):
+    def test_geohash_keys_and_representatives(self):
+        self.assertEqual(GeohashCells(11).key(57.64911, 10.40744), 'u4pruydqqvj:0.0')
+        cells = GeohashCells(5)
+        rng = np.random.default_rng(5)
+        for latitude, longitude in zip(rng.uniform(-89, 89, 500), rng.uniform(-180, 180, 500)):
+            snapped = cells.quantize(latitude, longitude)
+            self.assertEqual(cells.quantize(*snapped), snapped)
+            self.assertEqual(cells.key(*snapped), cells.key(latitude, longitude))
+            # Small-angle great-circle distance to the representative
+            offset = np.hypot(snapped[0] - latitude, (snapped[1] - longitude) * np.cos(np.radians(latitude)))
+            self.assertLessEqual(offset, cells.max_error_degrees)
+
+    def test_snap_counts_shared_cells(self):
+        cells = DecimalCells(2, tracked_cells=1)
+        for latitude, longitude in ((35.681, 51.412), (35.684, 51.409), (40.0, 50.0), (35.681, 51.412)):
+            cells.snap(latitude, longitude)
+        self.assertEqual(cells.stats()['requests'], 4)
+        self.assertEqual(cells.stats()['share_rate'], 0.25)
+
+
+class GeoResolverTests(SimpleTestCase):
+    def test_ranges_elevation_and_cache(self):
+        database = IPDatabase.from_rows([
+            ('1.2.3.0', '1.2.3.255', 35.5, 51.5, 'Tehran', 'Tehran', 'Iran'),
+            ('2001:db8::', '2001:db8:ffff:ffff:ffff:ffff:ffff:ffff', -33.9, 151.2, 'Sydney', 'NSW', 'Australia'),
+            (16909312, 16909567, 35.25, 51.75, '', '', 'Iran'),
+        ])
+        with tempfile.TemporaryDirectory() as directory:
+            # 3 x 3 samples: 100 m steps west to east, one void in the south-east corner
+            tile = np.array([[100, 200, 300], [100, 200, 300], [100, 200, -32768]], dtype='>i2')
+            tile.tofile(f'{directory}/N35E051.hgt')
+            database.save(f'{directory}/ipdb')
+            resolver = GeoResolver(IPDatabase.load(f'{directory}/ipdb'), ElevationModel(directory))
+
+            first, second, sydney, outside, invalid = resolver.resolve_many(
+                ['1.2.3.77', '1.2.4.1', '2001:db8::1', '1.2.5.0', 'not an address']
+            )
+            self.assertEqual((first['city'], first['latitude'], first['elevation']), ('Tehran', 35.5, 200.0))
+            self.assertEqual((second['country'], second['elevation']), ('Iran', None))
+            self.assertEqual((sydney['city'], sydney['elevation']), ('Sydney', None))
+            self.assertIsNone(outside)
+            self.assertIsNone(invalid)
+            self.assertEqual(resolver.resolve('1.2.3.77'), first)
+            self.assertEqual(resolver.stats()['hits'], 1)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = Metrics(buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.05, 0.05, 2.0):
+            metrics.observe('observe', seconds)
+        metrics.observe_request('astronomy-data', 200, 0.02)
+        text = metrics.render({'result_cache_hit_rate': {(): 0.5}})
+        self.assertIn('astronomy_stage_seconds_bucket{stage="observe",le="0.01"} 1', text)
+        self.assertIn('astronomy_stage_seconds_bucket{stage="observe",le="0.1"} 3', text)
+        self.assertIn('astronomy_stage_seconds_bucket{stage="observe",le="+Inf"} 4', text)
+        self.assertIn('astronomy_stage_seconds_count{stage="observe"} 4', text)
+        self.assertIn('astronomy_requests_total{view="astronomy-data",status="200"} 1', text)
+        self.assertIn('astronomy_result_cache_hit_rate 0.5', text)
+
+    def test_server_timing_lists_stages_in_milliseconds(self):
+        self.assertEqual(
+            server_timing({'observe': 0.0125, 'altaz': 0.001}, 0.02),
+            'observe;dur=12.50, altaz;dur=1.00, total;dur=20.00'
+        )
+
+
+class ErrorReporterTests(SimpleTestCase):
+    def test_logs_once_per_interval_and_counts_the_rest(self):
+        reporter = ErrorReporter(interval=60)
+        logger = mock.Mock()
+        with mock.patch('astronomy.reporting.time.monotonic', return_value=100.0):
+            for _ in range(5):
+                reporter.report(logger, 'Observation', ValueError('out of range'), 'sun')
+        self.assertEqual(logger.error.call_count, 1)
+        with mock.patch('astronomy.reporting.time.monotonic', return_value=161.0):
+            reporter.report(logger, 'Observation', ValueError('out of range'), 'moon')
+        self.assertEqual(logger.error.call_count, 2)
+        self.assertIn('4 similar errors suppressed', logger.error.call_args.args[0])
+        self.assertEqual(logger.error.call_args.kwargs['extra']['suppressed'], 4)
+
+
+@local_kernel
+class RequestValidationTests(SimpleTestCase):
+    LOCATION = {'latitude': 35.6824, 'longitude': 51.4158}
+    DATE_RANGE = {'start_date': '2024-01-01', 'end_date': '2024-01-02'}
+
+    def post(self, path, date_range):
+        if path.endswith('batch/'):
+            data = {'locations': [self.LOCATION], 'date_range': date_range}
+        else:
+            data = {'location': self.LOCATION, 'date_range': date_range}
+        return self.client.post(path, data, content_type='application/json')
+
+    def test_malformed_date_ranges_are_json_400s(self):
+        date_ranges = (
+            '2024-01-01',
+            ['2024-01-01', '2024-01-02'],
+            {'start_date': 20240101, 'end_date': '2024-01-02'},
+            {'start_date': '2024-01-01', 'end_date': ['2024-01-02']},
+        )
+        for path in ('/api/astronomy/', '/api/astronomy/async/', '/api/astronomy/batch/', '/api/astronomy/events/'):
+            for date_range in date_ranges:
+                with self.subTest(path=path, date_range=date_range):
+                    response = self.post(path, date_range)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('error', response.json())
+
+    def test_unloadable_kernel_is_a_json_503(self):
+        with mock.patch('astronomy.views.get_registry') as get_registry:
+            get_registry.return_value.load.side_effect = OSError("missing.bsp not found")
+            for path in ('/api/astronomy/', '/api/astronomy/async/', '/api/astronomy/batch/', '/api/astronomy/events/'):
+                with self.subTest(path=path):
+                    response = self.post(path, self.DATE_RANGE)
+                    self.assertEqual(response.status_code, 503)
+                    self.assertIn('missing.bsp not found', response.json()['error'])
+
+
+@local_kernel
+class SkyNowTests(SimpleTestCase):
+    # 2024-06-01T12:00:03.5Z, 6.5 s before the next 10 s tick
+    NOW = 1717243203.5
+    TEHRAN = {'latitude': 35.6824, 'longitude': 51.4158}
+    SYDNEY = {'latitude': -33.8688, 'longitude': 151.2093}
+
+    def get(self, sky_now, query, **headers):
+        with mock.patch('astronomy.views.get_sky_now', return_value=sky_now), \
+                mock.patch('astronomy.views.time.time', return_value=self.NOW), \
+                mock.patch.object(SkyNow, '_ensure_thread'):
+            return self.client.get('/api/astronomy/now/', query, **headers)
+
+    def test_time_is_bucketed_to_ticks(self):
+        sky_now = SkyNow(tick=10)
+        self.assertEqual(sky_now.bucket(1700000007.5), 1700000000.0)
+        self.assertEqual(sky_now.expires_in(1700000007.5), 2.5)
+        self.assertEqual(sky_now.bucket(1700000010.0), 1700000010.0)
+
+    def test_etag_answers_304_until_the_next_tick(self):
+        sky_now = SkyNow(tick=10)
+        response = self.get(sky_now, self.TEHRAN)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['celestial_objects'][0]['observations'][0]['date'], '2024-06-01T12:00:00+00:00')
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'public', 'max-age=6'})
+
+        not_modified = self.get(sky_now, self.TEHRAN, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        # Another location is another resource
+        other = self.get(sky_now, self.SYDNEY, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(other.status_code, 200)
+        self.assertNotEqual(other['ETag'], response['ETag'])
+
+    def test_resolved_locations_are_private(self):
+        resolver = mock.Mock()
+        resolver.resolve.return_value = {**self.TEHRAN, 'elevation': None}
+        with mock.patch('astronomy.views.get_resolver', return_value=resolver):
+            response = self.get(SkyNow(tick=10), {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'private', 'max-age=6'})
+
+    def test_locations_share_one_snapshot(self):
+        sky_now = SkyNow(tick=10)
+        responses = [self.get(sky_now, location) for location in (self.TEHRAN, self.SYDNEY)]
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(sky_now.refreshes, 1)
+
+    def test_unloadable_kernel_is_a_json_503(self):
+        with mock.patch('astronomy.views.get_registry') as get_registry:
+            get_registry.return_value.load.side_effect = OSError("missing.bsp not found")
+            response = self.get(SkyNow(tick=10), self.TEHRAN)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('missing.bsp not found', response.json()['error'])
+
+    def test_calculation_errors_are_reported(self):
+        sky_now = SkyNow(tick=10)
+        with mock.patch.object(sky_now, 'observe', side_effect=ValueError('no sky')), \
+                mock.patch('astronomy.views.report_error') as report, self.assertLogs('django.request', 'ERROR'):
+            response = self.get(sky_now, self.TEHRAN)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'error': 'no sky'})
+        report.assert_called_once()
+
+
+@local_kernel
+class SelectionTests(SimpleTestCase):
+    def test_bodies_and_fields_default_to_everything(self):
+        self.assertEqual(AstronomyRequestMixin()._parse_selection({}), (None, None))
+        self.assertEqual(
+            AstronomyRequestMixin()._parse_selection({'bodies': ['moon'], 'fields': ['horizontal']}),
+            (['moon'], ['horizontal'])
+        )
+
+    def test_unknown_or_empty_selections_are_rejected(self):
+        for data in ({'bodies': ['vulcan']}, {'fields': 'distance'}, {'fields': []}):
+            with self.assertRaises(ValueError):
+                AstronomyRequestMixin()._parse_selection(data)
+
+    def compute(self, **selection):
+        start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+        # A fresh geocentric store, so nothing is served from records computed earlier
+        calculator = CelestialCalculator(35.6824, 51.4158, 1156, geocentric=GeocentricEphemeris(1000), **selection)
+        return calculator.get_celestial_objects_data(start, start + timedelta(days=1), step=6 * 3600)
+
+    def test_unselected_fields_are_not_computed(self):
+        with mock.patch.object(CelestialCalculator, '_horizontal', autospec=True) as horizontal, \
+                mock.patch.object(CelestialCalculator, '_calculate_moon_phase', autospec=True) as moon_phase:
+            data = self.compute(fields=['equatorial'])
+        horizontal.assert_not_called()
+        moon_phase.assert_not_called()
+        for object_details in data['celestial_objects']:
+            for observation in object_details['observations']:
+                self.assertEqual(set(observation), {'date', 'position'})
+                self.assertEqual(set(observation['position']), {'equatorial'})
+
+    def test_bodies_limit_the_geocentric_pass(self):
+        with mock.patch.object(
+            CelestialCalculator, '_calculate_geocentric', autospec=True,
+            side_effect=CelestialCalculator._calculate_geocentric
+        ) as calculate_geocentric:
+            data = self.compute(bodies=['moon', 'mars'])
+        self.assertEqual(sorted(call.args[1] for call in calculate_geocentric.call_args_list), ['mars', 'moon'])
+        self.assertEqual([object_details['id'] for object_details in data['celestial_objects']], ['moon', 'mars'])
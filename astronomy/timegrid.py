@@ -0,0 +1,73 @@
+from datetime import timedelta
+import numpy as np
+
+DAY_SECONDS = 86400.0
+
+
+class TimeGrid:
+    """
+    Sample instants as a start datetime plus an array of second offsets.
+
+    Evenly spaced ranges are built with np.arange and turned into a Skyfield
+    Time vector with a single ts.utc() call, so no per-sample datetime is
+    created until response labels are needed. Slicing or fancy indexing
+    returns a smaller grid sharing the same start.
+    """
+
+    def __init__(self, start, offsets):
+        self.start = start
+        self.offsets = np.asarray(offsets, dtype=float)
+        self._labels = None
+
+    @classmethod
+    def from_range(cls, start, end, step_seconds=DAY_SECONDS):
+        """
+        Instants from `start` to `end` inclusive, `step_seconds` apart
+        """
+        count = cls.count(start, end, step_seconds)
+        return cls(start, np.arange(count) * float(step_seconds))
+
+    @staticmethod
+    def count(start, end, step_seconds=DAY_SECONDS):
+        """
+        Number of samples from_range would produce, without building them
+        """
+        if end < start:
+            return 0
+        return int((end - start).total_seconds() // step_seconds) + 1
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        return TimeGrid(self.start, self.offsets[index])
+
+    @property
+    def instants(self):
+        """
+        POSIX timestamps of the samples
+        """
+        return self.start.timestamp() + self.offsets
+
+    def times(self, ts):
+        """
+        Skyfield Time vector for the samples
+        """
+        utc = self.start.utctimetuple()
+        seconds = utc.tm_sec + self.start.microsecond / 1e6 + self.offsets
+        return ts.utc(utc.tm_year, utc.tm_mon, utc.tm_mday, utc.tm_hour, utc.tm_min, seconds)
+
+    def dates(self):
+        """
+        Timezone-aware datetimes of the samples, in the start's timezone
+        """
+        start = self.start
+        return [start + timedelta(seconds=offset) for offset in self.offsets.tolist()]
+
+    def labels(self):
+        """
+        ISO 8601 labels of the samples, built once per grid
+        """
+        if self._labels is None:
+            self._labels = [date.isoformat() for date in self.dates()]
+        return self._labels
@@ -1,6 +1,12 @@
 from django.urls import path
-from .views import AstronomyDataView
+from .views import (AstronomyAsyncView, AstronomyBatchView, AstronomyDataView, AstronomyEventsView, AstronomyNowView,
+                    MetricsView)
 
 urlpatterns = [
     path('astronomy/', AstronomyDataView.as_view(), name='astronomy-data'),
+    path('astronomy/async/', AstronomyAsyncView.as_view(), name='astronomy-async'),
+    path('astronomy/batch/', AstronomyBatchView.as_view(), name='astronomy-batch'),
+    path('astronomy/now/', AstronomyNowView.as_view(), name='astronomy-now'),
+    path('astronomy/events/', AstronomyEventsView.as_view(), name='astronomy-events'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -1,45 +1,553 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags, quote_etag
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .celestial_calculator import CelestialCalculator
+from rest_framework.settings import api_settings
+from .batch import LAYOUTS, BatchCelestialCalculator
+from .cache import get_result_cache
+from .celestial_calculator import FIELDS, CelestialCalculator
+from .cells import get_location_cells
+from .dispatch import PoolSaturated, compute_celestial_data, get_calculation_pool
+from .ephemeris import CELESTIAL_BODY_DEFINITIONS, get_registry
+from .events import EVENT_KINDS, EventCalculator
+from .geocentric import get_geocentric_ephemeris
+from .geolocation import client_address, get_resolver
+from .metrics import get_metrics, metrics_config, span
+from .parallel import get_parallel_calculator
+from .reporting import report_error
+from .skynow import get_sky_now
+from .store import get_observation_store
+from .renderers import COLUMNAR_RENDERERS, NDJSONRenderer
+from .timegrid import DAY_SECONDS, TimeGrid
 from datetime import datetime
+from itertools import chain
+import json
+import logging
 import pytz
+import time
+
+logger = logging.getLogger(__name__)
+
+STEP_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': DAY_SECONDS}
+MIN_STEP_SECONDS = 1
+MAX_STEP_SECONDS = 366 * DAY_SECONDS
+# Observer elevation bounds in metres: the deepest trench to the Karman line
+MIN_ELEVATION = -11000
+MAX_ELEVATION = 100000
+
+
+class EphemerisUnavailable(Exception):
+    """
+    The kernel could not be loaded to check a request's dates against its coverage
+    """
+
+
+class AstronomyRequestMixin:
+    """
+    Request parsing shared by the astronomy views
+    """
+
+    def _parse_date_range(self, date_range, observers=1):
+        """
+        Return (start_date, end_date, step) or raise ValueError
+        (EphemerisUnavailable when the kernel cannot be loaded)
+
+        The sample count, times `observers`, is checked against ASTRONOMY_MAX_SAMPLES.
+        """
+        if not isinstance(date_range, dict):
+            raise ValueError("Date range must be an object with start_date and end_date.")
+        start_date = date_range.get('start_date')
+        end_date = date_range.get('end_date')
+
+        if not start_date or not end_date:
+            raise ValueError("Start date and end date are required.")
+
+        start_date = self._parse_date(start_date)
+        end_date = self._parse_date(end_date)
+        step = self._parse_step(date_range.get('step', DAY_SECONDS))
+
+        if start_date > end_date:
+            raise ValueError("Start date must be before end date.")
+        try:
+            first, last = get_registry().load().coverage
+        except Exception as e:
+            raise EphemerisUnavailable(f"Ephemeris unavailable: {e}")
+        if start_date < first or end_date > last:
+            raise ValueError(
+                f"Dates must be between {first.isoformat(timespec='seconds')} and "
+                f"{last.isoformat(timespec='seconds')}, the ephemeris coverage."
+            )
+
+        max_samples = getattr(settings, 'ASTRONOMY_MAX_SAMPLES', 100000)
+        samples = TimeGrid.count(start_date, end_date, step) * observers
+        if samples > max_samples:
+            if observers > 1:
+                raise ValueError(f"Locations, date range and step give {samples} samples; the limit is {max_samples}.")
+            raise ValueError(f"Date range and step give {samples} samples; the limit is {max_samples}.")
+        return start_date, end_date, step
+
+    def _parse_location(self, location):
+        """
+        Return the location as a dict of floats or raise ValueError
+        """
+        if not isinstance(location, dict):
+            raise ValueError("Location must be an object with latitude and longitude.")
+        bounds = (
+            ('latitude', -90, 90),
+            ('longitude', -180, 180),
+            ('elevation', MIN_ELEVATION, MAX_ELEVATION),
+        )
+        parsed = {}
+        for name, low, high in bounds:
+            value = location.get(name, 0 if name == 'elevation' else None)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Location {name} must be a number.")
+            if not low <= value <= high:
+                raise ValueError(f"Location {name} must be between {low} and {high}.")
+            parsed[name] = float(value)
+        return parsed
+
+    def _request_location(self, location, meta):
+        """
+        The request's location or, when it is omitted, one resolved offline
+        from the client address (None if that is not possible)
+        """
+        if location:
+            return location
+        resolver = get_resolver()
+        resolved = resolver.resolve(client_address(meta)) if resolver is not None else None
+        if resolved is None:
+            return None
+        return {
+            'latitude': resolved['latitude'],
+            'longitude': resolved['longitude'],
+            'elevation': resolved['elevation'] or 0.0,
+        }
+
+    def _parse_selection(self, data):
+        """
+        Return the (bodies, fields) a request selects, None meaning all, or raise ValueError
+        """
+        selection = []
+        for name, choices in (
+            ('bodies', [obj_id for obj_id, _, _, _ in CELESTIAL_BODY_DEFINITIONS]),
+            ('fields', sorted(FIELDS)),
+        ):
+            value = data.get(name)
+            if value is not None and (
+                not isinstance(value, list) or not value or any(item not in choices for item in value)
+            ):
+                raise ValueError(f"{name.capitalize()} must be a list of: {', '.join(choices)}.")
+            selection.append(value)
+        return tuple(selection)
+
+    def _use_cache(self, data, headers):
+        """
+        Clients bypass the result cache with "cache": false or Cache-Control: no-cache
+        """
+        if data.get('cache', True) is False:
+            return False
+        return 'no-cache' not in headers.get('Cache-Control', '')
+
+    def _observer_location(self, location, use_cache):
+        """
+        (latitude, longitude, elevation) of a request location, snapped to its
+        cell's representative when the result cache or observation store is used
+        """
+        latitude = location.get('latitude')
+        longitude = location.get('longitude')
+        elevation = location.get('elevation', 0)
+        if use_cache:
+            for store in (get_result_cache(), get_observation_store()):
+                if store is not None:
+                    return store.quantize(*get_location_cells().snap(latitude, longitude, elevation))
+        return latitude, longitude, elevation
+
+    def _parse_step(self, step):
+        """
+        Sampling step in seconds, from a number of seconds or a string such as "15m"
+        """
+        try:
+            if isinstance(step, str):
+                value, unit = step[:-1], step[-1:]
+                if unit.isdigit():
+                    value, unit = step, 's'
+                seconds = float(value) * STEP_UNITS[unit]
+            elif isinstance(step, bool):
+                raise TypeError(step)
+            else:
+                seconds = float(step)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Invalid step. Use seconds or a number with an s, m, h or d suffix, e.g. "1h".')
+
+        if not MIN_STEP_SECONDS <= seconds <= MAX_STEP_SECONDS:
+            raise ValueError(f"Step must be between {MIN_STEP_SECONDS:g} second and {MAX_STEP_SECONDS / DAY_SECONDS:g} days.")
+        return seconds
+
+    def _parse_date(self, date_str):
+        try:
+            date = datetime.fromisoformat(date_str)
+            return date if date.tzinfo else date.replace(tzinfo=pytz.UTC)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid date format. Please use ISO 8601 format.")
+
+
+class AstronomyDataView(AstronomyRequestMixin, APIView):
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer] + COLUMNAR_RENDERERS
 
-class AstronomyDataView(APIView):
     def post(self, request):
-        location = request.data.get('location')
+        location = self._request_location(request.data.get('location'), request.META)
         date_range = request.data.get('date_range')
 
         if not location or not date_range:
             return Response({"error": "Location and date range are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        start_date = date_range.get('start_date')
-        end_date = date_range.get('end_date')
+        try:
+            start_date, end_date, step = self._parse_date_range(date_range)
+            location = self._parse_location(location)
+            bodies, fields = self._parse_selection(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except EphemerisUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-        if not start_date or not end_date:
-            return Response({"error": "Start date and end date are required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # The caches hold whole observations, so field selections bypass them
+            use_cache = self._use_cache(request.data, request.headers) and fields is None
+            latitude, longitude, elevation = self._observer_location(location, use_cache)
+            cache = get_result_cache() if use_cache else None
+            store = get_observation_store() if use_cache else None
+
+            if self._wants_stream(request):
+                calculator = CelestialCalculator(
+                    latitude, longitude, elevation, bodies=bodies, store=store, fields=fields
+                )
+                return self._stream_response(calculator, start_date, end_date, step, cache)
+
+            parallel = get_parallel_calculator()
+            min_samples = getattr(settings, 'ASTRONOMY_PARALLEL_MIN_SAMPLES', 20000)
+            if parallel is not None and TimeGrid.count(start_date, end_date, step) >= min_samples:
+                celestial_data = parallel.get_celestial_objects_data(
+                    latitude, longitude, elevation, start_date, end_date, step=step, use_cache=use_cache,
+                    bodies=bodies, fields=fields
+                )
+            else:
+                calculator = CelestialCalculator(
+                    latitude, longitude, elevation, bodies=bodies, store=store, fields=fields
+                )
+                celestial_data = calculator.get_celestial_objects_data(start_date, end_date, cache=cache, step=step)
+
+            return Response(celestial_data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response):
+            # Render here rather than in Django's handler so serialization is timed
+            with span('serialize'):
+                response.render()
+        return response
 
+    def _wants_stream(self, request):
+        """
+        Streaming is opt-in: "stream": true or Accept: application/x-ndjson
+        """
+        if request.data.get('stream') is True:
+            return True
+        return request.accepted_renderer.format == NDJSONRenderer.format
+
+    def _stream_response(self, calculator, start_date, end_date, step, cache):
+        """
+        NDJSON response: the metadata line, then one line per body per date chunk
+        """
+        chunk_size = getattr(settings, 'ASTRONOMY_STREAM_CHUNK_SIZE', 256)
+        entries = calculator.iter_celestial_objects_data(
+            start_date, end_date, chunk_size, cache=cache, step=step
+        )
+        # Pull the metadata now so range errors still get a proper status code
+        first = next(entries)
+
+        def lines():
+            try:
+                for entry in chain([first], entries):
+                    yield json.dumps(entry, separators=(',', ':')) + '\n'
+            except Exception as e:
+                # Headers are already sent; report the failure in-band
+                logger.error(f"Streaming response failed: {e}")
+                yield json.dumps({'error': str(e)}) + '\n'
+
+        return StreamingHttpResponse(lines(), content_type=NDJSONRenderer.media_type)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AstronomyAsyncView(AstronomyRequestMixin, View):
+    """
+    AstronomyDataView for ASGI deployments
+
+    The calculation runs in the bounded pool from astronomy.dispatch so the
+    event loop keeps serving other requests. When the pool and its queue are
+    full the request is refused with 429; when the client disconnects Django
+    cancels the view and the calculation stops at its next chunk.
+    """
+    http_method_names = ['post']
+
+    async def post(self, request):
         try:
-            start_date = self._parse_date(start_date)
-            end_date = self._parse_date(end_date)
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({"error": "Request body must be valid JSON."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            arguments = await sync_to_async(self._calculation_arguments)(data, request.META, request.headers)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except EphemerisUnavailable as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        pool = get_calculation_pool()
+        try:
+            celestial_data = await pool.run(compute_celestial_data, *arguments)
+
+            return JsonResponse(celestial_data, status=status.HTTP_200_OK)
+        except PoolSaturated:
+            response = JsonResponse(
+                {"error": "The server is busy; retry shortly."}, status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(getattr(settings, 'ASTRONOMY_ASYNC_RETRY_AFTER', 1))
+            return response
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _calculation_arguments(self, data, meta, headers):
+        """
+        compute_celestial_data arguments for a request, or raise ValueError
+
+        Resolving the client's location, loading the kernel to check the
+        dates and snapping to a cache cell can block, so post runs this
+        outside the event loop.
+        """
+        location = self._request_location(data.get('location') if isinstance(data, dict) else None, meta)
+        date_range = data.get('date_range') if isinstance(data, dict) else None
+
+        if not location or not date_range:
+            raise ValueError("Location and date range are required.")
+
+        start_date, end_date, step = self._parse_date_range(date_range)
+        location = self._parse_location(location)
+        bodies, fields = self._parse_selection(data)
+        use_cache = self._use_cache(data, headers) and fields is None
+        latitude, longitude, elevation = self._observer_location(location, use_cache)
+        return latitude, longitude, elevation, start_date, end_date, step, use_cache, bodies, fields
+
+
+class AstronomyNowView(AstronomyRequestMixin, View):
+    """
+    Current positions for one location: GET with latitude, longitude and
+    optional elevation query parameters, or none to use the client's
+    resolved location
+
+    Positions are for the start of the current tick (ASTRONOMY_SKY_NOW_TICK
+    seconds) and the geocentric part is shared by every request in it, so
+    only the horizontal coordinates are computed per request. The ETag and
+    Cache-Control max-age let downstream caches serve repeated polls until
+    the next tick.
+    """
+    http_method_names = ['get']
+
+    def get(self, request):
+        try:
+            query = self._query_location(request.GET)
+            resolved = None
+            if 'latitude' not in query and 'longitude' not in query:
+                # Responses for a resolved location must not be shared between clients
+                resolved = self._request_location(None, request.META)
+            location = self._parse_location(resolved or query)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            registry = get_registry().load()
+        except Exception as e:
+            return JsonResponse({"error": f"Ephemeris unavailable: {e}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        sky_now = get_sky_now()
+        now = time.time()
+        instant = sky_now.bucket(now)
+        etag = quote_etag(
+            f"{registry.ephemeris}:{instant:.0f}:{location['latitude']}:{location['longitude']}:{location['elevation']}"
+        )
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                celestial_data = sky_now.observe(
+                    location['latitude'], location['longitude'], location['elevation'], sky_now.snapshot(instant)
+                )
+            except Exception as e:
+                report_error(logger, 'Sky now', e)
+                return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            response = JsonResponse(celestial_data, status=status.HTTP_200_OK)
+
+        response['ETag'] = etag
+        if resolved:
+            patch_cache_control(response, private=True, max_age=max(int(sky_now.expires_in(now)), 1))
+        else:
+            patch_cache_control(response, public=True, max_age=max(int(sky_now.expires_in(now)), 1))
+        return response
+
+    def _query_location(self, query):
+        location = {}
+        for name in ('latitude', 'longitude', 'elevation'):
+            if name in query:
+                try:
+                    location[name] = float(query[name])
+                except ValueError:
+                    raise ValueError(f"Location {name} must be a number.")
+        return location
+
+
+class AstronomyBatchView(AstronomyRequestMixin, APIView):
+    """
+    Celestial data for many locations over one shared date range
+    """
+
+    def post(self, request):
+        locations = request.data.get('locations')
+        date_range = request.data.get('date_range')
+        layout = request.data.get('layout', 'columnar')
+
+        if not locations or not isinstance(locations, list) or not date_range:
+            return Response({"error": "Locations and date range are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_locations = getattr(settings, 'ASTRONOMY_MAX_BATCH_LOCATIONS', 1000)
+        if len(locations) > max_locations:
+            return Response(
+                {"error": f"At most {max_locations} locations per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if layout not in LAYOUTS:
+            return Response(
+                {"error": f"Layout must be one of: {', '.join(LAYOUTS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            start_date, end_date, step = self._parse_date_range(date_range, observers=len(locations))
+            locations = [self._parse_location(location) for location in locations]
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except EphemerisUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            observers = [
+                (location['latitude'], location['longitude'], location['elevation'])
+                for location in locations
+            ]
+            calculator = BatchCelestialCalculator(observers)
+            celestial_data = calculator.get_batch_data(start_date, end_date, step=step, layout=layout)
+
+            return Response(celestial_data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AstronomyEventsView(AstronomyRequestMixin, APIView):
+    """
+    Rise, set, culmination, twilight and moon phase times for one location
+    """
+
+    def post(self, request):
+        location = self._request_location(request.data.get('location'), request.META)
+        date_range = request.data.get('date_range')
+        kinds = request.data.get('events', list(EVENT_KINDS))
+
+        if not location or not date_range:
+            return Response({"error": "Location and date range are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(kinds, list) or not kinds or any(kind not in EVENT_KINDS for kind in kinds):
+            return Response(
+                {"error": f"Events must be a list of: {', '.join(EVENT_KINDS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            start_date, end_date, _ = self._parse_date_range(date_range)
+            location = self._parse_location(location)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except EphemerisUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        max_years = getattr(settings, 'ASTRONOMY_MAX_EVENT_YEARS', 10)
+        if end_date.year - start_date.year >= max_years:
+            return Response(
+                {"error": f"Event searches are limited to {max_years} calendar years."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         try:
             latitude = location.get('latitude')
             longitude = location.get('longitude')
             elevation = location.get('elevation', 0)
 
-            calculator = CelestialCalculator(latitude, longitude, elevation)
-            celestial_data = calculator.get_celestial_objects_data(start_date, end_date)
+            cache = get_result_cache() if self._use_cache(request.data, request.headers) else None
+            if cache is not None:
+                latitude, longitude, elevation = cache.quantize(
+                    *get_location_cells().snap(latitude, longitude, elevation)
+                )
 
-            return Response(celestial_data, status=status.HTTP_200_OK)
+            calculator = EventCalculator(latitude, longitude, elevation)
+            events = calculator.get_events(start_date, end_date, kinds=kinds, cache=cache)
+
+            return Response(events, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def _parse_date(self, date_str):
-        try:
-            date = datetime.fromisoformat(date_str)
-            return date if date.tzinfo else date.replace(tzinfo=pytz.UTC)
-        except ValueError:
-            raise ValueError("Invalid date format. Please use ISO 8601 format.")
\ No newline at end of file
+
+class MetricsView(View):
+    """
+    Stage timings, request counts and the caches' and pools' figures in the
+    Prometheus text format, for scrapers on the hosts in ALLOWED_IPS
+    """
+    http_method_names = ['get']
+
+    def get(self, request):
+        metrics = get_metrics()
+        if metrics is None:
+            return HttpResponse("Metrics are disabled.", status=status.HTTP_404_NOT_FOUND, content_type='text/plain')
+        allowed = metrics_config()['ALLOWED_IPS']
+        if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+            return HttpResponseForbidden()
+
+        components = {
+            'ephemeris': get_registry(),
+            'geocentric': get_geocentric_ephemeris(),
+            'location_cells': get_location_cells(),
+            'geolocation': get_resolver(),
+            'result_cache': get_result_cache(),
+            'observation_store': get_observation_store(),
+            'async_pool': get_calculation_pool(),
+            'sky_now': get_sky_now(),
+        }
+        gauges = {}
+        for component, source in components.items():
+            if source is None:
+                continue
+            for key, value in source.stats().items():
+                if isinstance(value, (int, float)):
+                    gauges[f'{component}_{key}'] = {(): float(value)}
+
+        return HttpResponse(metrics.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import sys
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "astronomy.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -107,7 +110,157 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# "astronomy" is a local stand-in; point it at django.core.cache.backends.redis.RedisCache in production
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "astronomy": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "astronomy",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+}
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+# Raise "astronomy" to DEBUG to see per-request ephemeris work; calculation
+# errors are rate-limited (ASTRONOMY_ERROR_LOG_INTERVAL) whatever the level
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "standard": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "standard"},
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "astronomy": {"level": "INFO"},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Astronomy
+# Directory holding (or receiving downloads of) the SPICE kernel and timescale files
+
+ASTRONOMY_DATA_DIR = BASE_DIR
+
+ASTRONOMY_EPHEMERIS = "de440s.bsp"
+
+# Load the ephemeris in AstronomyConfig.ready() rather than on the first
+# request. The test suite brings its own kernel (astronomy/testdata), so
+# `manage.py test` does not load this one.
+ASTRONOMY_PRELOAD_EPHEMERIS = sys.argv[1:2] != ["test"]
+
+# Per body, per timestep result cache. BACKEND is "lru" (in-process, bounded by
+# MAX_BYTES), "django" (the CACHES entry named CACHE_ALIAS) or None to disable.
+# Locations are snapped to ASTRONOMY_LOCATION_CELLS before lookup. Requests (or
+# stream/parallel chunks) of more than MAX_SAMPLES timesteps bypass it.
+ASTRONOMY_RESULT_CACHE = {
+    "BACKEND": "lru",
+    "MAX_BYTES": 64 * 1024 * 1024,
+    "TTL": 24 * 60 * 60,
+    "CACHE_ALIAS": "astronomy",
+    "MAX_SAMPLES": 4096,
+}
+
+# (body, instant) entries kept in the process-wide geocentric store shared by all locations
+ASTRONOMY_GEOCENTRIC_CACHE_ENTRIES = 100000
+
+# Dates per chunk for streamed (NDJSON) responses; bounds per-request memory
+ASTRONOMY_STREAM_CHUNK_SIZE = 256
+
+# Upper bound on samples (date range / step) per request
+ASTRONOMY_MAX_SAMPLES = 100000
+
+# Upper bound on locations per batch request; locations x samples is also
+# held to ASTRONOMY_MAX_SAMPLES
+ASTRONOMY_MAX_BATCH_LOCATIONS = 1000
+
+# Upper bound on calendar years covered by one events request
+ASTRONOMY_MAX_EVENT_YEARS = 10
+
+# Precomputed ephemeris tables (manage.py precompute_ephemeris), looked up
+# here under the kernel's name; requests inside their window interpolate
+# them instead of evaluating the kernel. Tables whose measured error exceeds
+# the bound are ignored.
+ASTRONOMY_TABLES_DIR = BASE_DIR / "tables"
+ASTRONOMY_TABLES_MAX_ERROR_ARCSEC = 0.01
+
+# Pool behind the async endpoint (astronomy/async/, for ASGI servers):
+# calculations running at once, requests allowed to wait beyond those before
+# answering 429, the Retry-After sent with it, and "thread" or "process"
+ASTRONOMY_ASYNC_WORKERS = 4
+ASTRONOMY_ASYNC_QUEUE_SIZE = 16
+ASTRONOMY_ASYNC_RETRY_AFTER = 1
+ASTRONOMY_ASYNC_EXECUTOR = "thread"
+
+# Processes that split very long single-location requests (at least
+# ASTRONOMY_PARALLEL_MIN_SAMPLES samples) by time chunk and body; 0 or 1
+# computes them in the request's own process. Each gunicorn worker gets
+# its own pool, so keep workers x this within the core count.
+ASTRONOMY_PARALLEL_WORKERS = 0
+ASTRONOMY_PARALLEL_MIN_SAMPLES = 20000
+ASTRONOMY_PARALLEL_CHUNK_SIZE = 4096
+
+# Write-through store of computed observations in the Observation table
+# (migrate first; manage.py backfill_observations fills ranges ahead of
+# time). Rows are keyed on the location's ASTRONOMY_LOCATION_CELLS cell and
+# read back instead of recomputed; BATCH_SIZE rows per INSERT.
+ASTRONOMY_OBSERVATION_STORE = {
+    "ENABLED": False,
+    "BATCH_SIZE": 2000,
+}
+
+# Per-stage timing histograms and request counts, served in the Prometheus
+# text format at api/metrics/ to the listed addresses (empty: anyone).
+# SERVER_TIMING adds a Server-Timing header with the request's stages.
+ASTRONOMY_METRICS = {
+    "ENABLED": True,
+    "SERVER_TIMING": False,
+    "ALLOWED_IPS": ["127.0.0.1", "::1"],
+}
+
+# Calculation errors are logged (with traceback) once per call site and
+# exception type in this many seconds; the rest are counted and summarised
+ASTRONOMY_ERROR_LOG_INTERVAL = 60
+
+# Granularity in seconds of the current-sky endpoint (astronomy/now/): the
+# shared snapshot is refreshed and cached responses expire once per tick
+ASTRONOMY_SKY_NOW_TICK = 10
+
+# Cells that cached requests snap their location to, so nearby observers
+# share results: SCHEME "decimal" rounds to PRECISION decimal degrees (4 ~
+# 11 m), "geohash" uses PRECISION-character geohash cells (5 ~ 4.9 km, 6 ~
+# 1.2 km). Altitudes are off by at most the scheme's max_error_degrees
+# (api/metrics/); sharing is counted over the last TRACKED_CELLS cells.
+ASTRONOMY_LOCATION_CELLS = {
+    "SCHEME": "decimal",
+    "PRECISION": 4,
+    "ELEVATION_PRECISION": 0,
+    "TRACKED_CELLS": 10000,
+}
+
+# Offline resolution of the client's location when a request omits it:
+# IP_DATABASE is the path (without extension) written by manage.py
+# build_ip_database, DEM_DIR a directory of SRTM .hgt tiles for elevations
+# (DEM_TILES of them kept mapped). The last CACHE_SIZE addresses are cached.
+# Trust X-Forwarded-For only behind a proxy that sets it.
+ASTRONOMY_GEOLOCATION = {
+    "IP_DATABASE": None,
+    "DEM_DIR": None,
+    "CACHE_SIZE": 65536,
+    "DEM_TILES": 16,
+    "USE_X_FORWARDED_FOR": False,
+}
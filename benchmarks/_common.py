@@ -0,0 +1,46 @@
+"""
+Shared setup for the benchmark scripts.
+
+Run from the project root, e.g. ``python -m benchmarks.bench_registry``.
+Set DJANGO_SETTINGS_MODULE to point at settings with a local kernel to
+avoid any network access.
+"""
+import os
+import statistics
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'astronomy_api.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+
+def measure(func, repeat=5, warmup=1):
+    """
+    Time `func` and return summary statistics in milliseconds
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+        'max_ms': max(samples),
+        'repeat': repeat,
+    }
+
+
+def report(title, rows):
+    """
+    Print a simple aligned table of benchmark results
+    """
+    print(title)
+    for label, result in rows:
+        print(f"  {label:<32} median {result['median_ms']:10.2f} ms   min {result['min_ms']:10.2f} ms")
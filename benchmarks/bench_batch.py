@@ -0,0 +1,48 @@
+"""
+Throughput of N single-location POSTs against one batch POST covering the
+same N locations and date range, through the Django test client.
+"""
+import numpy as np
+
+from benchmarks._common import measure, report
+from django.test import Client
+
+LOCATIONS = 100
+DATE_RANGE = {'start_date': '2024-12-01', 'end_date': '2024-12-30'}
+
+
+def main():
+    rng = np.random.default_rng(0)
+    locations = [
+        {'latitude': latitude, 'longitude': longitude, 'elevation': elevation}
+        for latitude, longitude, elevation in zip(
+            rng.uniform(-60, 60, LOCATIONS).tolist(),
+            rng.uniform(-180, 180, LOCATIONS).tolist(),
+            rng.uniform(0, 3000, LOCATIONS).round().tolist(),
+        )
+    ]
+    client = Client()
+
+    def post(path, payload):
+        response = client.post(path, payload, content_type='application/json')
+        assert response.status_code == 200, response.content[:200]
+
+    def singles():
+        for location in locations:
+            post('/api/astronomy/', {'location': location, 'date_range': DATE_RANGE, 'cache': False})
+
+    def batch(layout):
+        post('/api/astronomy/batch/', {'locations': locations, 'date_range': DATE_RANGE, 'layout': layout})
+
+    rows = [
+        (f'{LOCATIONS} single requests', measure(singles, repeat=3)),
+        ('one batch, columnar', measure(lambda: batch('columnar'), repeat=3)),
+        ('one batch, per location', measure(lambda: batch('locations'), repeat=3)),
+    ]
+    report(f'{LOCATIONS} locations x 30 days', rows)
+    for label, result in rows:
+        print(f"  {label:<32} {LOCATIONS / result['median_ms'] * 1000:10.1f} locations/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+City-wide traffic against the location cells: 100 observers scattered
+within 15 km of one city centre each ask for the same week, hourly, through
+the result cache. Finer cells recompute for almost every observer; coarser
+ones share results at the cost of a larger error bound.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.cache import LRUCacheBackend, ResultCache
+from astronomy.cells import build_location_cells
+from astronomy.celestial_calculator import CelestialCalculator
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6892, 51.3890, 1190
+OBSERVERS = 100
+RADIUS_KM = 15.0
+
+SCHEMES = (
+    ('decimal', 4),
+    ('geohash', 6),
+    ('geohash', 5),
+    ('geohash', 4),
+)
+
+
+def main():
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+    end = start + timedelta(days=7)
+    rng = np.random.default_rng(2024)
+    distance = RADIUS_KM * np.sqrt(rng.uniform(0, 1, OBSERVERS)) / 111.2
+    bearing = rng.uniform(0, 2 * np.pi, OBSERVERS)
+    latitudes = LATITUDE + distance * np.cos(bearing)
+    longitudes = LONGITUDE + distance * np.sin(bearing) / np.cos(np.radians(LATITUDE))
+    elevations = np.round(ELEVATION + rng.normal(0, 60, OBSERVERS), -2)
+
+    rows = []
+    figures = []
+    for scheme, precision in SCHEMES:
+        cells = build_location_cells({'SCHEME': scheme, 'PRECISION': precision, 'ELEVATION_PRECISION': -2})
+
+        def run():
+            cache = ResultCache(LRUCacheBackend(256 * 1024 * 1024, None), cells=cells)
+            for location in zip(latitudes, longitudes, elevations):
+                calculator = CelestialCalculator(*cache.quantize(*cells.snap(*location)))
+                calculator.get_celestial_objects_data(start, end, step=3600, cache=cache)
+            return cache
+
+        rows.append((f'{scheme} {precision}', measure(run, repeat=3)))
+        cache = run()
+        figures.append((scheme, precision, cells, cache.stats()['hit_rate']))
+
+    report(f"{OBSERVERS} observers within {RADIUS_KM:g} km, 7 days hourly", rows)
+    for scheme, precision, cells, hit_rate in figures:
+        distinct = len({cells.key(*location) for location in zip(latitudes, longitudes, elevations)})
+        print(
+            f"  {scheme} {precision}: {distinct} cells, cache hit rate {hit_rate:.2f}, "
+            f"max error {cells.max_error_degrees * 3600:.1f} arcsec"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Constellation lookup: scalar calls, the vectorized bucket index and
+Skyfield's searchsorted-based map for reference.
+"""
+import numpy as np
+from skyfield.api import load_constellation_map, position_of_radec
+
+from benchmarks._common import measure, report
+from astronomy.constellations import get_constellation_index
+
+SAMPLES = 100000
+
+
+def main():
+    index = get_constellation_index()
+    constellation_at = load_constellation_map()
+
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0, 360, SAMPLES)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, SAMPLES)))
+    b1875_ra = rng.uniform(0, 24, SAMPLES)
+    positions = position_of_radec(ra / 15, dec)
+
+    def scalar():
+        for i in range(1000):
+            index.lookup(ra[i], dec[i])
+
+    report(f'Constellation lookup ({SAMPLES} positions unless noted)', [
+        ('scalar lookup x1000', measure(scalar)),
+        ('index, ICRS input', measure(lambda: index.indices(ra, dec))),
+        ('index, B1875 input', measure(lambda: index.indices_b1875(b1875_ra, dec))),
+        ('skyfield constellation_at', measure(lambda: constellation_at(positions))),
+    ])
+
+
+if __name__ == '__main__':
+    main()
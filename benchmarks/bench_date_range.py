@@ -0,0 +1,64 @@
+"""
+Batched (Time array) evaluation against the former one-date-at-a-time loop
+for ranges of 1, 30, 365 and 3650 days, and the cost of generating the
+timesteps themselves for high-resolution tracks.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import GeocentricEphemeris
+from astronomy.timegrid import TimeGrid
+
+RANGES = (1, 30, 365, 3650)
+TRACK_SAMPLES = 100000
+
+
+def main():
+    # No geocentric store, so every call does the full computation
+    calculator = CelestialCalculator(35.6824, 51.4158, 1156, geocentric=GeocentricEphemeris(0))
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+
+    rows = []
+    speedups = []
+    for days in RANGES:
+        end = start + timedelta(days=days - 1)
+        grid = TimeGrid.from_range(start, end)
+
+        def per_date():
+            for obj_id, obj_data in calculator.celestial_bodies.items():
+                for i in range(len(grid)):
+                    calculator._calculate_object_details(obj_id, obj_data, grid[i:i + 1])
+
+        def batched():
+            calculator.get_celestial_objects_data(start, end)
+
+        repeat = 1 if days > 365 else 3
+        looped = measure(per_date, repeat=repeat, warmup=0)
+        vectorized = measure(batched, repeat=repeat, warmup=0)
+        rows.append((f'{days:>5} days per-date', looped))
+        rows.append((f'{days:>5} days batched', vectorized))
+        speedups.append((days, looped['median_ms'] / vectorized['median_ms']))
+
+    report('Date-range evaluation', rows)
+    for days, speedup in speedups:
+        print(f"  {days:>5} days speedup x{speedup:.1f}")
+
+    # Timestep generation for a one-minute track
+    end = start + timedelta(minutes=TRACK_SAMPLES - 1)
+    step = timedelta(minutes=1)
+
+    def datetime_list():
+        dates = [start + step * i for i in range(TRACK_SAMPLES)]
+        calculator.ts.from_datetimes(dates)
+
+    report(f'Timestep generation ({TRACK_SAMPLES} one-minute samples)', [
+        ('datetime list + from_datetimes', measure(datetime_list, repeat=3)),
+        ('TimeGrid + ts.utc', measure(lambda: TimeGrid.from_range(start, end, 60).times(calculator.ts), repeat=3)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Normal against error-heavy requests: a valid request, an out-of-coverage
+request rejected by the view's validation, and the same range pushed
+through CelestialCalculator directly so every body fails, with errors
+rate-limited (the default) and logged one by one with tracebacks. Log
+records go to /dev/null through a formatting handler so their cost counts.
+"""
+from datetime import datetime, timedelta
+
+import json
+import logging
+import os
+
+import pytz
+from django.test import Client
+
+from benchmarks._common import measure, report
+from astronomy import reporting
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import GeocentricEphemeris
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+
+def main():
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    astronomy_logger = logging.getLogger('astronomy')
+    astronomy_logger.handlers = [handler]
+    astronomy_logger.propagate = False
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+
+    client = Client()
+
+    def post(start):
+        body = json.dumps({
+            'location': {'latitude': LATITUDE, 'longitude': LONGITUDE, 'elevation': ELEVATION},
+            'date_range': {
+                'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=1)).isoformat(),
+                'step': '1h',
+            },
+            'cache': False,
+        })
+        return lambda: client.post('/api/astronomy/', body, content_type='application/json')
+
+    calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION, geocentric=GeocentricEphemeris(0))
+    outside = datetime(2300, 1, 1, tzinfo=pytz.UTC)
+
+    def failing(days):
+        # One chunk per day, as streamed and async requests compute them
+        def run():
+            for day in range(days):
+                start = outside + timedelta(days=day)
+                calculator.get_celestial_objects_data(start, start + timedelta(hours=23), step=3600)
+        return run
+
+    rows = [
+        ('valid request, 1 day hourly', measure(post(datetime(2024, 1, 1, tzinfo=pytz.UTC)))),
+        ('out of coverage, rejected', measure(post(outside))),
+    ]
+    reporting._reporter = reporting.ErrorReporter(interval=60)
+    rows.append(('30 failing chunks, rate-limited', measure(failing(30))))
+    reporting._reporter = reporting.ErrorReporter(interval=0)
+    rows.append(('30 failing chunks, every error', measure(failing(30))))
+    report("Normal and error-heavy requests", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Sunrise/sunset over 30 days: root finding in the events calculator (the
+span alone uncached, cold months and cached months) against dense sampling of get_celestial_objects_data with
+linear interpolation of the altitude crossings, the way clients did it.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.cache import build_result_cache
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.events import EventCalculator
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+START = datetime(2024, 12, 1, tzinfo=pytz.UTC)
+END = START + timedelta(days=30)
+# Altitude of the Sun's centre at rise/set: 34' refraction plus 16' radius
+SUN_HORIZON = -50.0 / 60.0
+
+
+def sampled_crossings(step):
+    calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION)
+    data = calculator.get_celestial_objects_data(START, END, step=step)
+    sun = data['celestial_objects'][0]['observations']
+    instants = np.array([datetime.fromisoformat(obs['date']).timestamp() for obs in sun])
+    altitudes = np.array([obs['position']['horizontal']['altitude'] for obs in sun]) - SUN_HORIZON
+    i, = np.nonzero(np.sign(altitudes[:-1]) != np.sign(altitudes[1:]))
+    fraction = altitudes[i] / (altitudes[i] - altitudes[i + 1])
+    return instants[i] + fraction * (instants[i + 1] - instants[i])
+
+
+def found_crossings(cache=None, kinds=('rise', 'set')):
+    calculator = EventCalculator(LATITUDE, LONGITUDE, ELEVATION)
+    data = calculator.get_events(START, END, kinds=kinds, cache=cache)
+    sun = data['celestial_objects'][0]['events']
+    return np.array([datetime.fromisoformat(event['date']).timestamp() for event in sun])
+
+
+def main():
+    cache = build_result_cache({'BACKEND': 'lru'})
+    found_crossings(cache)
+
+    rows = [
+        ('sampled every 10 min', measure(lambda: sampled_crossings(600), repeat=3)),
+        ('sampled every 1 min', measure(lambda: sampled_crossings(60), repeat=3)),
+        ('root finding, uncached span', measure(lambda: found_crossings(), repeat=3)),
+        ('root finding, cold months', measure(lambda: found_crossings(build_result_cache({'BACKEND': 'lru'})), repeat=3)),
+        ('root finding, cached months', measure(lambda: found_crossings(cache), repeat=20)),
+    ]
+    report('Sun rise/set over 30 days (all 10 bodies computed)', rows)
+
+    reference = found_crossings(cache)
+    for step in (600, 60):
+        error = np.abs(sampled_crossings(step) - reference).max()
+        print(f"  max error, sampled every {step // 60:>2} min:  {error:6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
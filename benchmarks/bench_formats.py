@@ -0,0 +1,43 @@
+"""
+Response size and encode time of the nested JSON response against the
+columnar MessagePack and Arrow renderers (optional msgpack and pyarrow
+packages; formats that are not installed are skipped).
+"""
+from datetime import datetime, timedelta
+
+import gzip
+
+import pytz
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks._common import measure
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.renderers import ArrowRenderer, MessagePackRenderer
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+
+def main():
+    calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION)
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+    renderers = [('JSON', JSONRenderer())] + [
+        (label, renderer()) for label, renderer in (('MessagePack', MessagePackRenderer), ('Arrow', ArrowRenderer))
+        if renderer.available
+    ]
+
+    for label, days, step in (('1 day, hourly', 1, 3600), ('30 days, hourly', 30, 3600), ('1 year, hourly', 365, 3600)):
+        data = calculator.get_celestial_objects_data(start, start + timedelta(days=days), step=step)
+        print(label)
+        json_size = None
+        for name, renderer in renderers:
+            body = renderer.render(data)
+            json_size = json_size or len(body)
+            result = measure(lambda: renderer.render(data))
+            print(
+                f"  {name:<12} {len(body) / 1024:10.1f} KiB ({len(body) / json_size:6.1%})   "
+                f"gzip {len(gzip.compress(body, 6)) / 1024:9.1f} KiB   encode median {result['median_ms']:9.2f} ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
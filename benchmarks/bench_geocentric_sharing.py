@@ -0,0 +1,38 @@
+"""
+A burst of single-day requests from many distinct locations, with and
+without the shared geocentric store.
+"""
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import get_geocentric_ephemeris
+
+LOCATIONS = 200
+
+
+def main():
+    date = datetime(2024, 12, 9, 21, tzinfo=pytz.UTC)
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(-60, 60, LOCATIONS)
+    longitudes = rng.uniform(-180, 180, LOCATIONS)
+    store = get_geocentric_ephemeris()
+
+    def burst(shared):
+        for latitude, longitude in zip(latitudes, longitudes):
+            if not shared:
+                store.clear()
+            CelestialCalculator(latitude, longitude).get_celestial_objects_data(date, date)
+
+    report(f'{LOCATIONS} locations, same instant', [
+        ('geocentric pass per request', measure(lambda: burst(False), repeat=3)),
+        ('shared geocentric store', measure(lambda: burst(True), repeat=3)),
+    ])
+    print(f"  store: {store.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Offline IP resolution against a synthetic database of one million IPv4
+ranges and a 1" SRTM tile: one uncached address, a cached one looked up
+1,000 times, and 10,000 addresses one by one against one resolve_many() call.
+"""
+import tempfile
+
+import numpy as np
+
+from benchmarks._common import measure, report
+from astronomy.geolocation import IPV4_MAPPED_PREFIX, ElevationModel, GeoResolver, IPDatabase
+
+RANGES = 1000000
+ADDRESSES = 10000
+
+
+def keys(addresses):
+    packed = np.frombuffer(IPV4_MAPPED_PREFIX, dtype=np.uint8)
+    rows = np.empty((len(addresses), 16), dtype=np.uint8)
+    rows[:, :12] = packed
+    rows[:, 12:] = addresses.astype('>u4').view(np.uint8).reshape(-1, 4)
+    return rows.view('S16').ravel()
+
+
+def main():
+    rng = np.random.default_rng(2024)
+    starts = np.unique(rng.integers(1 << 24, 0xE0000000, RANGES, dtype=np.uint64))
+    ends = np.append(starts[1:] - 1, 0xE0000000)
+    database = IPDatabase(
+        keys(starts), keys(ends),
+        rng.uniform(35, 36, len(starts)), rng.uniform(51, 52, len(starts)),
+        np.zeros(len(starts), dtype=np.int32), {'places': [['Tehran', 'Tehran', 'Iran']]},
+    )
+    addresses = [
+        f'{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}'
+        for a in rng.integers(1 << 24, 0xE0000000, ADDRESSES).tolist()
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        rng.integers(0, 4000, (3601, 3601)).astype('>i2').tofile(f'{directory}/N35E051.hgt')
+        elevation = ElevationModel(directory)
+        uncached = GeoResolver(database, elevation, cache_size=0)
+        cached = GeoResolver(database, elevation)
+        cached.resolve(addresses[0])
+        sample = iter(addresses * 100)
+
+        report(f"{len(database)} ranges, one 1\" DEM tile", [
+            ('one address, uncached', measure(lambda: uncached.resolve(next(sample)), repeat=1000)),
+            ('1000 lookups, cached', measure(lambda: [cached.resolve(addresses[0]) for _ in range(1000)])),
+            (f'{ADDRESSES} addresses, one by one', measure(lambda: [uncached.resolve(ip) for ip in addresses])),
+            (f'{ADDRESSES} addresses, resolve_many', measure(lambda: uncached.resolve_many(addresses))),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Horizontal coordinates, above-horizon flags and air masses from geocentric
+records: one rotation per body against every body stacked into one
+topocentric pass. The sun and moon alone are the cost of the horizontal
+block before every body had one.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator, airmass
+from astronomy.timegrid import TimeGrid
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+
+def main():
+    calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION)
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+
+    for label, days in (('7 days, hourly', 7), ('90 days, hourly', 90)):
+        grid = TimeGrid.from_range(start, start + timedelta(days=days), 3600)
+        times = grid.times(calculator.ts)
+        state = calculator._observer_state(times)
+        geocentric = calculator._geocentric_records(calculator.celestial_bodies, grid, times, state)
+
+        def per_body(bodies):
+            def run():
+                for obj_id in bodies:
+                    altitudes, azimuths = state.altaz(np.array([r.position_au for r in geocentric[obj_id]]).T)
+                    (altitudes > 0).tolist()
+                    airmass(altitudes).tolist()
+                    altitudes.tolist()
+                    azimuths.tolist()
+            return run
+
+        report(label, [
+            ('sun and moon, per body', measure(per_body(('sun', 'moon')))),
+            ('every body, per body', measure(per_body(calculator.celestial_bodies))),
+            ('every body, stacked', measure(lambda: calculator._horizontal(geocentric, state))),
+        ])
+
+
+if __name__ == '__main__':
+    main()
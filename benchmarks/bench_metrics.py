@@ -0,0 +1,68 @@
+"""
+Overhead of the stage metrics: the cost of one span, the spans a request
+records, and get_celestial_objects_data with metrics enabled and disabled
+(measured alternately so drift affects both alike). The geocentric store
+is disabled so every run does the full work.
+"""
+from datetime import datetime, timedelta
+
+import time
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy import metrics
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import GeocentricEphemeris
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+
+def set_enabled(enabled):
+    with metrics._metrics_lock:
+        config = {**metrics.metrics_config(), 'ENABLED': enabled}
+        metrics._metrics = metrics.Metrics(config['BUCKETS']) if enabled else None
+        metrics._metrics_config = config
+
+
+def span_cost(count=200000):
+    started = time.perf_counter()
+    for _ in range(count):
+        with metrics.span('bench'):
+            pass
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION, geocentric=GeocentricEphemeris(0))
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+
+    set_enabled(False)
+    disabled_span = span_cost()
+    set_enabled(True)
+    enabled_span = span_cost()
+    print(f"One span: {enabled_span * 1e6:.2f} us enabled, {disabled_span * 1e6:.2f} us disabled")
+
+    for label, days, step in (('1 day, hourly', 1, 3600), ('30 days, daily', 30, 86400), ('30 days, hourly', 30, 3600)):
+        def run():
+            calculator.get_celestial_objects_data(start, start + timedelta(days=days), step=step)
+
+        set_enabled(True)
+        run()
+        spans = sum(histogram.count for histogram in metrics.get_metrics().stages.values())
+
+        rows = {True: [], False: []}
+        for _ in range(5):
+            for enabled in (True, False):
+                set_enabled(enabled)
+                rows[enabled].append(measure(run, repeat=3, warmup=1)['median_ms'])
+        on, off = sorted(rows[True])[2], sorted(rows[False])[2]
+        report(f"{label}: {spans} spans per call, {spans * enabled_span * 1000:.3f} ms of span overhead", [
+            ('metrics enabled', {'median_ms': on, 'min_ms': min(rows[True])}),
+            ('metrics disabled', {'median_ms': off, 'min_ms': min(rows[False])}),
+        ])
+        print(f"  span overhead {spans * enabled_span * 1000 / off:.3%} of the call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Observation store: recomputation against reading stored rows back, plus
+the cost of the first (write-through) request. Needs a migrated database;
+rows are written under a benchmark-only location and deleted afterwards.
+The geocentric store is disabled so recomputation does the full work.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import GeocentricEphemeris
+from astronomy.models import Observation
+from astronomy.store import ObservationStore
+
+LATITUDE, LONGITUDE, ELEVATION = -89.9999, 0.0, 0.0
+
+
+def main():
+    store = ObservationStore()
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+
+    def calculator(store=None):
+        return CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION, geocentric=GeocentricEphemeris(0), store=store)
+
+    def clear():
+        Observation.objects.filter(latitude=LATITUDE, longitude=LONGITUDE, elevation=ELEVATION).delete()
+
+    try:
+        for label, days, step in (
+            ('1 day, hourly', 1, 3600),
+            ('30 days, hourly', 30, 3600),
+            ('1 year, daily', 365, 86400),
+        ):
+            end = start + timedelta(days=days)
+
+            def write_through():
+                clear()
+                calculator(store).get_celestial_objects_data(start, end, step=step)
+
+            rows = [
+                ('recompute', measure(lambda: calculator().get_celestial_objects_data(start, end, step=step))),
+                ('first request (write-through)', measure(write_through)),
+                ('stored rows', measure(lambda: calculator(store).get_celestial_objects_data(start, end, step=step))),
+            ]
+            report(f"{label} ({Observation.objects.filter(latitude=LATITUDE).count()} rows)", rows)
+    finally:
+        clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Speedup of the process-pool calculator against worker count for one long
+range (two years hourly by default). Every call starts on a different day
+so the geocentric store of each process never answers for the calculation.
+
+    python -m benchmarks.bench_parallel --days 730 --step 3600 --workers 1 2 4 8
+"""
+from datetime import datetime, timedelta
+
+import argparse
+import itertools
+import os
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.parallel import ParallelCalculator
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--step', type=float, default=3600)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count()}))
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    check_start = datetime(1990, 1, 1, tzinfo=pytz.UTC)
+    starts = (datetime(2000, 1, 1, tzinfo=pytz.UTC) + timedelta(days=i) for i in itertools.count())
+
+    def serial(start=None):
+        start = start or next(starts)
+        calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION)
+        return calculator.get_celestial_objects_data(start, start + timedelta(days=args.days), step=args.step)
+
+    rows = [('serial', measure(serial, repeat=3))]
+    baseline = rows[0][1]['median_ms']
+
+    expected = serial(check_start)['celestial_objects']
+    for workers in args.workers:
+        parallel = ParallelCalculator(workers, args.chunk_size)
+
+        def run():
+            start = next(starts)
+            return parallel.get_celestial_objects_data(
+                LATITUDE, LONGITUDE, ELEVATION, start, start + timedelta(days=args.days), step=args.step
+            )
+
+        result = measure(run, repeat=3)
+        rows.append((f"{workers} processes ({baseline / result['median_ms']:.2f}x)", result))
+
+        actual = parallel.get_celestial_objects_data(
+            LATITUDE, LONGITUDE, ELEVATION, check_start, check_start + timedelta(days=args.days), step=args.step
+        )
+        parallel.shutdown()
+        if actual['celestial_objects'] != expected:
+            raise SystemExit(f"{workers} processes: merged result differs from the serial one")
+
+    samples = int(args.days * 86400 // args.step) + 1
+    report(f"{samples} samples, {os.cpu_count()} CPUs", rows)
+
+
+if __name__ == '__main__':
+    main()
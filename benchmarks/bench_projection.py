@@ -0,0 +1,41 @@
+"""
+Cost of a request against the bodies and fields it selects: every body and
+field, then fewer bodies and fewer fields. The geocentric store is disabled
+so every run computes what it is asked for.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import GeocentricEphemeris
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+SELECTIONS = (
+    ('all bodies, all fields', None, None),
+    ('sun, moon, mars, all fields', ['sun', 'moon', 'mars'], None),
+    ('sun, moon, mars, equatorial', ['sun', 'moon', 'mars'], ['equatorial']),
+    ('sun, moon, horizontal', ['sun', 'moon'], ['horizontal']),
+    ('moon, moon_phase', ['moon'], ['moon_phase']),
+    ('all bodies, distance', None, ['distance']),
+)
+
+
+def main():
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+    for label, days, step in (('7 days, hourly', 7, 3600), ('90 days, hourly', 90, 3600)):
+        rows = []
+        for name, bodies, fields in SELECTIONS:
+            calculator = CelestialCalculator(
+                LATITUDE, LONGITUDE, ELEVATION, geocentric=GeocentricEphemeris(0), bodies=bodies, fields=fields
+            )
+            rows.append((name, measure(
+                lambda: calculator.get_celestial_objects_data(start, start + timedelta(days=days), step=step)
+            )))
+        report(label, rows)
+
+
+if __name__ == '__main__':
+    main()
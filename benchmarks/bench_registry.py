@@ -0,0 +1,40 @@
+"""
+Per-request cost of building a CelestialCalculator with and without the
+shared ephemeris registry.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.ephemeris import EphemerisRegistry, get_registry
+
+
+def main():
+    start = datetime(2024, 12, 9, tzinfo=pytz.UTC)
+    end = start + timedelta(days=1)
+
+    def cold_request():
+        # What every request used to pay: a fresh timescale and kernel
+        calculator = CelestialCalculator(35.6824, 51.4158, 1156, registry=EphemerisRegistry())
+        calculator.get_celestial_objects_data(start, end)
+
+    def shared_request():
+        calculator = CelestialCalculator(35.6824, 51.4158, 1156)
+        calculator.get_celestial_objects_data(start, end)
+
+    cold = measure(cold_request)
+    shared = measure(shared_request)
+    report('Calculator construction + 2-day request', [
+        ('per-request load', cold),
+        ('shared registry', shared),
+    ])
+
+    saved = cold['median_ms'] - shared['median_ms']
+    print(f"  saved per request: {saved:.2f} ms ({saved / cold['median_ms'] * 100:.1f}%)")
+    print(f"  registry stats: {get_registry().stats()}")
+
+
+if __name__ == '__main__':
+    main()
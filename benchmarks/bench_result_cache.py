@@ -0,0 +1,64 @@
+"""
+Result cache: cold requests, fully cached repeats and overlapping windows,
+for the in-process LRU and the Django cache backends, and a request over
+MAX_SAMPLES with and without the bypass.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks._common import measure, report
+from astronomy.cache import build_result_cache
+from astronomy.celestial_calculator import CelestialCalculator
+
+DAYS = 365
+LONG_SAMPLES = 20000
+
+
+def main():
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+    end = start + timedelta(days=DAYS - 1)
+
+    for backend in ('lru', 'django'):
+        cache = build_result_cache({'BACKEND': backend, 'CACHE_ALIAS': 'astronomy'})
+        calculator = CelestialCalculator(*cache.quantize(35.6824, 51.4158, 1156))
+        offsets = iter(range(1, 10 ** 6))
+
+        def cold():
+            cache.backend.clear()
+            calculator.get_celestial_objects_data(start, end, cache=cache)
+
+        def cached():
+            calculator.get_celestial_objects_data(start, end, cache=cache)
+
+        def overlapping():
+            # Window slid forward by one more day each call: one new day per body
+            shift = timedelta(days=next(offsets))
+            calculator.get_celestial_objects_data(start + shift, end + shift, cache=cache)
+
+        rows = [
+            ('no cache', measure(lambda: calculator.get_celestial_objects_data(start, end))),
+            ('cold (all misses)', measure(cold)),
+        ]
+        cached()
+        rows.append(('fully cached', measure(cached)))
+        rows.append(('sliding window', measure(overlapping)))
+        report(f'{backend} backend, {DAYS}-day request', rows)
+        print(f"  stats: {cache.stats()}")
+
+    end = start + timedelta(minutes=LONG_SAMPLES - 1)
+    rows = []
+    for label, max_samples in (('bypassed (MAX_SAMPLES 4096)', 4096), ('cached (no MAX_SAMPLES)', None)):
+        cache = build_result_cache({'BACKEND': 'lru', 'MAX_SAMPLES': max_samples})
+        calculator = CelestialCalculator(*cache.quantize(35.6824, 51.4158, 1156))
+
+        def long_request():
+            cache.backend.clear()
+            calculator.get_celestial_objects_data(start, end, cache=cache, step=60)
+
+        rows.append((label, measure(long_request, repeat=3)))
+    report(f'lru backend, {LONG_SAMPLES} one-minute samples, cold', rows)
+
+
+if __name__ == '__main__':
+    main()
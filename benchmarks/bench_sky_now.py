@@ -0,0 +1,44 @@
+"""
+Polling for the current sky: POST /api/astronomy/ with start_date ==
+end_date == now (recomputed every poll) against GET /api/astronomy/now/
+served from the shared snapshot, and a conditional GET answered with 304.
+"""
+from datetime import datetime
+
+import json
+
+import pytz
+from django.test import Client
+
+from benchmarks._common import measure, report
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+
+
+def main():
+    client = Client()
+    location = {'latitude': LATITUDE, 'longitude': LONGITUDE, 'elevation': ELEVATION}
+    url = f'/api/astronomy/now/?latitude={LATITUDE}&longitude={LONGITUDE}&elevation={ELEVATION}'
+
+    def poll_post():
+        now = datetime.now(pytz.UTC).isoformat()
+        body = json.dumps({'location': location, 'date_range': {'start_date': now, 'end_date': now}, 'cache': False})
+        client.post('/api/astronomy/', body, content_type='application/json')
+
+    def poll_now():
+        client.get(url)
+
+    etag = client.get(url)['ETag']
+
+    def poll_conditional():
+        client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    report("Current sky, one poll", [
+        ('POST /api/astronomy/ at now', measure(poll_post, repeat=50)),
+        ('GET /api/astronomy/now/', measure(poll_now, repeat=50)),
+        ('GET /api/astronomy/now/, 304', measure(poll_conditional, repeat=50)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Peak RSS and time to first byte for a 10-year request, buffered JSON
+against the streamed NDJSON mode. Each mode runs in a fresh interpreter
+so peak RSS is not shared between them.
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+
+YEARS = 10
+PAYLOAD = {
+    'location': {'latitude': 35.6824, 'longitude': 51.4158, 'elevation': 1156},
+    'date_range': {'start_date': '2015-01-01', 'end_date': f'{2015 + YEARS - 1}-12-31'},
+    'cache': False,
+}
+
+
+def run(mode):
+    from benchmarks._common import django  # noqa: F401  (configures Django)
+    from django.test import Client
+
+    client = Client()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    response = client.post(
+        '/api/astronomy/', {**PAYLOAD, 'stream': mode == 'stream'}, content_type='application/json'
+    )
+
+    first_byte = None
+    size = 0
+    if response.streaming:
+        for chunk in response.streaming_content:
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+    else:
+        size = len(response.content)
+        first_byte = time.perf_counter() - started
+
+    print(json.dumps({
+        'mode': mode,
+        'seconds': time.perf_counter() - started,
+        'first_byte_seconds': first_byte,
+        'bytes': size,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_rss_growth_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb) / 1024,
+    }))
+
+
+def main():
+    print(f'{YEARS}-year request')
+    for mode in ('buffered', 'stream'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_streaming', mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"  {mode:<10} total {result['seconds']:7.2f} s   first byte {result['first_byte_seconds']:7.2f} s   "
+            f"peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['peak_rss_growth_mb']:.1f})   "
+            f"{result['bytes'] / 1e6:.1f} MB"
+        )
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,76 @@
+"""
+Accuracy and latency of the precomputed ephemeris tables against live
+Skyfield. Needs tables for the configured kernel (manage.py
+precompute_ephemeris); the geocentric store is disabled so every request
+runs the geocentric pass.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.geocentric import GeocentricEphemeris
+from astronomy.tables import get_ephemeris_tables
+from astronomy.timegrid import TimeGrid
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+SAMPLES = 20000
+
+
+def calculator(tables):
+    calculator = CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION, geocentric=GeocentricEphemeris(0))
+    calculator.tables = tables
+    return calculator
+
+
+def accuracy(tables):
+    """
+    Worst differences over random instants spread across the window
+    """
+    live, tabulated = calculator(None), calculator(tables)
+    rng = np.random.default_rng(0)
+    start = live.ts.tt_jd(tables.first_tt).utc_datetime()
+    span = (tables.last_tt - tables.first_tt) * 86400.0
+    grid = TimeGrid(start, np.sort(rng.uniform(0, span, SAMPLES)))
+
+    print(f"Accuracy over {SAMPLES} random instants")
+    for expected, actual in zip(live._calculate_objects(grid), tabulated._calculate_objects(grid)):
+        position, distance, altitude, constellations = [], [], [], 0
+        for a, b in zip(expected['observations'], actual['observations']):
+            ra_a, dec_a = (a['position']['equatorial'][key] for key in ('right_ascension', 'declination'))
+            ra_b, dec_b = (b['position']['equatorial'][key] for key in ('right_ascension', 'declination'))
+            d_ra = ((ra_a - ra_b + 12) % 24 - 12) * 15 * np.cos(np.radians(dec_a))
+            position.append(np.hypot(d_ra, dec_a - dec_b) * 3600)
+            distance.append(abs(a['distance']['au'] - b['distance']['au']) / a['distance']['au'])
+            if 'horizontal' in a['position']:
+                altitude.append(abs(a['position']['horizontal']['altitude'] - b['position']['horizontal']['altitude']) * 3600)
+            constellations += a['constellation'] != b['constellation']
+        line = f"  {expected['id']:<10} RA/Dec {max(position):.2e}\"  distance {max(distance):.1e} (relative)"
+        if altitude:
+            line += f"  altitude {max(altitude):.2e}\""
+        print(f"{line}  constellation mismatches {constellations}")
+
+
+def main():
+    tables = get_ephemeris_tables()
+    if tables is None:
+        raise SystemExit("No usable ephemeris tables; run manage.py precompute_ephemeris first")
+
+    accuracy(tables)
+
+    start = calculator(None).ts.tt_jd(tables.first_tt + 30).utc_datetime()
+    for label, end, step in (
+        ('1 day, daily', start, 86400),
+        ('30 days, hourly', start + timedelta(days=30), 3600),
+        ('1 year, daily', start + timedelta(days=365), 86400),
+    ):
+        live, tabulated = calculator(None), calculator(tables)
+        report(label, [
+            ('live Skyfield', measure(lambda: live.get_celestial_objects_data(start, end, step=step))),
+            ('interpolated tables', measure(lambda: tabulated.get_celestial_objects_data(start, end, step=step))),
+        ])
+
+
+if __name__ == '__main__':
+    main()
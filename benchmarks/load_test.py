@@ -0,0 +1,171 @@
+"""
+Load test for the astronomy endpoints: throughput and tail latency under
+concurrent requests.
+
+By default requests go straight into the project's ASGI application in this
+process, so no server is needed; pass --url to load a running server instead
+(e.g. uvicorn astronomy_api.asgi:application). Each run compares the
+synchronous DRF endpoint with the async pool endpoint.
+
+    python -m benchmarks.load_test --concurrency 16 --requests 200
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --paths /api/astronomy/async/
+
+With --disconnect-after, clients give up after that many seconds, which
+exercises cancellation: the pool statistics show the cancelled work.
+"""
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import benchmarks._common  # noqa: F401  (configures Django)
+from astronomy.dispatch import get_calculation_pool
+from astronomy_api.asgi import application
+
+PATHS = ('/api/astronomy/', '/api/astronomy/async/')
+
+
+def request_body(i, days, step):
+    # Distinct locations so the result cache does not answer for the calculator
+    start = datetime(2024, 1, 1)
+    return json.dumps({
+        'location': {'latitude': -60 + (i * 7.31) % 120, 'longitude': -180 + (i * 13.7) % 360, 'elevation': 0},
+        'date_range': {
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=days)).isoformat(),
+            'step': step,
+        },
+        'cache': False,
+    }).encode()
+
+
+async def asgi_request(path, body, timeout):
+    """
+    POST `body` to the in-process ASGI application; returns the status code
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'host', b'localhost'),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    finished = asyncio.Event()
+    response = {}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # The client stays connected until the response ends or it times out
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            response.setdefault('status', 'disconnected')
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response.setdefault('status', message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    await application(scope, receive, send)
+    return response.get('status', 'disconnected')
+
+
+async def http_request(url, path, body, timeout):
+    """
+    POST `body` to a running server over a fresh HTTP/1.1 connection
+    """
+    parts = urlsplit(url)
+    try:
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    except OSError:
+        return 'connection error'
+    try:
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    except asyncio.TimeoutError:
+        return 'disconnected'
+    finally:
+        writer.close()
+
+
+async def run_load(path, args):
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(request_body(i, args.days, args.step))
+
+    latencies, statuses = [], {}
+
+    async def client():
+        while not queue.empty():
+            body = queue.get_nowait()
+            started = time.perf_counter()
+            if args.url:
+                status = await http_request(args.url, path, body, args.disconnect_after)
+            else:
+                status = await asgi_request(path, body, args.disconnect_after)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return time.perf_counter() - started, latencies, statuses
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', help="Base URL of a running server; default drives the ASGI app in-process")
+    parser.add_argument('--paths', nargs='+', default=PATHS, help="Endpoints to load")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+    parser.add_argument('--days', type=int, default=30, help="Days per request")
+    parser.add_argument('--step', default='1d', help="Sampling step per request")
+    parser.add_argument('--disconnect-after', type=float, default=None, help="Client timeout in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients, {args.days} days at {args.step}")
+    for path in args.paths:
+        elapsed, latencies, statuses = asyncio.run(run_load(path, args))
+        print(path)
+        print(f"  throughput {args.requests / elapsed:8.1f} req/s over {elapsed:.1f} s   status {statuses}")
+        if latencies:
+            print(
+                f"  latency    p50 {percentile(latencies, 0.5):8.1f} ms   p95 {percentile(latencies, 0.95):8.1f} ms   "
+                f"p99 {percentile(latencies, 0.99):8.1f} ms   mean {statistics.mean(latencies):8.1f} ms"
+            )
+    if not args.url:
+        print(f"pool {get_calculation_pool().stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Ephemeris evaluation counts and timings for one request, comparing the
+previous body-major evaluation (observer recomputed per body, moon phase
+re-observing moon and sun) with the shared time-major ObserverState.
+
+SPK segment evaluations are counted by wrapping jplephem's segment
+computation, so the numbers reflect kernel work actually performed.
+"""
+import cProfile
+import pstats
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytz
+from jplephem.spk import Segment
+
+from benchmarks._common import measure, report
+from astronomy.celestial_calculator import CelestialCalculator
+from astronomy.timegrid import TimeGrid
+
+DAYS = 365
+
+segment_calls = Counter()
+_compute_and_differentiate = Segment.compute_and_differentiate
+
+
+def _counting_compute_and_differentiate(self, *args, **kwargs):
+    segment_calls[(self.center, self.target)] += 1
+    return _compute_and_differentiate(self, *args, **kwargs)
+
+
+def body_major(calculator, times):
+    """
+    Reference for the previous layout: every body evaluates its own observer
+    """
+    earth = calculator.earth
+    for obj_id, obj_data in calculator.celestial_bodies.items():
+        planet = obj_data['body']
+        earth.at(times).observe(planet).apparent().radec()
+        if obj_data['type'] == 'direct':
+            (earth + calculator.location).at(times).observe(planet).apparent().altaz()
+        if obj_id == 'moon':
+            e = earth.at(times)
+            e.observe(calculator.planets['moon']).separation_from(e.observe(calculator.planets['sun']))
+
+
+def time_major(calculator, times):
+    """
+    The same quantities through one shared ObserverState
+    """
+    state = calculator._observer_state(times)
+    for obj_id, obj_data in calculator.celestial_bodies.items():
+        planet = obj_data['body']
+        apparent = state.observe(planet).apparent()
+        apparent.radec()
+        if obj_data['type'] == 'direct':
+            state.altaz(apparent.position.au)
+        if obj_id == 'moon':
+            bodies = calculator.celestial_bodies
+            state.observe(bodies['moon']['body']).separation_from(state.observe(bodies['sun']['body']))
+    return state
+
+
+def main():
+    calculator = CelestialCalculator(35.6824, 51.4158, 1156)
+    start = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+    end = start + timedelta(days=DAYS - 1)
+    grid = TimeGrid.from_range(start, end)
+    times = grid.times(calculator.ts)
+
+    def full_request():
+        calculator.geocentric.clear()
+        calculator._calculate_objects(grid)
+
+    Segment.compute_and_differentiate = _counting_compute_and_differentiate
+    try:
+        segment_calls.clear()
+        body_major(calculator, times)
+        before = sum(segment_calls.values())
+
+        segment_calls.clear()
+        state = time_major(calculator, times)
+        after = sum(segment_calls.values())
+    finally:
+        Segment.compute_and_differentiate = _compute_and_differentiate
+
+    print(f'Ephemeris evaluation profile ({DAYS} dates, {len(calculator.celestial_bodies)} bodies)')
+    print(f'  SPK segment evaluations: body-major {before}, time-major {after}')
+    print(f'  observer state counters: {dict(state.evaluations)}')
+    report('Timing', [
+        ('body-major (reference)', measure(lambda: body_major(calculator, times), repeat=3)),
+        ('time-major', measure(lambda: time_major(calculator, times), repeat=3)),
+        ('full request (time-major)', measure(full_request, repeat=3)),
+    ])
+
+    profiler = cProfile.Profile()
+    profiler.runcall(full_request)
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+
+if __name__ == '__main__':
+    main()
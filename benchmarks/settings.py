@@ -0,0 +1,23 @@
+"""
+Settings for the benchmark suite (benchmarks.suite): the project settings
+with the result cache, observation store, geocentric store, ephemeris
+tables and process pool turned off, so every run measures the same work.
+
+The kernel is read from ASTRONOMY_BENCH_DATA_DIR / ASTRONOMY_BENCH_EPHEMERIS
+when set (e.g. a local copy of de421.bsp); the suite refuses to run rather
+than download it.
+"""
+import os
+
+from astronomy_api.settings import *  # noqa: F401,F403
+from astronomy_api.settings import ASTRONOMY_DATA_DIR, ASTRONOMY_EPHEMERIS, ASTRONOMY_RESULT_CACHE
+
+ASTRONOMY_DATA_DIR = os.environ.get("ASTRONOMY_BENCH_DATA_DIR", ASTRONOMY_DATA_DIR)
+ASTRONOMY_EPHEMERIS = os.environ.get("ASTRONOMY_BENCH_EPHEMERIS", ASTRONOMY_EPHEMERIS)
+
+ASTRONOMY_RESULT_CACHE = {**ASTRONOMY_RESULT_CACHE, "BACKEND": None}
+ASTRONOMY_OBSERVATION_STORE = {"ENABLED": False}
+ASTRONOMY_GEOCENTRIC_CACHE_ENTRIES = 0
+ASTRONOMY_TABLES_DIR = None
+ASTRONOMY_PARALLEL_WORKERS = 0
+ASTRONOMY_PRELOAD_EPHEMERIS = False
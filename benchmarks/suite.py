@@ -0,0 +1,181 @@
+"""
+Benchmark suite for CelestialCalculator and the API endpoint, with JSON
+output and a regression check against a stored baseline.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline baseline.json --threshold 0.25
+
+Runs with benchmarks.settings unless DJANGO_SETTINGS_MODULE says otherwise:
+every cache is off and the kernel must already be on disk (point
+ASTRONOMY_BENCH_DATA_DIR at a local copy; nothing is downloaded). With
+--baseline, any case whose median is more than --threshold slower than the
+baseline's is reported and the exit status is 1.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import argparse
+import json
+import os
+import platform
+import sys
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import numpy as np  # noqa: E402
+import pytz  # noqa: E402
+import skyfield  # noqa: E402
+import django  # noqa: E402
+
+from benchmarks._common import measure  # noqa: E402
+from django.test import Client  # noqa: E402
+from astronomy.celestial_calculator import CelestialCalculator  # noqa: E402
+from astronomy.ephemeris import get_registry  # noqa: E402
+from astronomy.geocentric import GeocentricEphemeris  # noqa: E402
+
+LATITUDE, LONGITUDE, ELEVATION = 35.6824, 51.4158, 1156
+START = datetime(2024, 12, 9, tzinfo=pytz.UTC)
+
+
+def calculator():
+    return CelestialCalculator(LATITUDE, LONGITUDE, ELEVATION, geocentric=GeocentricEphemeris(0))
+
+
+def objects_case(days, step):
+    instance = calculator()
+    return lambda: instance.get_celestial_objects_data(START, START + timedelta(days=days), step=step)
+
+
+def constellation_case(count):
+    instance = calculator()
+    rng = np.random.default_rng(0)
+    ra, dec = rng.uniform(0, 360, count), np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    if count == 1:
+        return lambda: instance.get_constellation(float(ra[0]), float(dec[0]))
+    return lambda: instance.get_constellation(ra, dec)
+
+
+def moon_phase_case(count):
+    instance = calculator()
+    if count == 1:
+        t = instance.ts.from_datetime(START)
+    else:
+        t = instance.ts.from_datetimes([START + timedelta(days=i) for i in range(count)])
+    return lambda: instance._calculate_moon_phase(t)
+
+
+def api_case(days, step):
+    client = Client()
+    body = json.dumps({
+        'location': {'latitude': LATITUDE, 'longitude': LONGITUDE, 'elevation': ELEVATION},
+        'date_range': {
+            'start_date': START.isoformat(),
+            'end_date': (START + timedelta(days=days)).isoformat(),
+            'step': step,
+        },
+        'cache': False,
+    })
+
+    def post():
+        response = client.post('/api/astronomy/', body, content_type='application/json')
+        if response.status_code != 200:
+            raise RuntimeError(f"POST /api/astronomy/ returned {response.status_code}: {response.content[:200]}")
+
+    return post
+
+
+# name -> factory returning the function to time; names are the baseline keys
+CASES = {
+    'calculator_init': lambda: calculator,
+    'objects_1_day': lambda: objects_case(1, 86400),
+    'objects_30_days': lambda: objects_case(30, 86400),
+    'objects_365_days': lambda: objects_case(365, 86400),
+    'objects_7_days_hourly': lambda: objects_case(7, 3600),
+    'constellation_scalar': lambda: constellation_case(1),
+    'constellation_10000': lambda: constellation_case(10000),
+    'moon_phase_scalar': lambda: moon_phase_case(1),
+    'moon_phase_365': lambda: moon_phase_case(365),
+    'api_post_1_day': lambda: api_case(1, '1d'),
+    'api_post_30_days_hourly': lambda: api_case(30, '1h'),
+}
+
+
+def check_kernel():
+    registry = get_registry()
+    kernel = Path(registry.data_dir) / registry.ephemeris
+    if not kernel.exists():
+        raise SystemExit(
+            f"Kernel not found at {kernel}; the suite does not download it. "
+            f"Set ASTRONOMY_BENCH_DATA_DIR (and ASTRONOMY_BENCH_EPHEMERIS) to a local copy."
+        )
+    registry.load()
+    return registry
+
+
+def environment(registry, repeat):
+    return {
+        'created': datetime.now(pytz.UTC).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'skyfield': skyfield.__version__,
+        'django': django.get_version(),
+        'ephemeris': registry.ephemeris,
+        'repeat': repeat,
+    }
+
+
+def compare(results, baseline, threshold, metric):
+    """
+    Print current against baseline per case; return the names that regressed
+    """
+    regressions = []
+    print(f"Against baseline from {baseline['environment'].get('created', '?')} ({metric}, threshold {threshold:.0%})")
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"  {name:<28} {result[metric]:10.2f} ms   (not in baseline)")
+            continue
+        ratio = result[metric] / previous[metric]
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"  {name:<28} {result[metric]:10.2f} ms   baseline {previous[metric]:10.2f} ms   "
+            f"{ratio - 1:+7.1%}{'   REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against results previously written with --output")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument('--metric', choices=('median_ms', 'min_ms'), default='median_ms')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), help="Run only these cases")
+    args = parser.parse_args()
+
+    registry = check_kernel()
+    results = {}
+    for name in args.only or CASES:
+        results[name] = measure(CASES[name](), repeat=args.repeat, warmup=2)
+        print(f"  {name:<28} median {results[name]['median_ms']:10.2f} ms   min {results[name]['min_ms']:10.2f} ms")
+
+    document = {'environment': environment(registry, args.repeat), 'results': results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + '\n')
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold, args.metric)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Gunicorn settings for the astronomy API.
+
+    gunicorn -c gunicorn.conf.py
+
+With ASTRONOMY_PRELOAD_IN_MASTER=1 (the default) the Django app, and with
+it the ephemeris registry, is loaded once in the master before forking, so
+workers inherit the memory-mapped kernel, the ephemeris tables and the
+timescale arrays instead of loading their own. Every worker logs its load
+time and memory at startup; the master logs the total once all workers are
+up.
+"""
+import multiprocessing
+import os
+import threading
+
+wsgi_app = 'astronomy_api.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.environ.get('ASTRONOMY_PRELOAD_IN_MASTER', '1') == '1'
+
+
+def when_ready(server):
+    if preload_app:
+        from astronomy.memory import describe_startup
+        server.log.info(describe_startup('Master'))
+
+
+def post_worker_init(worker):
+    from astronomy.ephemeris import get_registry
+    from astronomy.memory import describe_startup
+
+    # Without preload the app loaded in this worker; make sure the kernel did too
+    get_registry().load()
+    worker.log.info(describe_startup('Worker'))
+
+
+def nworkers_changed(server, new_value, old_value):
+    # Report the fleet once the initial set of workers has had time to start
+    if old_value is None:
+        threading.Timer(10.0, _log_fleet_memory, args=(server,)).start()
+
+
+def _log_fleet_memory(server):
+    from astronomy.memory import memory_usage
+
+    usages = [memory_usage(pid) for pid in list(server.WORKERS)]
+    usages = [usage for usage in usages if 'pss_mb' in usage]
+    if not usages:
+        return
+    total_pss = sum(usage['pss_mb'] for usage in usages)
+    total_rss = sum(usage['rss_mb'] for usage in usages)
+    server.log.info(
+        f"{len(usages)} workers: PSS {total_pss:.1f} MB in total ({total_pss / len(usages):.1f} MB each), "
+        f"RSS {total_rss:.1f} MB summed"
+    )
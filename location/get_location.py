@@ -1,37 +1,46 @@
-import requests
-
-def get_location_info():
-    # Get IP-based location
-    try:
-        # Using ip-api.com for free geolocation based on IP
-        ip_api_url = "http://ip-api.com/json/"
-        response = requests.get(ip_api_url)
-        location_data = response.json()
-
-        if location_data['status'] == 'success':
-            latitude = location_data['lat']
-            longitude = location_data['lon']
-            city = location_data.get('city', 'Unknown')
-            region = location_data.get('regionName', 'Unknown')
-            country = location_data.get('country', 'Unknown')
-
-            print(f"Location based on IP: {city}, {region}, {country}")
-            print(f"Latitude: {latitude}, Longitude: {longitude}")
-            
-            # Get elevation using a public API
-            elevation_api_url = f"https://api.open-elevation.com/api/v1/lookup"
-            elevation_response = requests.post(elevation_api_url, json={"locations": [{"latitude": latitude, "longitude": longitude}]})
-            elevation_data = elevation_response.json()
-
-            if 'results' in elevation_data and elevation_data['results']:
-                elevation = elevation_data['results'][0].get('elevation', 'Unknown')
-                print(f"Elevation: {elevation} meters")
-            else:
-                print("Could not retrieve elevation.")
+"""
+Offline location lookup for IP addresses
+
+Uses the IP range database and SRTM elevation tiles the API resolves
+omitted locations with (see "Get Location" in the README); no request
+leaves the machine.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from astronomy.geolocation import ElevationModel, GeoResolver, IPDatabase  # noqa: E402
+
+
+def get_location_info(ips, database, dem_dir=None):
+    resolver = GeoResolver(IPDatabase.load(database), ElevationModel(dem_dir) if dem_dir else None)
+    for ip, location in zip(ips, resolver.resolve_many(ips)):
+        if location is None:
+            print(f"{ip}: not found")
+            continue
+
+        print(f"{ip}: {location['city'] or 'Unknown'}, {location['region'] or 'Unknown'}, {location['country'] or 'Unknown'}")
+        print(f"  Latitude: {location['latitude']}, Longitude: {location['longitude']}")
+        if location['elevation'] is not None:
+            print(f"  Elevation: {location['elevation']:.0f} meters")
         else:
-            print("Error fetching location data.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
+            print("  Could not retrieve elevation.")
+
 
 if __name__ == "__main__":
-    get_location_info()
+    parser = argparse.ArgumentParser(description="Look up the location of IP addresses offline")
+    parser.add_argument('ips', nargs='+', help="IPv4 or IPv6 addresses")
+    parser.add_argument(
+        '--database', default=os.environ.get('ASTRONOMY_IP_DATABASE'),
+        help="IP database path without extension (manage.py build_ip_database); default $ASTRONOMY_IP_DATABASE"
+    )
+    parser.add_argument(
+        '--dem-dir', default=os.environ.get('ASTRONOMY_DEM_DIR'),
+        help="Directory of SRTM .hgt tiles; default $ASTRONOMY_DEM_DIR"
+    )
+    args = parser.parse_args()
+    if not args.database:
+        parser.error("pass --database or set ASTRONOMY_IP_DATABASE")
+    get_location_info(args.ips, args.database, args.dem_dir)